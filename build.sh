@@ -49,6 +49,9 @@ if [ ! -d "$PYINSTALLER_PATH" ]; then
     exit 1
 fi
 
+# Build the provider index so the app doesn't have to parse providers.json at startup
+"$VENV_PATH/bin/python" src/provider_index.py assets || exit 1
+
 # Create tmp file for current date
 echo "   "$(date) > /tmp/build_date.txt
 
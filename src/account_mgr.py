@@ -3,28 +3,83 @@ import logging
 import os
 import shutil
 import threading
-from dataclasses import dataclass
+import hashlib
+import sys
+import time
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import List, NamedTuple
 
 import cryptography.fernet
 import pyotp
 
 import cipher_funcs
+import save_scheduler
+import sort_order
 from appconfig import AppConfig
+from vault_storage import VaultStorage
 
 
-@dataclass
+# Format of an account's last_used time
+kTimestampFormat = "%Y-%m-%d %H:%M:%S"
+# (second, formatted time) of the last call to current_timestamp()
+_clock = (None, "")
+
+def current_timestamp() -> str:
+    """ Return the current time in the format of last_used.
+    The string is cached for the rest of the second, since a batch of accounts is usually created at once.
+    """
+    global _clock
+    second = int(time.time())
+    if _clock[0] != second:
+        _clock = (second, datetime.fromtimestamp(second).strftime(kTimestampFormat))
+    return _clock[1]
+
 class Account:
-    """ An entry in the vault: A secret key and associated identifiers and usage info. """
-    issuer: str  # Referred to as "provider" in the GUI.
-    label: str  # Referred to as "user" in the GUI
-    secret: str # encrypted secret key
-    last_used: str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    used_frequency: int = 0
-    favorite: bool = False  # for future use
-    icon: str = None
+    """ An entry in the vault: A secret key and associated identifiers and usage info.
+    Accounts have slots instead of a per-instance __dict__, as a vault may hold many of them;
+    use to_dict() and from_dict() to convert to and from the vault's JSON entries.
+    """
+    __slots__ = ('issuer',  # Referred to as "provider" in the GUI.
+                 'label',  # Referred to as "user" in the GUI
+                 'secret',  # encrypted secret key
+                 'last_used', 'used_frequency',
+                 'favorite',  # for future use
+                 'icon')
+
+    def __init__(self, issuer: str, label: str, secret: str, last_used: str = None,
+                 used_frequency: int = 0, favorite: bool = False, icon: str = None):
+        """ Construct an account from user input, validating the secret.
+        @param last_used defaults to the current time
+        """
+        self._assign(issuer, label, secret, last_used, used_frequency, favorite, icon)
+        self._validate()
+
+    def _assign(self, issuer, label, secret, last_used, used_frequency, favorite, icon):
+        self.issuer = issuer
+        self.label = label
+        self.secret = secret
+        self.last_used = current_timestamp() if last_used is None else last_used
+        self.used_frequency = used_frequency
+        self.favorite = favorite
+        self.icon = icon
+
+    @classmethod
+    def trusted(cls, issuer: str, label: str, secret: str, last_used: str = None,
+                used_frequency: int = 0, favorite: bool = False, icon: str = None):
+        """ Construct an account whose secret is known to be valid (read from the vault, or copied from
+        another account).  Skips the validation done by the constructor, so the secret isn't decrypted.
+        @param last_used defaults to the current time
+        """
+        account = cls.__new__(cls)
+        account._assign(issuer, label, secret, last_used, used_frequency, favorite, icon)
+        return account
+
+    def copy(self):
+        """ Return a copy of this account (without validating it again). """
+        return Account.trusted(self.issuer, self.label, self.secret, self.last_used,
+                               self.used_frequency, self.favorite, self.icon)
 
     def get_otp_auth_uri(self):
         """ Convert this account to otpauth URI string. """
@@ -33,8 +88,36 @@ class Account:
         uri = totp.provisioning_uri(name=self.label, issuer_name=self.issuer)
         return uri
 
-    def __post_init__(self):
-        """ Post init validation. """
+    def to_dict(self) -> dict:
+        """ Return the fields of this account as a dictionary, as stored in the vault. """
+        return {name: getattr(self, name) for name in Account.__slots__}
+
+    @classmethod
+    def from_dict(cls, fields: dict):
+        """ Construct an account from vault data whose secret has already been validated.
+        Skips the validation done by the constructor, so the secret isn't decrypted again.
+        Issuers are interned, since many entries tend to share a few of them.
+        @param fields dictionary of account fields, as stored in the vault
+        """
+        return cls.trusted(sys.intern(fields['issuer']), fields['label'], fields['secret'], fields.get('last_used'),
+                           fields.get('used_frequency', 0), fields.get('favorite', False), fields.get('icon'))
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, name) for name in Account.__slots__)
+
+    def __eq__(self, other):
+        if not isinstance(other, Account):
+            return NotImplemented
+        return self._values() == other._values()
+
+    __hash__ = None  # accounts are mutable
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in Account.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def _validate(self):
+        """ Validation of a new account. """
         # Check for non-empty secret
         if self.secret == "":
             raise ValueError("Can't create Account with empty secret.")
@@ -46,8 +129,8 @@ class Account:
         except Exception as e:
             raise (e)
 
-@dataclass(frozen=True)
-class OtpRecord:
+
+class OtpRecord(NamedTuple):
     """ An OTP record as received from the provider with plain-text secret key """
     issuer: str  # Provider
     label: str   # user identifier
@@ -56,10 +139,93 @@ class OtpRecord:
     def toAccount(self):
         """ Convert to account by encrypting the secret key and adding default last used date."""
         encryped_secret = cipher_funcs.encrypt(self.secret)
-        return Account(self.issuer, self.label, encryped_secret, "1980-01-01 00:00:00")
+        return Account.trusted(self.issuer, self.label, encryped_secret, "1980-01-01 00:00:00")
+
+    def to_dict(self) -> dict:
+        """ Return the fields of this record as a dictionary. """
+        return dict(self._asdict())
+
+    @classmethod
+    def from_dict(cls, fields: dict):
+        """ Construct a record from a dictionary with issuer, label and secret. """
+        return cls(fields['issuer'], fields['label'], fields['secret'])
 
 # Constant identifier for vault data file format
-kCurrent_Vault_Version = '1'
+kCurrent_Vault_Version = '2'
+# Vault versions that can be read.  Version 2 adds a key-check value to the header.
+kSupported_Vault_Versions = ('1', '2')
+# Number of worker threads used to encrypt/decrypt large batches of secrets
+kCryptoWorkers = 4
+# Number of usage records the journal may hold before it is compacted into the vault
+kJournalCompactSize = 100
+# Nanoseconds of mtime resolution we don't trust: a vault modified this close to when we last
+# looked at it might have been rewritten without its mtime changing, so its content is compared.
+kMtimeGranularityNs = 2_000_000_000
+
+@dataclass
+class VaultChanges:
+    """ Entry-level differences found when the vault was modified by another program.
+    Entries are identified by (issuer, label).
+    """
+    added: List[tuple] = field(default_factory=list)
+    removed: List[tuple] = field(default_factory=list)
+    modified: List[tuple] = field(default_factory=list)
+    reordered: bool = False  # the entries present before and after are in a different order
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.modified or self.reordered)
+
+@dataclass
+class UnsavedChanges:
+    """ The changes made to the accounts since the vault was last saved, so they can be
+    replayed on the vault if another program modifies it before the save.
+    Entries are identified by (issuer, label).
+    """
+    changed: set = field(default_factory=set)  # entries added, edited or deleted: the list in memory is right
+    used: set = field(default_factory=set)  # entries whose usage statistics changed
+    reordered: bool = False
+
+    def __bool__(self):
+        return bool(self.changed or self.used or self.reordered)
+
+class JsonVaultStorage(VaultStorage):
+    """ The vault as a JSON file, with a backup copy and a usage journal.
+    The file handling is done by the AccountManager (see save_accounts).  Every change rewrites
+    the file, which the manager's write-behind scheduler can defer and coalesce;
+    usage statistics are appended to the journal instead.
+    """
+    def __init__(self, manager):
+        self.manager = manager
+
+    def load(self):
+        return self.manager._load_accounts_from_disk()
+
+    def is_modified(self):
+        return self.manager._vault_modified()
+
+    def reload(self, current):
+        return self.manager._handle_external_modification()
+
+    def write_all(self, accounts):
+        return self.manager._write_vault(accounts)
+
+    def all_changed(self, accounts):
+        return self.manager._request_save()
+
+    def inserted(self, position, account):
+        return self.manager._request_save()
+
+    def updated(self, position, account):
+        return self.manager._request_save()
+
+    def deleted(self, position, account):
+        return self.manager._request_save()
+
+    def used(self, position, account):
+        return self.manager._append_usage_record(account)
+
+    def watch_path(self):
+        return self.manager.vault_path
 
 class AccountManager:
     """ AccountManager is the list of accounts. It is a singleton.
@@ -83,6 +249,7 @@ class AccountManager:
             @param filename - the filename of the vault.
         """
         # If no filename was provided
+        self.data_dir_default = filename is None
         if filename is None:
             # Get the configuration settings
             config = AppConfig()
@@ -119,13 +286,121 @@ class AccountManager:
             self.vault_path = Path.home().joinpath(filename)
             self.backup_path = self.vault_path.with_suffix('.backup.json')
             
-            # Track file modification time to detect external changes
-            self._last_modified_time = None
+            # (path, size, mtime_ns, time recorded, digest) of the vault as last read or written, to detect external changes
+            self._vault_state = None
+            # The differences found at the last reload of an externally modified vault
+            self.last_external_changes = None
+            # Functions called with the VaultChanges when the vault is modified externally
+            self._change_listeners = []
+            # Number of usage records appended to the journal since the vault was last saved
+            self._journal_count = 0
+            # Changes not yet saved (while a scheduled save is pending)
+            self._unsaved = UnsavedChanges()
+            # Held while the vault files are written, which may be on the save scheduler's thread,
+            # and while the list of accounts is changed
+            self._save_lock = threading.RLock()
+            # Write-behind saving is off until enable_write_behind() is called
+            self.save_scheduler = None
+            # Where the vault is stored
+            self.storage = JsonVaultStorage(self)
+            # Sort keys of the accounts, reused while they don't change
+            self.sort_keys = sort_order.SortKeyCache()
             
             # Initialize accounts as None - (will be lazy loaded)
             self._accounts = None
             self.initialized = True
 
+            # The application's own vault may be kept in a database or binary file instead (a hidden setting)
+            vault_storage = AppConfig().get_vault_storage() if self.data_dir_default else 'json'
+            if vault_storage == 'sqlite':
+                import sqlite_storage  # imports this module
+                try:
+                    self.set_storage(sqlite_storage.open_vault(self.vault_path.with_suffix('.db'), self.vault_path))
+                except Exception as e:
+                    self.logger.error(f"Unable to open vault database, using {self.vault_path}: {str(e)}")
+            elif vault_storage == 'binary':
+                import binary_vault  # imports this module
+                try:
+                    self.set_storage(binary_vault.open_vault(self, self.vault_path.with_suffix('.eav')))
+                except Exception as e:
+                    self.logger.error(f"Unable to open binary vault, using {self.vault_path}: {str(e)}")
+
+    def set_storage(self, storage: VaultStorage):
+        """ Keep the vault in the given storage.  The accounts are read from it on next use.
+        @param storage a VaultStorage, e.g. sqlite_storage.SqliteVaultStorage
+        """
+        if self.storage is not storage:
+            self.storage.close()
+        self.storage = storage
+        self._accounts = None
+        self._unsaved = UnsavedChanges()
+
+    @property
+    def journal_path(self) -> Path:
+        """ The usage journal kept next to the vault. """
+        return self.vault_path.with_suffix('.journal')
+
+    @property
+    def _accounts(self):
+        """ The list of accounts (None until loaded). """
+        return self._account_list
+
+    @_accounts.setter
+    def _accounts(self, accounts):
+        """ Replace the list of accounts.  The lookup indexes are rebuilt on next use. """
+        self._account_list = accounts
+        self._key_index = None
+        self._position_index = None
+
+    def _get_key_index(self):
+        """ Return the dictionary from (issuer, label) to Account, building it if needed. """
+        if self._key_index is None:
+            self._key_index = {}
+            for account in self._account_list or []:
+                self._key_index.setdefault((account.issuer, account.label), account)
+        return self._key_index
+
+    def _get_position_index(self):
+        """ Return the dictionary from (issuer, label) to position in the list, building it if needed. """
+        if self._position_index is None:
+            self._position_index = {}
+            for position, account in enumerate(self._account_list or []):
+                self._position_index.setdefault((account.issuer, account.label), position)
+        return self._position_index
+
+    def find_account(self, issuer, label):
+        """ Lookup an account by its identifiers.
+        @return the Account with the given issuer and label, or None if there isn't one
+        """
+        self.get_accounts()
+        account = self._get_key_index().get((issuer, label))
+        if account is not None and (account.issuer, account.label) != (issuer, label):
+            # The account was renamed in place, so the index is stale
+            self._key_index = None
+            self._position_index = None
+            account = self._get_key_index().get((issuer, label))
+        return account
+
+    def position_of(self, issuer, label) -> int:
+        """ Lookup the position of an account in the list by its identifiers.
+        @return index of the account with the given issuer and label, or -1 if there isn't one
+        """
+        self.get_accounts()
+        return self._lookup_position(issuer, label)
+
+    def _lookup_position(self, issuer, label) -> int:
+        """ Return the position of the account with the given identifiers, or -1.
+        If an account was renamed in place the stale index is rebuilt.
+        """
+        position = self._get_position_index().get((issuer, label), -1)
+        if position >= 0:
+            account = self._accounts[position]
+            if (account.issuer, account.label) != (issuer, label):
+                self._key_index = None
+                self._position_index = None
+                position = self._get_position_index().get((issuer, label), -1)
+        return position
+
     def get_accounts(self) -> List['Account']:
         """
         Get the current accounts list, checking for modifications first.
@@ -135,25 +410,96 @@ class AccountManager:
         """
         # First load if needed (lazy loading)
         if self._accounts is None:
-            self._accounts = self._load_accounts_from_disk()
+            self._accounts = self.storage.load()
             return self._accounts
         
-        # Check for external modifications
-        if self.vault_path.exists():
-            vault_time = os.path.getmtime(self.vault_path)
-            # Is vault_file modified after internal accounts?
-            if self._last_modified_time and vault_time > self._last_modified_time:
+        # Check for external modifications (not while our own save is replacing the file)
+        with self._save_lock:
+            if self.storage.is_modified():
                 self.logger.info("Detected external modifications to vault file")
-                self._accounts = self._handle_external_modification()
+                current = self._accounts
+                accounts, changes = self.storage.reload(current)
+                if self.save_scheduler is not None and self.save_scheduler.pending_changes > 0:
+                    # The pending save will write the vault, so the changes not yet saved are replayed on it
+                    self.logger.warning("Vault file modified externally while changes are waiting to be saved, merging them")
+                    accounts = self._replay_unsaved(current, accounts)
+                    accounts, changes = self._diff_accounts(current, accounts)
+                else:
+                    self._unsaved = UnsavedChanges()
+                self._accounts, self.last_external_changes = accounts, changes
+                if self.last_external_changes:
+                    self._notify_change_listeners(self.last_external_changes)
         
         return self._accounts
 
+    @staticmethod
+    def _digest(text) -> bytes:
+        """ Return a digest of the vault content. """
+        return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+    def _record_vault_state(self, text):
+        """ Remember the size, mtime and digest of the vault content just read or written. """
+        try:
+            stat = os.stat(self.vault_path)
+        except OSError:
+            self._vault_state = None
+            return
+        self._vault_state = (self.vault_path, stat.st_size, stat.st_mtime_ns, time.time_ns(), self._digest(text))
+
+    def _vault_modified(self) -> bool:
+        """ Check whether the vault content differs from what was last read or written.
+        The file is only read when its size or mtime changed, or its mtime is too recent to be conclusive.
+        """
+        if self._vault_state is None or self._vault_state[0] != self.vault_path:
+            return False
+        try:
+            stat = os.stat(self.vault_path)
+        except OSError:
+            return False
+        path, size, mtime_ns, recorded_ns, digest = self._vault_state
+        if (stat.st_size, stat.st_mtime_ns) == (size, mtime_ns) and mtime_ns < recorded_ns - kMtimeGranularityNs:
+            return False
+        try:
+            with open(self.vault_path, 'r') as f:
+                text = f.read()
+        except OSError:
+            return False
+        if self._digest(text) != digest:
+            return True
+        # Touched but unchanged: remember the new mtime so the next check is just a stat
+        self._vault_state = (path, stat.st_size, stat.st_mtime_ns, time.time_ns(), digest)
+        return False
+
+    def add_change_listener(self, listener):
+        """ Register a function to be called with a VaultChanges when the vault is modified
+        by another program.  It is called on the thread that found the change, which may be the save thread.
+        """
+        if listener not in self._change_listeners:
+            self._change_listeners.append(listener)
+
+    def remove_change_listener(self, listener):
+        """ Unregister a function registered with add_change_listener. """
+        if listener in self._change_listeners:
+            self._change_listeners.remove(listener)
+
+    def _notify_change_listeners(self, changes):
+        """ Call every change listener with the changes. """
+        for listener in list(self._change_listeners):
+            try:
+                listener(changes)
+            except Exception as e:
+                self.logger.error(f"Error in vault change listener: {str(e)}")
+
     def set_accounts(self, account_string):
         """Set accounts from a string - dependency injection for testing
         @param account_string is JSON string of vault data"""
         content = json.loads(account_string)
-        self._accounts = [Account(**acc) for acc in content]
-        self.save_accounts()
+        with self._save_lock:
+            self._unsaved.changed.update((account.issuer, account.label) for account in self._accounts or [])
+            self._accounts = [Account(**acc) for acc in content]
+            self._unsaved.changed.update((account.issuer, account.label) for account in self._accounts)
+            self._unsaved.reordered = True
+            self.storage.all_changed(self._accounts)
         self.logger.debug(f"Saved accounts : {account_string} ")
 
     def _load_accounts_from_disk(self) -> List['Account']:
@@ -178,12 +524,14 @@ class AccountManager:
 
             # Read and validate primary vault
             with open(self.vault_path, 'r') as f:
-                content = json.load(f)
+                text = f.read()
+                content = json.loads(text)
                 if not self._validate_vault_data(content):
                     raise ValueError("Invalid vault format (wrong version?)")
-                # Assign the content to the account list
-                accounts = [Account(**acc) for acc in content["vault"]["entries"]]
-                self._last_modified_time = os.path.getmtime(self.vault_path)
+                # Assign the content to the account list (secrets were validated above)
+                accounts = [Account.from_dict(acc) for acc in content["vault"]["entries"]]
+                self._record_vault_state(text)
+                self._replay_journal(accounts)
                 return accounts
 
         except (json.JSONDecodeError, ValueError) as e:
@@ -205,6 +553,50 @@ class AccountManager:
         Raises:
             Exception: If any error occurs during the saving process.
         """
+        # The list may be changed (under this lock) by the GUI thread while a scheduled save runs,
+        # so the storage is given a copy of it
+        with self._save_lock:
+            if not self.storage.write_all(list(self.get_accounts())):
+                return False
+            self._unsaved = UnsavedChanges()
+            return True
+
+    def _replay_unsaved(self, current, disk_accounts):
+        """ Apply the changes not yet saved to the accounts just read from the vault.
+        Entries changed here replace the vault's, entries used here keep their usage statistics,
+        and the vault's other entries are kept.
+        @param current the accounts in memory
+        @param disk_accounts the accounts read from the vault
+        @return list of the merged accounts
+        """
+        unsaved = self._unsaved
+        current_by_key = {(account.issuer, account.label): account for account in current}
+        accounts = []
+        for account in disk_accounts:
+            key = (account.issuer, account.label)
+            if key in unsaved.changed:
+                account = current_by_key.get(key)  # None if deleted here
+            elif key in unsaved.used and key in current_by_key:
+                account.last_used = current_by_key[key].last_used
+                account.used_frequency = current_by_key[key].used_frequency
+            if account is not None:
+                accounts.append(account)
+        # Entries added (or renamed) here go where they are in memory
+        in_vault = {(account.issuer, account.label) for account in accounts}
+        for position, account in enumerate(current):
+            key = (account.issuer, account.label)
+            if key in unsaved.changed and key not in in_vault:
+                accounts.insert(min(position, len(accounts)), account)
+        if unsaved.reordered:
+            # Entries in memory keep their order; those only in the vault follow them
+            order = {key: position for position, key in enumerate(current_by_key)}
+            accounts.sort(key=lambda account: order.get((account.issuer, account.label), len(order)))
+        return accounts
+
+    def _write_vault(self, accounts=None) -> bool:
+        """ Write the accounts to a temporary file, back up the vault, and replace it.
+        @param accounts the list to write (default: the current accounts)
+        """
         # Create temporary file path for atomic write
         temp_path = self.vault_path.with_suffix('.tmp')
         try:
@@ -212,32 +604,31 @@ class AccountManager:
                 os.makedirs(os.path.dirname(self.vault_path), exist_ok=True)
 
             # Ensure we have the latest accounts
-            accounts = self.get_accounts()
+            if accounts is None:
+                accounts = list(self.get_accounts())
             
             # Prepare the header string.
-            vault_content = {
-                "vault": {
-                    "version": "1",
-                    "entries": []
-                        }
-            }
+            vault_content = self._make_vault_header()
+            # Length of string in a vault file with no entries (58 for a version 1 vault)
+            empty_vault_size = max(58, len(json.dumps(vault_content, indent=2)))
 
             # First write to temporary file
             with open(temp_path, 'w') as f:
-                account_data = [acc.__dict__ for acc in accounts]
+                account_data = [acc.to_dict() for acc in accounts]
                 vault_content["vault"]["entries"] = account_data
-                json.dump(vault_content, f, indent=2)
+                text = json.dumps(vault_content, indent=2)
+                f.write(text)
 
-            # Magic number for length of string in a vault file with no entries
-            empty_vault_size = 58
             # Create backup of current file if it exists AND has at least one entry.
             if self.vault_path.exists() and os.path.getsize(self.vault_path) > empty_vault_size:
                 shutil.copy2(self.vault_path, self.backup_path)
 
             # Atomic rename of temporary file to actual file
             os.replace(temp_path, self.vault_path)
-            self._last_modified_time = os.path.getmtime(self.vault_path)
-            
+            self._record_vault_state(text)
+            # The vault now holds the usage statistics, so the journal is no longer needed
+            self._discard_journal()
+
             self.logger.debug("Successfully saved accounts")
             return True
 
@@ -260,6 +651,42 @@ class AccountManager:
                 self.logger.warning(f"Could not clean up temporary file: {temp_path}")
             return False
 
+    def enable_write_behind(self, delay=save_scheduler.kSaveDelay):
+        """ Save changes on a background thread a short time after they are made,
+        so a burst of changes is written with one save.  Call flush_saves() before exiting.
+        @param delay seconds between the first unsaved change and the save
+        """
+        if self.save_scheduler is None:
+            self.save_scheduler = save_scheduler.SaveScheduler(self.save_accounts, delay)
+
+    def flush_saves(self) -> bool:
+        """ Write any changes waiting for a scheduled save.
+        @return True if the vault holds all changes
+        """
+        if self.save_scheduler is None:
+            return True
+        return self.save_scheduler.flush()
+
+    def _request_save(self) -> bool:
+        """ Save the vault after a change: scheduled if write-behind is enabled, otherwise immediately.
+        @return False if an immediate save failed
+        """
+        if self.save_scheduler is None:
+            return self.save_accounts()
+        self.save_scheduler.request_save()
+        return True
+
+    @staticmethod
+    def _make_vault_header():
+        """ Return the vault content with no entries: the version and the key-check value. """
+        return {
+            "vault": {
+                "version": kCurrent_Vault_Version,
+                "key_check": cipher_funcs.make_key_check(),
+                "entries": []
+            }
+        }
+
     def save_new_account(self, otp_record) -> bool:
         """
         Save a new account with duplicate checking.
@@ -278,27 +705,27 @@ class AccountManager:
             Exception: If any other error occurs during the saving process.
         """
         try:
-            # Get latest accounts and check for duplicates
-            accounts = self.get_accounts()
-            if any(
-                acc.issuer == otp_record.issuer and acc.label == otp_record.label
-                for acc in accounts
-            ):
-                return False
-
-            encrypted_secret = cipher_funcs.encrypt(otp_record.secret)
-            account = Account(
-                issuer=otp_record.issuer,
-                label=otp_record.label,
-                secret=encrypted_secret,
-                # Note: default values for remaining fields are provided in dataclass
-            )
+            with self._save_lock:
+                # Get latest accounts and check for duplicates
+                if self.find_account(otp_record.issuer, otp_record.label) is not None:
+                    return False
 
-            self._accounts.insert(0, account)
-            if self.save_accounts():
-                self.logger.debug(f"Successfully saved new account: {otp_record.issuer} ({otp_record.label})")
-            else:
-                raise RuntimeError("Failed to save account to vault")
+                encrypted_secret = cipher_funcs.encrypt(otp_record.secret)
+                account = Account(
+                    issuer=otp_record.issuer,
+                    label=otp_record.label,
+                    secret=encrypted_secret,
+                    # Note: default values for remaining fields are provided by the constructor
+                )
+
+                self._accounts.insert(0, account)
+                self._unsaved.changed.add((account.issuer, account.label))
+                self._get_key_index()[(account.issuer, account.label)] = account
+                self._position_index = None  # every position shifted
+                if self.storage.inserted(0, account):
+                    self.logger.debug(f"Successfully saved new account: {otp_record.issuer} ({otp_record.label})")
+                else:
+                    raise RuntimeError("Failed to save account to vault")
 
             return True
         except Exception as e:
@@ -321,22 +748,142 @@ class AccountManager:
         Raises:
             Exception: If any error occurs during the update process.
         """
-        # Get latest accounts
-        accounts = self.get_accounts()
-        
-        # Check for duplicates
-        for item, acc in enumerate(accounts):
-            # does info match and is it not me?
-            if acc.issuer == account.issuer and acc.label == account.label and item != index:
+        with self._save_lock:
+            # Get latest accounts
+            self.get_accounts()
+
+            # Check for duplicates: does info match and is it not me?
+            position = self._lookup_position(account.issuer, account.label)
+            if position >= 0 and position != index:
                 return False
 
-        # Replace the list item
-        self._accounts[index] = account
-        # Save to disk
-        self.save_accounts()
-        self.logger.debug(f"Updated account: {account.issuer} ({account.label})")
+            # Replace the list item
+            old_account = self._accounts[index]
+            self._accounts[index] = account
+            self._unsaved.changed.update({(old_account.issuer, old_account.label), (account.issuer, account.label)})
+            self._reindex_replaced(index, old_account, account)
+            # Save to disk
+            self.storage.updated(index, account)
+            self.logger.debug(f"Updated account: {account.issuer} ({account.label})")
+            return True
+
+    def record_usage(self, account) -> bool:
+        """
+        Record that an account's OTP was used.
+
+        The caller has already updated the account's last_used and used_frequency.
+        Instead of rewriting the whole vault, only the new values are stored: a JSON vault appends them
+        to the usage journal, which is replayed on load and compacted into the vault when it grows or on exit.
+
+        Args:
+            account (Account): The account with updated usage statistics.
+
+        Returns:
+            bool: True if the usage was recorded, False if the account is not in the vault.
+        """
+        with self._save_lock:
+            current = self.find_account(account.issuer, account.label)
+            if current is None:
+                self.logger.warning(f"Usage not recorded, account not found: {account.issuer} ({account.label})")
+                return False
+            if current is not account:
+                # The vault was reloaded since the caller got the account
+                current.last_used = account.last_used
+                current.used_frequency = account.used_frequency
+            self._unsaved.used.add((account.issuer, account.label))
+            return self.storage.used(self._lookup_position(account.issuer, account.label), current)
+
+    def _append_usage_record(self, account) -> bool:
+        """ Append the account's usage statistics to the usage journal (JSON vault). """
+        # Values are absolute (not increments) so replaying a record twice is harmless
+        record = {"issuer": account.issuer, "label": account.label,
+                  "last_used": account.last_used, "used_frequency": account.used_frequency}
+        try:
+            # Not while a save is replacing the vault and discarding the journal
+            with self._save_lock, open(self.journal_path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            self.logger.error(f"Unable to write usage journal, saving vault instead: {str(e)}")
+            return self._request_save()
+        self._journal_count += 1
+        if self._journal_count >= kJournalCompactSize:
+            self.compact_journal()
         return True
 
+    def compact_journal(self) -> bool:
+        """
+        Fold the usage journal into the vault (if it has any records).
+        With write-behind enabled the save is scheduled; flush_saves() completes it.
+
+        Returns:
+            bool: False if saving failed.
+        """
+        if self._journal_count == 0 and not self.journal_path.exists():
+            return True
+        self.logger.debug(f"Compacting {self._journal_count} usage records into the vault")
+        return self._request_save()
+
+    def _replay_journal(self, accounts):
+        """ Apply the usage records in the journal to accounts just loaded from the vault. """
+        self._journal_count = self._replay_journal_file(accounts, self.journal_path)
+
+    @staticmethod
+    def _replay_journal_file(accounts, journal_path) -> int:
+        """ Apply the usage records in a usage journal to accounts loaded from its vault.
+        @return the number of records read
+        """
+        logger = logging.getLogger(__name__)
+        count = 0
+        if not journal_path.exists():
+            return count
+        by_key = {}
+        for account in accounts:
+            by_key.setdefault((account.issuer, account.label), account)
+        try:
+            with open(journal_path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        account = by_key.get((record['issuer'], record['label']))
+                        if account is not None:
+                            account.last_used = record['last_used']
+                            account.used_frequency = record['used_frequency']
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        # A partial line left by a crash while appending
+                        logger.warning("Skipped unreadable usage journal record")
+                        continue
+                    count += 1
+        except OSError as e:
+            logger.error(f"Unable to read usage journal: {str(e)}")
+        return count
+
+    def _discard_journal(self):
+        """ Remove the usage journal after its records were saved in the vault. """
+        self._journal_count = 0
+        try:
+            self.journal_path.unlink(missing_ok=True)
+        except OSError as e:
+            self.logger.warning(f"Could not remove usage journal: {str(e)}")
+
+    def _reindex_replaced(self, index, old_account, account):
+        """ Update the lookup indexes after the account at index was replaced. """
+        if old_account is account:
+            # The caller modified the account in place, so its old key is unknown
+            self._key_index = None
+            self._position_index = None
+            return
+        old_key = (old_account.issuer, old_account.label)
+        new_key = (account.issuer, account.label)
+        key_index = self._get_key_index()
+        position_index = self._get_position_index()
+        if position_index.get(old_key) == index:
+            key_index.pop(old_key, None)
+            position_index.pop(old_key, None)
+        key_index[new_key] = account
+        position_index[new_key] = index
+
     def delete_account(self, account):
         """
         Delete an account from the account manager.
@@ -352,38 +899,70 @@ class AccountManager:
         Raises:
             Exception: If any error occurs during the deletion process.
         """
-        # Get latest accounts
-        self.get_accounts()
-
-        # Delete the specified account
-        self._accounts.remove(account)
-        # Save to disk
-        self.save_accounts()
-        self.logger.debug(f"Deleted account: {account.issuer} ({account.label})")
+        with self._save_lock:
+            # Get latest accounts
+            self.get_accounts()
+
+            # Delete the specified account
+            position = self._lookup_position(account.issuer, account.label)
+            if position >= 0 and self._accounts[position] == account:
+                del self._accounts[position]
+                self._get_key_index().pop((account.issuer, account.label), None)
+                self._position_index = None  # later positions shifted
+            else:
+                position = self._accounts.index(account)
+                del self._accounts[position]
+                self._key_index = None
+                self._position_index = None
+            self._unsaved.changed.add((account.issuer, account.label))
+            # Save to disk
+            self.storage.deleted(position, account)
+            self.logger.debug(f"Deleted account: {account.issuer} ({account.label})")
+
+    def reorder(self, order) -> bool:
+        """ Put the accounts in a new order (e.g., chosen in the reorder dialog) and store it.
+        The accounts themselves don't change, so they aren't copied or validated again.
+        @param order the new order: a list of the accounts' current positions, or of their (issuer, label) keys
+        @return False if the order isn't a permutation of the accounts or couldn't be stored
+        """
+        with self._save_lock:
+            accounts = self.get_accounts()
+            if order and not isinstance(order[0], int):
+                position_index = self._get_position_index()
+                order = [position_index.get(tuple(key), -1) for key in order]
+            if sorted(order) != list(range(len(accounts))):
+                self.logger.error(f"Can't reorder accounts: the new order isn't a permutation of the {len(accounts)} accounts")
+                return False
+            self._accounts = [accounts[position] for position in order]
+            self._unsaved.reordered = True
+            self.logger.debug(f"Accounts reordered.")
+            return self.storage.reordered(order, self._accounts)
+
+    def apply_sort(self, mode) -> bool:
+        """ Make the order of a sort mode the custom order of the vault (written once).
+        @param mode one of sort_order.kSortModes
+        @return False if the new order couldn't be stored
+        """
+        self.logger.debug(f"Applying sort order {mode}.")
+        return self.reorder(self.sort_keys.order(self.get_accounts(), mode))
 
     def sort_alphabetically(self):
         """
         Sort the accounts alphabetically by issuer.
         """
-        self._accounts = sorted(self.get_accounts(), key=lambda x: x.issuer)
-        self.save_accounts()
-        self.logger.debug(f"Accounts sorted alphabetically.")
+        self.apply_sort(sort_order.kSortAlphabetical)
 
     def sort_recency(self):
         """
         Sort the accounts by most recently used.
         """
-        self._accounts = sorted(self.get_accounts(), key=lambda x: x.last_used, reverse=True)
-        self.save_accounts()
-        self.logger.debug(f"Accounts sorted by recently used.")
+        self.apply_sort(sort_order.kSortRecency)
 
     def sort_frequency(self):
         """
         Sort the accounts by most frequently used.
         """
-        self._accounts = sorted(self.get_accounts(), key=lambda x: x.used_frequency, reverse=True)
-        self.save_accounts()
-        self.logger.debug(f"Accounts sorted by used frequency.")
+        self.apply_sort(sort_order.kSortFrequency)
 
     def backup_accounts(self, file_path):
         """ Store the accounts in the given file path with encrypted secret keys.
@@ -419,17 +998,25 @@ class AccountManager:
             self.logger.error(f"Internal error: No accounts to {target_label}. 'self.accounts' is not a list.")
             return
 
-        # Convert accounts to plaintext
+        # Convert accounts to plaintext, decrypting all the secrets in one batch
+        accounts = self.get_accounts()
+        try:
+            plain_secrets = cipher_funcs.decrypt_many([account.secret for account in accounts], kCryptoWorkers)
+        except cryptography.fernet.InvalidToken:
+            # Fall back to decrypting one at a time so a bad entry doesn't spoil the batch
+            plain_secrets = [self._decrypt_or_none(account) for account in accounts]
         uri_list = ""
-        for account in self.get_accounts():
-            # Expects encrypted keys that it converts to plain URI
-            uri_list += account.get_otp_auth_uri() + "\n"  # convert to URI and append to string
+        for account, plain_secret in zip(accounts, plain_secrets):
+            if plain_secret is None:
+                continue  # Skip this account, but continue with the others
+            # convert to plain URI and append to string
+            uri_list += pyotp.TOTP(plain_secret).provisioning_uri(name=account.label, issuer_name=account.issuer) + "\n"
             try:
                 # turn the Account object into a dictionary so it can be serialized by json.dump
-                vault_account = account.__dict__.copy()
+                vault_account = account.to_dict()
                 # Export mode wants plain-text keys
                 if not use_encrypted_keys:
-                    vault_account['secret'] = cipher_funcs.decrypt(account.secret)
+                    vault_account['secret'] = plain_secret
                 vault_accounts.append(vault_account)
             except AttributeError as e:
                 self.logger.error(f"Error processing account {account}: Missing required attribute - {e}")
@@ -521,10 +1108,12 @@ class AccountManager:
                 return accounts
 
             # Merge the restored data into the current accounts
-            result, conflicts = AccountManager.merge_account_lists(self._accounts, accounts)
-            self._accounts = result
-            self.logger.debug(f"Updating active accounts from restored data")
-            self.save_accounts()
+            with self._save_lock:
+                result, conflicts = AccountManager.merge_account_lists(self._accounts, accounts)
+                self._accounts = result
+                self._unsaved.changed.update((account.issuer, account.label) for account in result)
+                self.logger.debug(f"Updating active accounts from restored data")
+                self.storage.all_changed(self._accounts)
             self.logger.debug(f"Read completed for  {len(accounts)} accounts from {file_path}")
             self.logger.debug(self._accounts)
             self.logger.debug(f"Successful {target} of accounts from {file_path}")
@@ -546,15 +1135,18 @@ class AccountManager:
     def parse_uris(self, uris):
         """ (Import helper method) Parse URIs and return account objects
         """
-        accounts = []
+        totp_objs = []
         for uri in uris:
-            # Parse each URI and create account objects
+            # Parse each URI
             try:
-                totp_obj = pyotp.parse_uri(uri.strip())
+                totp_objs.append(pyotp.parse_uri(uri.strip()))
             except ValueError as e:
                 self.logger.warning(f"URI parsing failure during import.  Item {uri.strip()}.  Error {e}")
                 raise e  # abort on parse error
-            encrypted_secret = cipher_funcs.encrypt(totp_obj.secret)
+        # Encrypt all the secrets in one batch, then create account objects
+        encrypted_secrets = cipher_funcs.encrypt_many([totp_obj.secret for totp_obj in totp_objs], kCryptoWorkers)
+        accounts = []
+        for totp_obj, encrypted_secret in zip(totp_objs, encrypted_secrets):
             account = Account(totp_obj.issuer, totp_obj.name, encrypted_secret)
             accounts.append(account)
         return accounts
@@ -563,14 +1155,29 @@ class AccountManager:
         """ (Import helper method) Parse JSON and return account objects
         """
         restored_accounts = []
+        # Set aside entries that lack the required fields
+        required_fields = ('issuer', 'label', 'secret')
+        valid_data = []
         for json_account in accounts_data:
+            missing = [field for field in required_fields if field not in json_account]
+            if missing:
+                self.logger.error(f"Missing expected key in account data: {missing[0]!r}")
+            else:
+                valid_data.append(json_account)
+        # Restore will leave the secret encrypted
+        # An Imported file has plaintext keys that must be encrypted before constructing the accounts
+        secret_keys = [json_account['secret'] for json_account in valid_data]
+        if import_mode:
+            try:
+                secret_keys = cipher_funcs.encrypt_many(secret_keys, kCryptoWorkers)
+            except Exception:
+                # Fall back to encrypting one at a time so a bad entry doesn't spoil the batch
+                secret_keys = [self._encrypt_or_none(secret) for secret in secret_keys]
+
+        for json_account, secret_key in zip(valid_data, secret_keys):
             try:
-                # Assuming decrypted_account has the same structure as the original account
-                # Restore will leave the secret encrypted
-                # An Imported file has plaintext keys that must be encrypted before constructing the accounts
-                secret_key = json_account['secret']
-                if import_mode:
-                    secret_key = cipher_funcs.encrypt(json_account['secret'])
+                if secret_key is None:
+                    raise ValueError("secret key could not be encrypted")
                 # required fields
                 restored_account = Account(json_account['issuer'],json_account['label'],secret_key)
                 # optional fields
@@ -585,12 +1192,26 @@ class AccountManager:
 
                 restored_accounts.append(restored_account)
 
-            except KeyError as e:
-                self.logger.error(f"Missing expected key in account data: {e}")
             except Exception as e:
                 self.logger.error(f"Failed to read account from data {json_account}: {e}")
         return restored_accounts
 
+    def _decrypt_or_none(self, account):
+        """ (Export helper method) Decrypt the secret of an account, returning None if it can't be decrypted. """
+        try:
+            return cipher_funcs.decrypt(account.secret)
+        except Exception as e:
+            self.logger.error(f"Failed to decrypt secret for account {account}: {e}")
+            return None
+
+    def _encrypt_or_none(self, secret):
+        """ (Import helper method) Encrypt a single secret, returning None if it can't be encrypted. """
+        try:
+            return cipher_funcs.encrypt(secret)
+        except Exception as e:
+            self.logger.error(f"Failed to encrypt secret during import: {e}")
+            return None
+
     @staticmethod
     def merge_account_lists(current: List[Account], to_merge: List[Account]) -> List[Account]:
         """
@@ -633,7 +1254,7 @@ class AccountManager:
                 else:
                     # Conflict - append '!' to issuer and add to result
                     conflict_count += 1  # Increment conflict counter
-                    conflict_account = Account(
+                    conflict_account = Account.trusted(
                         issuer=account.issuer + "!",
                         label=account.label,
                         secret=account.secret,
@@ -649,31 +1270,67 @@ class AccountManager:
 
         return result, conflict_count
 
-    def _handle_external_modification(self) -> List['Account']:
+    def _handle_external_modification(self):
         """
         Handle detected external modifications to the vault file.
+        @return (list of accounts, VaultChanges compared to the current accounts)
         """
         self.logger.debug("Attempting to load external changes")
         try:
             # Load the vault and validate the content
             with open(self.vault_path, 'r') as f:
-                disk_content = json.load(f)
+                text = f.read()
+                disk_content = json.loads(text)
                 if not self._validate_vault_data(disk_content):
                     raise ValueError("Invalid vault format in external modifications")
 
                 # Recreate the accounts from the vault entries
                 disk_accounts = {
-                    self._account_key(acc): Account(**acc)
+                    self._account_key(acc): Account.from_dict(acc)
                     for acc in disk_content["vault"]["entries"]
                 }
-                self._last_modified_time = os.path.getmtime(self.vault_path)
-                self.logger.debug("Successfully read external changes")
-                return list(disk_accounts.values())
+                self._record_vault_state(text)
+                accounts = list(disk_accounts.values())
+                self._replay_journal(accounts)
+                accounts, changes = self._diff_accounts(self._accounts, accounts)
+                self.logger.debug(f"Successfully read external changes: {changes}")
+                return accounts, changes
 
         except Exception as e:
             self.logger.error(f"Failed to handle external modifications: {str(e)}")
             # something went wrong so recover from backup
-            return self._recover_from_backup()
+            return self._diff_accounts(self._accounts, self._recover_from_backup())
+
+    @staticmethod
+    def _diff_accounts(current, disk_accounts):
+        """ Compare the accounts in memory with those read from the vault.
+        Unchanged accounts keep their existing objects, so only the changed entries need updating.
+        @return (list of accounts in the vault's order, VaultChanges)
+        """
+        changes = VaultChanges()
+        current_by_key = {}
+        for account in current or []:
+            current_by_key.setdefault((account.issuer, account.label), account)
+        accounts = []
+        for account in disk_accounts:
+            key = (account.issuer, account.label)
+            old_account = current_by_key.pop(key, None)
+            if old_account is None:
+                changes.added.append(key)
+            elif old_account == account:
+                account = old_account
+            else:
+                changes.modified.append(key)
+            accounts.append(account)
+        changes.removed = list(current_by_key)
+        # Compare the order of the entries that are in both lists
+        added, removed = set(changes.added), set(changes.removed)
+        old_order = [(account.issuer, account.label) for account in current or []]
+        old_order = [key for key in old_order if key not in removed]
+        new_order = [(account.issuer, account.label) for account in accounts]
+        new_order = [key for key in new_order if key not in added]
+        changes.reordered = old_order != new_order
+        return accounts, changes
 
     def _recover_from_backup(self) -> List['Account']:
         """
@@ -686,7 +1343,7 @@ class AccountManager:
                     content = json.load(f)
                     if self._validate_vault_data(content):
                         self.logger.debug("Successfully recovered from backup")
-                        return [Account(**acc) for acc in content['vault']['entries']]
+                        return [Account.from_dict(acc) for acc in content['vault']['entries']]
 
             self.logger.error("No valid backup found for recovery")
             return []
@@ -701,17 +1358,23 @@ class AccountManager:
         Validate account data structure.
         """
 
-        if "vault" in content:
-            if "version" in content['vault']:
-                # Check for current version number
-                if content['vault']['version'] == kCurrent_Vault_Version:
-                    if "entries" in content["vault"]:
-                        # Detected vaultv1 format
-                        accounts_data = content["vault"]["entries"]
+        if "vault" in content and content['vault'].get('version') in kSupported_Vault_Versions \
+                and "entries" in content["vault"]:
+            accounts_data = content["vault"]["entries"]
+            version = content['vault']['version']
         else:
             print("ERROR - Vault data not in correct format.")
             return False
 
+        # Version 2 vaults check the key once using the header
+        check_each_secret = True
+        if version == '2':
+            if not cipher_funcs.verify_key_check(content['vault'].get('key_check', "")):
+                print ("Vault was encrypted with a different key.")
+                print ("Tip: If you are trying to copy your vault from a different machine, use Import.")
+                return False
+            check_each_secret = False
+
         # Check that all required fields are present
         required_fields = {'issuer', 'label', 'secret', 'last_used', 'used_frequency', 'favorite', 'icon'}
         for acct in accounts_data:
@@ -720,12 +1383,9 @@ class AccountManager:
             for field in required_fields:
                 if field not in acct:
                     return False
-            # Verify the secret can be decrypted
-            try:
-                cipher_funcs.decrypt(acct['secret'])
-            except cryptography.fernet.InvalidToken as e:
+            # Verify the secret could be decrypted (checks the token's HMAC without decrypting it)
+            if check_each_secret and not cipher_funcs.is_valid_token(acct['secret']):
                 print (f"Found invalid secret loading accounts for {acct['issuer']}")
-                print (e)
                 print ("Tip: If you are trying to copy your vault from a different machine, use Import.")
                 return False
         return True
@@ -739,19 +1399,7 @@ class AccountManager:
     @staticmethod
     def duplicate_accounts(accounts):
         """ Return a copy of the accounts."""
-        list_copy = []
-        for item in accounts:
-            newitem = Account(
-                issuer=item.issuer,
-                label=item.label,
-                secret=item.secret,
-                last_used=item.last_used,
-                used_frequency=item.used_frequency,
-                favorite=item.favorite,
-                icon=item.icon
-            )
-            list_copy.append(newitem)
-        return list_copy
+        return [item.copy() for item in accounts]
 
 if __name__ == '__main__':
     am = AccountManager()
@@ -110,6 +110,13 @@ class AppConfig:
     def set_theme_name(self, theme_name):
         self.set('Settings', 'theme_name', theme_name)
 
+    def get_sort_mode(self):
+        """ Accessor to the order the vault entries are displayed in: 'custom', 'alphabetical', 'recency' or 'frequency'. """
+        return self.get('Settings', 'sort_mode', fallback='custom')
+
+    def set_sort_mode(self, mode):
+        self.set('Settings', 'sort_mode', mode)
+
     def get_alt_id(self):
         alt_id_string = self.config.get('System', 'alt_id', fallback="")
         if alt_id_string == "":
@@ -124,6 +131,10 @@ class AppConfig:
         else:  # Default to Linux or Unix-like systems
             return self.config.get('System','linux_data_dir', fallback=str(Path.home() / ".var" / "app" / "org.redpoint.EasyAuth" / "data"))
 
+    def get_vault_storage(self):
+        """ Accessor to the kind of storage used for the vault: 'json', 'sqlite' or 'binary'. """
+        return self.config.get('System', 'vault_storage', fallback='json')
+
     def get_log_level(self):
         """ Accessor to desired logging level. """
         return self.config.get('System', 'log_level', fallback='20')
@@ -137,6 +148,7 @@ class AppConfig:
         self.set_minimize_during_qr_search(False)
         self.set_language('English')
         self.set_theme_name("light")
+        self.set_sort_mode('custom')
         # 'Hidden' settings are not listed in the Preferences dialog and don't have public setter methods
         """ Alternate machine id.  If you want to use a vault created on a different machine you need to
            use the machine id the vault was created on.  """
@@ -152,4 +164,7 @@ class AppConfig:
         WARNING = 30
         ERROR = 40"""
         self.set('System', 'log_level', '20')
+        """ How the vault is stored: 'json' (a JSON file), 'sqlite' (an SQLite database) or 'binary'
+        (a compact file that is decoded lazily), converted from the JSON file the first time it is used. """
+        self.set('System', 'vault_storage', 'json')
 
@@ -0,0 +1,334 @@
+import base64
+import logging
+import mmap
+import os
+import shutil
+import struct
+import threading
+from pathlib import Path
+
+import cipher_funcs
+from account_mgr import Account, AccountManager
+from vault_storage import VaultStorage
+
+""" A compact binary vault format that is read lazily.
+The file starts with a header and an index table giving the offset and length of each record,
+so loading the vault only maps the file into memory and creates a lightweight proxy per entry.
+A proxy decodes its record the first time one of its fields is used, and a save copies the records
+of proxies that weren't decoded as they are.
+Secrets are stored as the raw bytes of their Fernet token rather than as base64 text.
+The header and index table are checked when the vault is loaded; a damaged vault is replaced by its backup.
+
+Layout (little-endian):
+    magic "EAVB", format version (u16), entry count (u32), key-check length (u16), key-check token bytes,
+    index table: (offset u32, length u32) for each entry,
+    records: issuer (u16 length + UTF-8), label (u16 + UTF-8), secret (u16 + token bytes),
+             last_used (u8 + UTF-8), used_frequency (u32), favorite (u8), icon (u16 + UTF-8, 0xFFFF for None)
+"""
+
+kMagic = b"EAVB"
+kFormatVersion = 1
+kHeader = struct.Struct("<4sHIH")
+kIndexEntry = struct.Struct("<II")
+kNoIcon = 0xFFFF
+
+# Guards the proxies' buffers: the GUI thread decodes proxies while a save on the scheduler's
+# thread copies their records, points them at the new vault and releases the old mapping
+_buffer_lock = threading.RLock()
+
+def _encode_record(account) -> bytes:
+    """ Return the record bytes of an account. """
+    issuer = account.issuer.encode()
+    label = account.label.encode()
+    secret = base64.urlsafe_b64decode(account.secret.encode())
+    last_used = str(account.last_used).encode()
+    parts = [struct.pack("<H", len(issuer)), issuer,
+             struct.pack("<H", len(label)), label,
+             struct.pack("<H", len(secret)), secret,
+             struct.pack("<B", len(last_used)), last_used,
+             struct.pack("<IB", account.used_frequency, bool(account.favorite))]
+    if account.icon is None:
+        parts.append(struct.pack("<H", kNoIcon))
+    else:
+        icon = account.icon.encode()
+        parts += [struct.pack("<H", len(icon)), icon]
+    return b"".join(parts)
+
+def _decode_record(buffer, offset, length) -> dict:
+    """ Return the Account fields of the record at the offset.
+    @raise ValueError if the record is damaged
+    """
+    end = offset + length
+    def read_bytes(length_format):
+        nonlocal offset
+        (length,) = struct.unpack_from(length_format, buffer, offset)
+        offset += struct.calcsize(length_format)
+        if offset + length > end:
+            raise ValueError("Damaged vault record")
+        value = bytes(buffer[offset:offset + length])
+        offset += length
+        return value
+    fields = {'issuer': read_bytes("<H").decode(),
+              'label': read_bytes("<H").decode(),
+              'secret': base64.urlsafe_b64encode(read_bytes("<H")).decode(),
+              'last_used': read_bytes("<B").decode()}
+    if offset + 7 > end:
+        raise ValueError("Damaged vault record")
+    fields['used_frequency'], favorite = struct.unpack_from("<IB", buffer, offset)
+    fields['favorite'] = bool(favorite)
+    offset += 5
+    (icon_length,) = struct.unpack_from("<H", buffer, offset)
+    fields['icon'] = None if icon_length == kNoIcon else read_bytes("<H").decode()
+    return fields
+
+def _encode_records(records):
+    """ Return the binary vault holding the encoded records, and the offset of its index table. """
+    key_check = base64.urlsafe_b64decode(cipher_funcs.make_key_check().encode())
+    index_start = kHeader.size + len(key_check)
+    offset = index_start + kIndexEntry.size * len(records)
+    index = []
+    for record in records:
+        index.append(kIndexEntry.pack(offset, len(record)))
+        offset += len(record)
+    header = kHeader.pack(kMagic, kFormatVersion, len(records), len(key_check))
+    return b"".join([header, key_check] + index + records), index_start
+
+def encode_vault(accounts) -> bytes:
+    """ Return the binary vault holding the accounts. """
+    return _encode_records([_encode_record(account) for account in accounts])[0]
+
+def check_vault(buffer):
+    """ Check the header and index table of a binary vault.
+    @return (key-check token bytes, offset of the index table, entry count)
+    @raise ValueError if the vault is truncated or isn't in this format
+    """
+    if len(buffer) < kHeader.size:
+        raise ValueError("Vault file is truncated")
+    magic, version, count, key_check_length = kHeader.unpack_from(buffer, 0)
+    if magic != kMagic or version != kFormatVersion:
+        raise ValueError("Invalid vault format (wrong version?)")
+    index_start = kHeader.size + key_check_length
+    records_start = index_start + kIndexEntry.size * count
+    if records_start > len(buffer):
+        raise ValueError("Vault file is truncated")
+    for offset, length in kIndexEntry.iter_unpack(buffer[index_start:records_start]):
+        if offset < records_start or offset + length > len(buffer):
+            raise ValueError("Vault file is truncated")
+    return bytes(buffer[kHeader.size:index_start]), index_start, count
+
+
+class LazyAccount(Account):
+    """ An account whose fields are decoded from the mapped vault file the first time one is used. """
+    __slots__ = ('_vault_file', '_index_offset')
+
+    def __init__(self, vault_file, index_offset):
+        """ @param vault_file the mapped vault file (or the vault's bytes)
+            @param index_offset position of this entry's index table entry in the file
+        """
+        self._vault_file = vault_file
+        self._index_offset = index_offset
+
+    def _record(self) -> bytes:
+        """ Return the encoded record, or None if the account was decoded. """
+        with _buffer_lock:
+            if self._vault_file is None:
+                return None
+            offset, length = kIndexEntry.unpack_from(self._vault_file, self._index_offset)
+            return bytes(self._vault_file[offset:offset + length])
+
+    def _decode(self):
+        """ Decode the record. """
+        with _buffer_lock:
+            if self._vault_file is None:
+                return
+            offset, length = kIndexEntry.unpack_from(self._vault_file, self._index_offset)
+            for name, value in _decode_record(self._vault_file, offset, length).items():
+                _account_slots[name].__set__(self, value)
+            self._vault_file = None  # no longer needed
+
+# The slots of Account hold the decoded values; LazyAccount's properties decode on first use
+_account_slots = {name: vars(Account)[name] for name in Account.__slots__}
+
+def _lazy_field(slot):
+    """ Return a property that decodes the record on first use of the field in the slot.
+    Assigning a field decodes the record too, so an account that wasn't decoded is unchanged.
+    """
+    def get(self):
+        try:
+            return slot.__get__(self)
+        except AttributeError:
+            self._decode()
+            return slot.__get__(self)
+    def set(self, value):
+        self._decode()
+        slot.__set__(self, value)
+    return property(get, set)
+
+for _name, _slot in _account_slots.items():
+    setattr(LazyAccount, _name, _lazy_field(_slot))
+
+
+class BinaryVaultStorage(VaultStorage):
+    """ Stores the vault in the compact binary format.
+    The whole file is rewritten (atomically) for any change; like the JSON vault, the
+    rewrites are requested from the AccountManager so its write-behind scheduler can coalesce them,
+    and the vault being replaced is kept as a backup.
+    """
+    def __init__(self, manager, vault_path):
+        """ @param manager the AccountManager whose vault this is
+            @param vault_path path of the binary vault file
+        """
+        self.logger = logging.getLogger(__name__)
+        self.manager = manager
+        self.vault_path = Path(vault_path)
+        self.backup_path = self.vault_path.with_suffix('.backup.eav')
+        self._map = None  # the mapped file the current proxies read from
+        self._stat = None  # (inode, size, mtime_ns) of the file as last read or written
+        self._key_ok = True  # False if the vault was encrypted with a different key (then it's read-only)
+        self._vault_ok = False  # the vault file was read or written successfully (so it may be backed up)
+
+    def _stat_vault(self):
+        try:
+            stat = os.stat(self.vault_path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _proxies(self, vault_file):
+        """ Check the vault (mapped file or bytes) and return a proxy for each entry,
+        or an empty list if it was encrypted with a different key.
+        @raise ValueError if the vault is damaged
+        """
+        key_check, index_start, count = check_vault(vault_file)
+        self._key_ok = cipher_funcs.verify_key_check(base64.urlsafe_b64encode(key_check).decode())
+        if not self._key_ok:
+            print ("Vault was encrypted with a different key.")
+            print ("Tip: If you are trying to copy your vault from a different machine, use Import.")
+            self.logger.error(f"Vault {self.vault_path} was encrypted with a different key")
+            return []
+        return [LazyAccount(vault_file, index_start + kIndexEntry.size * i) for i in range(count)]
+
+    def load(self):
+        self._vault_ok = False
+        if not self.vault_path.exists():
+            self.logger.info(f"Vault file not found at {self.vault_path}")
+            return []
+        vault_file = None
+        try:
+            stat = self._stat_vault()
+            if stat is None or stat[1] == 0:
+                raise ValueError("Vault file is empty")
+            with open(self.vault_path, 'rb') as f:
+                vault_file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            accounts = self._proxies(vault_file)
+        except (OSError, ValueError, struct.error) as e:
+            self.logger.error(f"Error loading vault: {str(e)}")
+            if vault_file is not None:
+                vault_file.close()
+            self._stat = None
+            return self._recover_from_backup()
+        self._stat = stat
+        if not self._key_ok:
+            vault_file.close()
+            return []
+        self._map = vault_file
+        self._vault_ok = True
+        return accounts
+
+    def _recover_from_backup(self):
+        """ Return the accounts in the backup of the vault (empty if there isn't a valid one).
+        The backup is read into memory, since it is overwritten by the next save.
+        """
+        self.logger.debug("Attempting recovery from backup")
+        try:
+            with open(self.backup_path, 'rb') as f:
+                accounts = self._proxies(f.read())
+            self.logger.debug("Successfully recovered from backup")
+            return accounts
+        except (OSError, ValueError, struct.error) as e:
+            self.logger.error(f"No valid backup found for recovery: {str(e)}")
+            return []
+
+    def is_modified(self):
+        # Every save replaces the file, so its inode changes even if the size and mtime don't
+        return self._stat is not None and self._stat_vault() != self._stat
+
+    def reload(self, current):
+        for account in current or []:
+            if isinstance(account, LazyAccount):
+                account._decode()  # before the old mapping is released
+        return AccountManager._diff_accounts(current, self.load())
+
+    def write_all(self, accounts):
+        if not self._key_ok:
+            self.logger.error("Vault is read-only because it was encrypted with a different key")
+            return False
+        temp_path = self.vault_path.with_suffix('.tmp')
+        try:
+            # Records that weren't decoded are copied as they are
+            records = []
+            copied = set()  # positions of the proxies whose records were copied
+            for position, account in enumerate(accounts):
+                record = account._record() if isinstance(account, LazyAccount) else None
+                if record is None:
+                    record = _encode_record(account)
+                else:
+                    copied.add(position)
+                records.append(record)
+            data, index_start = _encode_records(records)
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            # Keep the vault being replaced, unless it's damaged (it would replace a good backup)
+            if self._vault_ok and self.vault_path.exists():
+                shutil.copy2(self.vault_path, self.backup_path)
+            # The proxies read the new vault's records from memory, so the old file can be released
+            with _buffer_lock:
+                for position in copied:
+                    account = accounts[position]
+                    if account._vault_file is not None:
+                        account._vault_file = data
+                        account._index_offset = index_start + kIndexEntry.size * position
+                if self._map is not None:
+                    self._map.close()
+                    self._map = None
+            os.replace(temp_path, self.vault_path)
+            self._stat = self._stat_vault()
+            self._vault_ok = True
+            return True
+        except (OSError, ValueError, BufferError, struct.error) as e:
+            self.logger.error(f"Error writing vault {self.vault_path}: {str(e)}")
+            if temp_path.exists():
+                os.remove(temp_path)
+            return False
+
+    def watch_path(self):
+        return self.vault_path
+
+    def all_changed(self, accounts):
+        return self.manager._request_save()
+
+    def inserted(self, position, account):
+        return self.manager._request_save()
+
+    def updated(self, position, account):
+        return self.manager._request_save()
+
+    def deleted(self, position, account):
+        return self.manager._request_save()
+
+    def close(self):
+        # Proxies still using the mapping keep it open until they are released
+        self._map = None
+
+
+def open_vault(manager, vault_path):
+    """ Open the binary vault, first converting the manager's current vault if the file doesn't exist yet.
+    @return BinaryVaultStorage
+    """
+    storage = BinaryVaultStorage(manager, vault_path)
+    if not storage.vault_path.exists():
+        accounts = manager.get_accounts()
+        if accounts and not storage.write_all(accounts):
+            raise ValueError(f"Unable to write vault {vault_path}")
+        logging.getLogger(__name__).info(f"Converted {len(accounts)} entries to {vault_path}")
+    return storage
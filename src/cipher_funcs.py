@@ -1,24 +1,130 @@
 from cryptography.fernet import Fernet
 from appconfig import AppConfig
 import hashlib
+import hmac
 import base64
+import binascii
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import machineid
 """ Utility functions for converting the secret key. """
 
+# The Fernet cipher suite is derived once and reused for every encrypt/decrypt.
+# It is re-derived only when the alt_id setting changes or invalidate_key_cache() is called.
+_cipher_suite = None
+_signing_key = None  # the HMAC half of the Fernet key, used to verify tokens without decrypting
+_cipher_alt_id = None
+_cipher_lock = threading.Lock()
+# Number of times the key has been derived (for diagnostics and tests)
+derivation_count = 0
+# Known plaintext encrypted in the vault header to check the key with a single decrypt
+kKeyCheckPlaintext = "EasyAuth key check"
+# Batches at least this large are spread over a thread pool (if workers are requested)
+kParallelThreshold = 256
+
 def encrypt(secret):
     """@param secret is the shared secret key to be encrypted"""
-    key = derive_key_from_uuid()
-    cipher_suite = Fernet(key)
+    cipher_suite = get_cipher_suite()
     encrypted_secret = cipher_suite.encrypt(secret.encode())
     return encrypted_secret.decode()  # Return as string
 
 def decrypt(encrypted_secret):
     """@param encrypted_secret is the encrypted version of the shared secret key (not simply the key itself)"""
-    key = derive_key_from_uuid()
-    cipher_suite = Fernet(key)
+    cipher_suite = get_cipher_suite()
     decrypted_secret = cipher_suite.decrypt(encrypted_secret.encode())
     return decrypted_secret.decode()  # Return as string
 
+def encrypt_many(secrets, max_workers=None):
+    """ Encrypt a batch of secrets with a single key setup.
+    @param secrets iterable of plain-text secret keys
+    @param max_workers if given, large batches are encrypted on a thread pool of this size
+    @return list of encrypted secrets (strings) in the same order
+    """
+    cipher_suite = get_cipher_suite()
+    return _map_batch(lambda secret: cipher_suite.encrypt(secret.encode()).decode(), secrets, max_workers)
+
+def decrypt_many(encrypted_secrets, max_workers=None):
+    """ Decrypt a batch of secrets with a single key setup.
+    @param encrypted_secrets iterable of encrypted secret keys
+    @param max_workers if given, large batches are decrypted on a thread pool of this size
+    @return list of plain-text secrets in the same order
+    @raise InvalidToken if any secret can't be decrypted
+    """
+    cipher_suite = get_cipher_suite()
+    return _map_batch(lambda secret: cipher_suite.decrypt(secret.encode()).decode(), encrypted_secrets, max_workers)
+
+def _map_batch(func, items, max_workers):
+    """ Apply func to every item, on a thread pool if the batch is large enough. """
+    items = list(items)
+    if max_workers and max_workers > 1 and len(items) >= kParallelThreshold:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(func, items))
+    return [func(item) for item in items]
+
+def get_cipher_suite():
+    """ Return the cached Fernet cipher suite, deriving the key if needed.
+    The key depends on the alt_id setting, so a change to alt_id invalidates the cache.
+    """
+    return _get_keys()[0]
+
+def _get_keys():
+    """ Return the cached (cipher suite, signing key), deriving them if needed. """
+    global _cipher_suite, _signing_key, _cipher_alt_id, derivation_count
+    alt_id = AppConfig().get_alt_id()
+    with _cipher_lock:
+        if _cipher_suite is None or alt_id != _cipher_alt_id:
+            key = derive_key_from_uuid()
+            _cipher_suite = Fernet(key)
+            # A Fernet key is the 16-byte signing key followed by the 16-byte encryption key
+            _signing_key = base64.urlsafe_b64decode(key)[:16]
+            _cipher_alt_id = alt_id
+            derivation_count += 1
+        return _cipher_suite, _signing_key
+
+def invalidate_key_cache():
+    """ Discard the cached cipher suite so the key is derived again on next use. """
+    global _cipher_suite, _signing_key, _cipher_alt_id
+    with _cipher_lock:
+        _cipher_suite = None
+        _signing_key = None
+        _cipher_alt_id = None
+
+def is_valid_token(encrypted_secret):
+    """ Check that an encrypted secret was produced with our key, without decrypting it.
+    Verifies the Fernet token structure and its HMAC, which is the check decrypt would do
+    before spending time on the AES decryption.
+    @param encrypted_secret is the encrypted secret key (string)
+    @return True if decrypt would accept the token
+    """
+    signing_key = _get_keys()[1]
+    try:
+        data = base64.urlsafe_b64decode(encrypted_secret.encode())
+    except (binascii.Error, ValueError, AttributeError):
+        return False
+    # version (1) + timestamp (8) + IV (16) + ciphertext (multiple of 16) + HMAC (32)
+    if len(data) < 57 or data[0] != 0x80 or (len(data) - 57) % 16 != 0:
+        return False
+    expected = hmac.new(signing_key, data[:-32], hashlib.sha256).digest()
+    return hmac.compare_digest(expected, data[-32:])
+
+def make_key_check():
+    """ Return a key-check value: the known plaintext encrypted with the current key. """
+    return encrypt(kKeyCheckPlaintext)
+
+def verify_key_check(key_check):
+    """ Check whether a key-check value was made with the current key.
+    @param key_check value from make_key_check (possibly on another machine)
+    @return True if the current key decrypts it to the known plaintext
+    """
+    try:
+        return decrypt(key_check) == kKeyCheckPlaintext
+    except Exception:
+        return False
+
+def get_derivation_count():
+    """ Accessor to the number of key derivations performed by this process. """
+    return derivation_count
+
 def derive_key_from_uuid():
     """ Derive a Fernet Key from the Machine UUID """
     config = AppConfig()
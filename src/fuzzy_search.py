@@ -0,0 +1,128 @@
+import time
+from collections import Counter
+from typing import NamedTuple
+
+""" Typo-tolerant, ranked search of the providers by name or domain.
+Names and domains are compared ignoring case, spaces and punctuation, so "micro soft" finds Microsoft.
+Candidates are the providers sharing the most trigrams with the query; they are scored by edit
+distance, where the query may match the start of a name (as it is being typed), and ranked:
+exact matches first, then prefixes, then names containing the query, then the closest misspellings.
+Each search stops scoring candidates when its time budget is spent, so it keeps up with typing.
+"""
+
+# Number of results returned
+kTopK = 10
+# Time a search may take (seconds); the candidates sharing the most trigrams are scored first
+kLatencyBudget = 0.005
+# Most candidates scored per search
+kCandidateLimit = 100
+
+# How well a provider matches, best first
+kMatchExact = 0
+kMatchPrefix = 1
+kMatchSubstring = 2
+kMatchFuzzy = 3
+
+class ProviderMatch(NamedTuple):
+    """ A search result. """
+    name: str
+    domain: str
+    match: int  # kMatchExact .. kMatchFuzzy
+    distance: int  # edit distance of the query to the (start of the) name or domain
+
+def normalize(text) -> str:
+    """ Return the text in lowercase without spaces or punctuation. """
+    return "".join(char for char in text.lower() if char.isalnum())
+
+def domain_key(domain) -> str:
+    """ Return the part of a domain worth matching: without "www." and the top-level domain. """
+    if domain.startswith("www."):
+        domain = domain[4:]
+    return normalize(domain.rsplit(".", 1)[0] if "." in domain else domain)
+
+def max_distance(length) -> int:
+    """ Return the number of typos tolerated in a query of the given length. """
+    if length <= 3:
+        return 0
+    return 1 if length <= 5 else 2
+
+def _trigrams(key):
+    """ Return the trigrams of a key; the leading space makes the start of a key count. """
+    padded = " " + key
+    return {padded[start:start + 3] for start in range(len(padded) - 2)}
+
+def prefix_distance(query, key, limit) -> int:
+    """ Return the edit distance of the query to the closest prefix of the key,
+    or limit + 1 if it is more than limit.
+    """
+    previous = list(range(len(key) + 1))  # distance of an empty query to each prefix
+    for row, query_char in enumerate(query, 1):
+        current = [row]
+        for column, key_char in enumerate(key, 1):
+            current.append(min(previous[column] + 1, current[column - 1] + 1,
+                               previous[column - 1] + (query_char != key_char)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(min(previous), limit + 1)
+
+class FuzzySearch:
+    """ Ranked search of a provider map (provider name -> {'png_filename'}). """
+
+    def __init__(self, provider_map):
+        self.names = list(provider_map)
+        self.domains = [data['png_filename'][:-len('.png')] for data in provider_map.values()]
+        # Each provider has a name key and a domain key: key number 2n is name n's, 2n + 1 its domain's
+        self.keys = []
+        for name, domain in zip(self.names, self.domains):
+            self.keys.append(normalize(name))
+            self.keys.append(domain_key(domain))
+        self._trigrams = {}  # trigram -> key numbers
+        for key_number, key in enumerate(self.keys):
+            for trigram in _trigrams(key):
+                self._trigrams.setdefault(trigram, []).append(key_number)
+
+    def _candidates(self, query):
+        """ Return the key numbers that may match the query, the most likely first. """
+        if len(query) < 3:
+            # Too short to have typos: the keys starting with the query
+            return [key_number for key_number, key in enumerate(self.keys) if key.startswith(query)]
+        shared = Counter()
+        for trigram in _trigrams(query):
+            shared.update(self._trigrams.get(trigram, ()))
+        return [key_number for key_number, _ in shared.most_common(kCandidateLimit)]
+
+    def search(self, text, limit=kTopK, budget=kLatencyBudget) -> list:
+        """ Return the providers best matching the text.
+        @param limit most results returned
+        @param budget seconds to spend; the candidates not scored by then are ignored
+        @return list of ProviderMatch, best first
+        """
+        query = normalize(text)
+        if not query:
+            return []
+        deadline = time.perf_counter() + budget
+        allowed = max_distance(len(query))
+        best = {}  # provider number -> (match, distance, key length)
+        for count, key_number in enumerate(self._candidates(query)):
+            if count % 16 == 0 and time.perf_counter() > deadline:
+                break
+            key = self.keys[key_number]
+            if key == query:
+                score = (kMatchExact, 0)
+            elif key.startswith(query):
+                score = (kMatchPrefix, 0)
+            elif query in key:
+                score = (kMatchSubstring, 0)
+            else:
+                distance = prefix_distance(query, key, allowed)
+                if distance > allowed:
+                    continue
+                score = (kMatchFuzzy, distance)
+            provider = key_number // 2
+            score += (len(key),)
+            if score < best.get(provider, (kMatchFuzzy + 1,)):
+                best[provider] = score
+        ranked = sorted(best, key=lambda provider: best[provider] + (self.names[provider].lower(),))
+        return [ProviderMatch(self.names[provider], self.domains[provider], *best[provider][:2])
+                for provider in ranked[:limit]]
@@ -0,0 +1,131 @@
+import hmac
+import hashlib
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+import pyotp
+
+import cipher_funcs
+
+""" The OTP engine generates TOTP codes for vault entries without repeating the expensive work.
+Each secret is decrypted and decoded once and its HMAC key object is kept in a bounded cache,
+so generating a code is just one HMAC over the time step counter.
+Codes for the next time step can be prefetched on a background thread shortly before
+the period boundary, so the rollover itself only swaps in the finished codes.
+"""
+
+# TOTP parameters (EasyAuth only supports SHA1, 6-digit, 30-second codes)
+kPeriod = 30
+kDigits = 6
+# Code displayed when the secret can't produce an OTP (would only happen from internal error)
+kInvalidCode = "??????"
+# How many seconds before the period boundary the next codes are prefetched
+kPrefetchLead = 5
+
+def current_time_step(for_time=None):
+    """ Return the TOTP time step (counter) for the given time, default now. """
+    if for_time is None:
+        for_time = time.time()
+    return int(for_time) // kPeriod
+
+class OtpEngine:
+    """ Computes TOTP codes for a list of accounts.
+    The cache is keyed by the encrypted secret, so an entry is invalidated
+    only when its secret changes.
+    """
+    # Maximum number of cached HMAC keys
+    kMaxEntries = 2048
+
+    def __init__(self, max_entries=kMaxEntries):
+        self.max_entries = max_entries
+        self._hmac_cache = OrderedDict()  # encrypted secret -> HMAC object keyed with the decoded secret
+        self._lock = threading.Lock()  # the cache is shared with the prefetch thread
+        # Codes computed ahead of time: (time_step, {encrypted secret: code}), replaced as a whole
+        self._prefetched = (None, {})
+        self._prefetch_thread = None
+
+    def _get_hmac(self, encrypted_secret):
+        """ Return the precomputed HMAC object for the secret, building it on first use. """
+        with self._lock:
+            try:
+                self._hmac_cache.move_to_end(encrypted_secret)
+                return self._hmac_cache[encrypted_secret]
+            except KeyError:
+                pass
+        decrypted_secret = cipher_funcs.decrypt(encrypted_secret)
+        key = pyotp.TOTP(decrypted_secret).byte_secret()
+        key_hmac = hmac.new(key, digestmod=hashlib.sha1)
+        with self._lock:
+            self._hmac_cache[encrypted_secret] = key_hmac
+            # Evict the least recently used entry if the cache is full
+            if len(self._hmac_cache) > self.max_entries:
+                self._hmac_cache.popitem(last=False)
+        return key_hmac
+
+    def code_for(self, account, time_step=None):
+        """ Return the OTP code for one account at the given time step (default current). """
+        if time_step is None:
+            time_step = current_time_step()
+        return self._code_for_secret(account.secret, time_step)
+
+    def _code_for_secret(self, encrypted_secret, time_step):
+        """ Return the OTP code for an encrypted secret at the given time step. """
+        try:
+            key_hmac = self._get_hmac(encrypted_secret).copy()
+        except Exception:
+            return kInvalidCode
+        key_hmac.update(struct.pack(">Q", time_step))
+        digest = key_hmac.digest()
+        # Dynamic truncation (RFC 4226)
+        offset = digest[-1] & 0x0F
+        code = struct.unpack(">I", digest[offset:offset + 4])[0] & 0x7FFFFFFF
+        return str(code % 10 ** kDigits).zfill(kDigits)
+
+    def codes_for_time_step(self, accounts, time_step=None):
+        """ Return the list of OTP codes for the accounts at the given time step (default current).
+        Codes that were prefetched for this time step are used without recomputing them.
+        """
+        if time_step is None:
+            time_step = current_time_step()
+        prefetched_step, prefetched_codes = self._prefetched
+        if prefetched_step != time_step:
+            prefetched_codes = {}
+        return [prefetched_codes.get(account.secret) or self.code_for(account, time_step) for account in accounts]
+
+    def prefetch(self, accounts, time_step=None):
+        """ Start computing the codes for the given time step (default next) on a background thread.
+        @param accounts the accounts whose codes will be needed
+        @return the thread doing the work, or None if a prefetch is already running
+        """
+        if self._prefetch_thread is not None and self._prefetch_thread.is_alive():
+            return None
+        if time_step is None:
+            time_step = current_time_step() + 1
+        secrets = [account.secret for account in accounts]
+        self._prefetch_thread = threading.Thread(target=self._run_prefetch, args=(secrets, time_step), daemon=True)
+        self._prefetch_thread.start()
+        return self._prefetch_thread
+
+    def _run_prefetch(self, secrets, time_step):
+        """ (Prefetch thread) Compute the codes and publish them all at once. """
+        codes = {}
+        for secret in secrets:
+            codes[secret] = self._code_for_secret(secret, time_step)
+        # Replace the whole tuple so readers never see a partial result
+        self._prefetched = (time_step, codes)
+
+    def invalidate(self, account):
+        """ Discard the cached state for the account's secret. """
+        with self._lock:
+            self._hmac_cache.pop(account.secret, None)
+
+    def clear(self):
+        """ Discard all cached state (e.g., when the encryption key changes). """
+        with self._lock:
+            self._hmac_cache.clear()
+        self._prefetched = (None, {})
+
+    def __len__(self):
+        return len(self._hmac_cache)
@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import sys
+import zipfile
+from typing import NamedTuple
+from urllib.parse import urlparse
+
+""" A prebuilt index of the providers, generated by build.sh, so startup doesn't have to parse,
+sort and derive the favicon names of every record in providers.json.
+The index is a tab-separated text file read with a single read.  Its first line identifies the
+format and records the size and modification time of the providers.json and favicons.zip it was built
+from; an index that doesn't match the files is ignored and the providers are read from the JSON instead.
+In the packaged app the assets can't change (and extracting them changes their times), so it isn't checked.
+Each following line is a provider, sorted by normalized name:
+    name, normalized name, domain, and the zip member's header offset, compressed size and compression method
+    (so a favicon can be read without loading the zip file's directory; -1 if the zip doesn't have it).
+
+To build it:  python src/provider_index.py [assets directory]
+"""
+
+kIndexVersion = "EasyAuth provider index 3"
+kIndexFilename = "providers.idx"
+
+class ProviderEntry(NamedTuple):
+    """ A provider in the index. """
+    name: str
+    key: str  # normalized name, for sorting and searching
+    domain: str  # the favicon is <domain>.png
+    offset: int = -1  # of the favicon's local header in the zip file
+    compress_size: int = 0
+    compress_type: int = zipfile.ZIP_STORED
+
+    @property
+    def png_filename(self):
+        return self.domain + '.png'
+
+def normalize_name(name) -> str:
+    """ Return the key a provider name is sorted and searched by. """
+    return name.strip().lower()
+
+def index_path_for(providers_path) -> str:
+    """ Return the path of the index built from the providers file (in the same directory). """
+    return os.path.join(os.path.dirname(providers_path), kIndexFilename)
+
+def entries_from_json(providers_path, zip_file=None) -> list:
+    """ Read the providers from providers.json.
+    @param zip_file the open favicons ZipFile, to record where each favicon is (optional)
+    @return list of ProviderEntry sorted by key; a name listed more than once gets its last record
+    @raise OSError if the file can't be read
+    """
+    with open(providers_path, 'r') as f:
+        json_data = json.load(f)
+    entries = []
+    for record in json_data:
+        name = record['provider_name']
+        domain = urlparse(record['website']).netloc
+        entry = ProviderEntry(name, normalize_name(name), domain)
+        if zip_file is not None:
+            try:
+                info = zip_file.getinfo(entry.png_filename)
+                entry = entry._replace(offset=info.header_offset, compress_size=info.compress_size,
+                                       compress_type=info.compress_type)
+            except KeyError:
+                pass
+        entries.append(entry)
+    entries.sort(key=lambda entry: entry.key)
+    by_name = {}
+    for entry in entries:
+        by_name[entry.name] = entry
+    return list(by_name.values())
+
+def _source_stamps(providers_path, zip_path):
+    """ Return the size and modification time of the files an index is built from ("" for a missing file). """
+    stamps = []
+    for path in (providers_path, zip_path):
+        try:
+            stat = os.stat(path)
+            stamps.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+        except OSError:
+            stamps.append("")
+    return stamps
+
+def write_index(providers_path, zip_path, index_path=None) -> int:
+    """ Build the index of providers.json and favicons.zip.
+    @param index_path where to write it (default: next to providers.json)
+    @return number of providers in the index
+    """
+    index_path = index_path or index_path_for(providers_path)
+    with zipfile.ZipFile(zip_path, 'r') as zip_file:
+        entries = entries_from_json(providers_path, zip_file)
+    lines = ["\t".join([kIndexVersion] + _source_stamps(providers_path, zip_path))]
+    for entry in entries:
+        fields = [str(field) for field in entry]
+        if any(char in field for field in fields for char in "\t\n"):
+            raise ValueError(f"Provider {entry.name!r} can't be stored in the index")
+        lines.append("\t".join(fields))
+    temp_path = index_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(temp_path, index_path)
+    return len(entries)
+
+def read_index(providers_path, zip_path, index_path=None):
+    """ Read the index, if there is a current one.
+    @return list of ProviderEntry sorted by key, or None if the index is missing, invalid or out of date
+    """
+    index_path = index_path or index_path_for(providers_path)
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    header = lines[0].split("\t") if lines else []
+    if getattr(sys, 'frozen', False):
+        current = header[:1] == [kIndexVersion]  # the packaged assets don't change
+    else:
+        current = header == [kIndexVersion] + _source_stamps(providers_path, zip_path)
+    if not current:
+        logging.getLogger(__name__).info(f"Provider index {index_path} is out of date, using {providers_path}")
+        return None
+    try:
+        entries = []
+        for line in lines[1:]:
+            name, key, domain, offset, compress_size, compress_type = line.split("\t")
+            entries.append(ProviderEntry(name, key, domain, int(offset), int(compress_size), int(compress_type)))
+    except ValueError as e:
+        logging.getLogger(__name__).warning(f"Invalid provider index {index_path}: {e}")
+        return None
+    return entries
+
+
+if __name__ == '__main__':
+    assets = sys.argv[1] if len(sys.argv) > 1 else "assets"
+    count = write_index(os.path.join(assets, "providers.json"), os.path.join(assets, "favicons.zip"))
+    print(f"Wrote {count} providers to {index_path_for(os.path.join(assets, 'providers.json'))}")
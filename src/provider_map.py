@@ -1,15 +1,281 @@
-import json
 import logging
 import os
+import struct
+import threading
 import zipfile
+import zlib
+from bisect import bisect_left
+from collections import OrderedDict
 
-from urllib.parse import urlparse
-
-from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import QByteArray
-from PyQt5.QtWidgets import QLabel, QApplication
+from PyQt5.QtGui import QPixmap, QPainter, QColor, QFont, QGuiApplication
+from PyQt5.QtCore import QByteArray, QRect, Qt, QStringListModel
+from PyQt5.QtWidgets import QLabel, QApplication, QCompleter
 from appconfig import AppConfig
 from utils import assets_dir
+import provider_index
+from fuzzy_search import FuzzySearch
+
+# Number of favicon images (raw PNG bytes) kept in memory after they are read from the zip file
+# (at least; the cache holds one for every provider, so listing them all doesn't evict the first ones)
+kImageCacheSize = 256
+# Number of decoded favicon pixmaps kept (different sizes and pixel ratios are separate entries;
+# at least one per provider, like the images)
+kPixmapCacheSize = 512
+# Number of letter badges kept
+kBadgeCacheSize = 64
+# Size (width and height) of a favicon in device-independent pixels
+kIconSize = 16
+# Longest n-gram in the search index; a substring query checks only the names containing all its n-grams
+kGramSize = 3
+# Local file header of a zip member (see the zip file format specification)
+kZipLocalHeader = struct.Struct("<4s2B4HL2L2H")
+kZipLocalHeaderMagic = b"PK\003\004"
+
+class PixmapCache:
+    """ Pixmaps by key, the least recently used being dropped when there are too many.
+    Counts the hits and misses.  Pixmaps are only made on the GUI thread, so it isn't locked.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._pixmaps = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, create):
+        """ Return the pixmap for the key, calling create() to make it if it isn't cached.
+        @param create function returning the pixmap (or None, which is cached too)
+        """
+        try:
+            pixmap = self._pixmaps[key]
+        except KeyError:
+            self.misses += 1
+            pixmap = self._pixmaps[key] = create()
+            if len(self._pixmaps) > self.max_size:
+                self._pixmaps.popitem(last=False)
+            return pixmap
+        self.hits += 1
+        self._pixmaps.move_to_end(key)
+        return pixmap
+
+    def get_stats(self) -> dict:
+        """ Return the cache statistics: number of pixmaps cached, hits and misses. """
+        return {"size": len(self._pixmaps), "hits": self.hits, "misses": self.misses}
+
+class ProviderSearchIndex:
+    """ Finds provider names by prefix or by substring, ignoring case, without scanning every name.
+    The lowercase names are kept in a sorted array that is searched with bisect for a prefix,
+    and each n-gram (substring of 1 to kGramSize characters) lists the names containing it.
+    Results are in the order the names were given (the provider map's order).
+    """
+    def __init__(self, names):
+        self.names = list(names)
+        self.keys = [name.lower() for name in self.names]
+        self._sorted_positions = sorted(range(len(self.keys)), key=lambda position: self.keys[position])
+        self._sorted_keys = [self.keys[position] for position in self._sorted_positions]
+        self._grams = {}  # n-gram -> positions of the names containing it, ascending
+        for position, key in enumerate(self.keys):
+            for gram in _grams_of(key, range(1, kGramSize + 1)):
+                self._grams.setdefault(gram, []).append(position)
+
+    def prefix(self, text) -> list:
+        """ Return the names starting with the text. """
+        text = text.lower()
+        start = bisect_left(self._sorted_keys, text)
+        positions = []
+        for index in range(start, len(self._sorted_keys)):
+            if not self._sorted_keys[index].startswith(text):
+                break
+            positions.append(self._sorted_positions[index])
+        return [self.names[position] for position in sorted(positions)]
+
+    def contains(self, text) -> list:
+        """ Return the names containing the text. """
+        text = text.lower()
+        if not text:
+            return list(self.names)
+        if len(text) <= kGramSize:
+            return [self.names[position] for position in self._grams.get(text, [])]
+        # Candidates have every n-gram of the text; start with the rarest
+        postings = sorted((self._grams.get(gram, []) for gram in _grams_of(text, (kGramSize,))), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(posting)
+        return [self.names[position] for position in sorted(candidates) if text in self.keys[position]]
+
+def _grams_of(text, lengths):
+    """ Return the set of substrings of the text with the given lengths. """
+    return {text[start:start + length] for length in lengths for start in range(len(text) - length + 1)}
+
+
+class ProviderCompleter(QCompleter):
+    """ Completes a provider name from the names containing the typed text.
+    The matches are looked up in the search index and become the completer's model,
+    so Qt doesn't filter the whole provider list on each keystroke.
+    """
+    def __init__(self, search_index, parent=None):
+        super().__init__(parent)
+        self.search_index = search_index
+        self.setModel(QStringListModel(self))
+        self.setCaseSensitivity(Qt.CaseInsensitive)
+        self.setFilterMode(Qt.MatchContains)
+
+    def splitPath(self, path):
+        # Called with the typed text before the model is filtered
+        self.model().setStringList(self.search_index.contains(path))
+        return [path]
+
+
+class ProviderRegistry:
+    """ The provider list and favicon images, shared by every Providers object that uses the same files.
+    Nothing is read until it is first needed: the provider list is built once, the zip file
+    is kept open, and each favicon is read from it on first request and kept in a bounded
+    least-recently-used cache.
+    When build.sh has made a current provider index (see provider_index) the provider list is read
+    from it, and favicons are read directly at the offsets it records, without reading the zip directory.
+    """
+    _registries = {}  # (zip path, providers path) -> ProviderRegistry
+    _registries_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, zip_path, providers_path):
+        """ Return the registry for the given files, creating it on first use. """
+        key = (zip_path, providers_path)
+        with cls._registries_lock:
+            registry = cls._registries.get(key)
+            if registry is None:
+                registry = cls._registries[key] = ProviderRegistry(zip_path, providers_path)
+        return registry
+
+    def __init__(self, zip_path, providers_path):
+        """ @param zip_path path of the zip file of favicons (named <domain>.png)
+            @param providers_path path of the JSON list of providers
+        """
+        self.logger = logging.getLogger(__name__)
+        self.zip_path = zip_path
+        self.providers_path = providers_path
+        self._lock = threading.Lock()  # the zip file and cache may be used from more than one thread
+        self._zip = None
+        self._zip_file = None  # the zip file opened for direct reads of indexed members
+        self._members = {}  # png filename -> ProviderEntry, when the provider index was used
+        self._provider_map = None
+        self._search_index = None
+        self._fuzzy_search = None
+        self._images = OrderedDict()  # png filename -> raw image, least recently used first
+        self._image_cache_size = kImageCacheSize
+        self.pixmaps = PixmapCache(kPixmapCacheSize)  # (provider, size, device pixel ratio) -> QPixmap
+
+    def _open_zip(self):
+        """ Open the zip file (once).
+        @return the ZipFile, or None if it doesn't exist
+        """
+        if self._zip is None:
+            try:
+                self._zip = zipfile.ZipFile(self.zip_path, 'r')
+            except FileNotFoundError:
+                self.logger.warning(f"Missing favicons.zip file {self.zip_path}- no favicons will be displayed.")
+                self._zip = False  # don't try again
+        return self._zip or None
+
+    def get_map(self):
+        """ Return the map with provider_name as key and {'png_filename'} as value, building it on first use. """
+        with self._lock:
+            if self._provider_map is None:
+                self._provider_map = self._build_map()
+                self._image_cache_size = max(kImageCacheSize, len(self._provider_map))
+                self.pixmaps.max_size = max(kPixmapCacheSize, len(self._provider_map))
+            return self._provider_map
+
+    def get_search_index(self):
+        """ Return the ProviderSearchIndex of the provider names, building it on first use. """
+        provider_map = self.get_map()
+        with self._lock:
+            if self._search_index is None:
+                self._search_index = ProviderSearchIndex(provider_map)
+            return self._search_index
+
+    def get_fuzzy_search(self):
+        """ Return the FuzzySearch of the providers, building it on first use. """
+        provider_map = self.get_map()
+        with self._lock:
+            if self._fuzzy_search is None:
+                self._fuzzy_search = FuzzySearch(provider_map)
+            return self._fuzzy_search
+
+    def _build_map(self):
+        """ Build a map with provider_name as key and the favicon's file name as value, sorted by name.
+        This facilitates looking up a favicon given the provider name
+        """
+        entries = provider_index.read_index(self.providers_path, self.zip_path)
+        if entries is None:
+            entries = self._read_providers_json()
+        else:
+            self._members = {entry.png_filename: entry for entry in entries if entry.offset >= 0}
+        # Build a map of provider name to image file name
+        return {entry.name: {'png_filename': entry.png_filename} for entry in entries}
+
+    def _read_providers_json(self):
+        """ Read the provider list from providers.json.
+        @return list of ProviderEntry sorted by name (empty if there are no favicons or no providers file)
+        """
+        # Without images, no providers are listed
+        zip_file = self._open_zip()
+        if zip_file is None or len(zip_file.namelist()) == 0:
+            return []
+        try:
+            return provider_index.entries_from_json(self.providers_path)
+        except FileNotFoundError:
+            self.logger.warning(f"Missing providers.json file {self.providers_path}- no favicons will be displayed.")
+            return []
+
+    def _read_member(self, entry):
+        """ Read a zip member at the offset recorded in the provider index.
+        @return the member's data, or None if it isn't where the index says
+        """
+        try:
+            if self._zip_file is None:
+                self._zip_file = open(self.zip_path, 'rb')
+            self._zip_file.seek(entry.offset)
+            header = kZipLocalHeader.unpack(self._zip_file.read(kZipLocalHeader.size))
+            if header[0] != kZipLocalHeaderMagic:
+                return None
+            name_length, extra_length = header[-2:]
+            name = self._zip_file.read(name_length)
+            if name.decode('utf-8', errors='replace') != entry.png_filename:
+                return None
+            self._zip_file.seek(extra_length, os.SEEK_CUR)
+            data = self._zip_file.read(entry.compress_size)
+            if entry.compress_type == zipfile.ZIP_DEFLATED:
+                return zlib.decompress(data, -zlib.MAX_WBITS)
+            return data if entry.compress_type == zipfile.ZIP_STORED else None
+        except (OSError, struct.error, zlib.error) as e:
+            self.logger.debug(f"Reading {entry.png_filename} at its indexed offset failed: {e}")
+            return None
+
+    def read_image(self, png_filename):
+        """ Return the raw image data of a favicon (or None if the zip file doesn't have it). """
+        with self._lock:
+            raw_image = self._images.get(png_filename)
+            if raw_image is not None:
+                self._images.move_to_end(png_filename)
+                return raw_image
+            entry = self._members.get(png_filename)
+            if entry is not None:
+                raw_image = self._read_member(entry)
+            if raw_image is None:
+                zip_file = self._open_zip()
+                if zip_file is None:
+                    return None
+                try:
+                    raw_image = zip_file.read(png_filename)
+                except KeyError:
+                    return None
+            self._images[png_filename] = raw_image
+            if len(self._images) > self._image_cache_size:
+                self._images.popitem(last=False)
+            return raw_image
+
 
 class Providers:
     """ Providers represents a static list of known online services that use 2FA via one-time passwords.
@@ -17,8 +283,10 @@ class Providers:
     A provider has a name, a website, and a favorite icon.
     The provider name and website(domain) are loaded from a JSON file.
     The favorite icon is loaded from a zip file.
+    Constructing a Providers is cheap: the data is read once, on demand, by the shared ProviderRegistry.
     """
     logwriter = logging.getLogger(__name__)
+    badges = PixmapCache(kBadgeCacheSize)  # (letter, size, device pixel ratio) -> QPixmap
 
     def __init__(self):
         self.appconfig = AppConfig()
@@ -26,93 +294,137 @@ class Providers:
 
         self.kZipPath = os.path.join(assets_dir(), "favicons.zip")
         self.kProvidersPath = os.path.join(assets_dir(), "providers.json")
-        # Initialize the map of providers
-        self.provider_map = self._build_map()
+        self._provider_map = None  # the registry's map unless one is assigned
+        self._search_index = None  # index of an assigned map
+        self._fuzzy_search = None  # search of an assigned map
 
-    def _load_imgdict_from_zipimages(self):
-        """
-        Loads images from a ZIP file into a dictionary where the key is the file name
-        and the value is a QPixmap.
+    @property
+    def registry(self):
+        """ The shared registry of the provider files. """
+        return ProviderRegistry.shared(self.kZipPath, self.kProvidersPath)
 
-        Returns:
-            dict: Dictionary with file names as keys and raw image data as values.
-        """
-        image_dict = {}
+    @property
+    def provider_map(self):
+        """ Map with provider_name as key and {'png_filename'} as value. """
+        if self._provider_map is None:
+            return self.registry.get_map()
+        return self._provider_map
 
-        try:
-            with zipfile.ZipFile(self.kZipPath, 'r') as z:
-                for name in z.namelist():
-                    # process each item in the zip file
-                    with z.open(name) as file:
-                        # Read image data into a QByteArray
-                        image_dict[name] = file.read()
-        except FileNotFoundError:
-            Providers.logwriter.warning(f"Missing favicons.zip file {self.kZipPath}- no favicons will be displayed.")
-        return image_dict
+    @provider_map.setter
+    def provider_map(self, value):
+        self._provider_map = value
+        self._search_index = None
+        self._fuzzy_search = None
+
+    @property
+    def search_index(self):
+        """ The ProviderSearchIndex of the provider names. """
+        if self._provider_map is None:
+            return self.registry.get_search_index()
+        if self._search_index is None:
+            self._search_index = ProviderSearchIndex(self._provider_map)
+        return self._search_index
+
+    @property
+    def fuzzy_search(self):
+        """ The typo-tolerant FuzzySearch of the providers. """
+        if self._provider_map is None:
+            return self.registry.get_fuzzy_search()
+        if self._fuzzy_search is None:
+            self._fuzzy_search = FuzzySearch(self._provider_map)
+        return self._fuzzy_search
 
     def _build_map(self):
         """
-        Build a map with provider_name as key and (domain,raw_image) as value.
+        Return the map with provider_name as key and {'png_filename'} as value.
         This facilitates looking up a favicon given the provider name
         """
-        # Create an empty dictionary to store the mapping
-        provider_map = {}
-
-        # Retrieve the dictionary of images
-        img_dict = self._load_imgdict_from_zipimages()
-        # If no images were retrieved, return empty map
-        if len(img_dict) == 0:
-            return {}
+        return self.registry.get_map()
 
-        # Populate the dictionary with provider_name as key and domain,raw_image as value
+    def get_raw_image(self, provider):
+        """ Return the raw favicon image of a provider (or None if there isn't one). """
         try:
-            f = open(self.kProvidersPath, 'r')
-        except FileNotFoundError:
-            Providers.logwriter.warning(f"Missing providers.json file {self.kProvidersPath}- no favicons will be displayed.")
-            return {}
-        json_data = json.load(f)
-        # Sort the data dictionary by 'provider_name'
-        sorted_data = sorted(json_data, key=lambda x: x['provider_name'].lower())
-        # Build a map of provider name to domain and image
-        for record in sorted_data:
-            provider_name = record['provider_name']
-            website = record['website']
-            png_filename = urlparse(website).netloc + '.png'
-            provider_map[provider_name] = {'png_filename':png_filename, 'raw_image':img_dict[png_filename]}
-
-        return provider_map
+            png_filename = self.provider_map[provider]['png_filename']
+        except KeyError:
+            return None
+        return self.registry.read_image(png_filename)
 
     @staticmethod
-    def make_pixmap(raw_img):
+    def make_pixmap(raw_img, size=kIconSize, device_pixel_ratio=1.0):
         """ Convert raw image into pixmap.
         @param raw binary image data
-        @return 16x16 pixmap
+        @param size width and height of the pixmap in device-independent pixels
+        @param device_pixel_ratio of the screen the pixmap is shown on
+        @return size x size pixmap (default 16x16)
         """
         # Read image data into a QByteArray
         pixmap = QPixmap()
         image_data = QByteArray(raw_img)
         # Load QPixmap from QByteArray
         pixmap.loadFromData(image_data)
-        pixmap = pixmap.scaled(16, 16)
+        pixels = round(size * device_pixel_ratio)
+        pixmap = pixmap.scaled(pixels, pixels)
+        pixmap.setDevicePixelRatio(device_pixel_ratio)
+        return pixmap
+
+    @staticmethod
+    def make_letter_badge(letter, size=kIconSize, device_pixel_ratio=1.0):
+        """ Paint the badge shown instead of a favicon: the letter in white on a colored circle.
+        @return size x size pixmap (default 16x16)
+        """
+        pixels = round(size * device_pixel_ratio)
+        pixmap = QPixmap(pixels, pixels)
+        pixmap.setDevicePixelRatio(device_pixel_ratio)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(get_color_for_letter(letter)))
+        painter.drawEllipse(0, 0, size, size)
+        font = QFont()
+        font.setPixelSize(size * 3 // 4)  # 12px on a 16px badge
+        font.setBold(True)
+        painter.setFont(font)
+        painter.setPen(QColor("white"))
+        painter.drawText(QRect(0, 0, size, size), Qt.AlignCenter, letter)
+        painter.end()
         return pixmap
 
-    def get_provider_icon_pixmap(self, provider):
-        """ Lookup the icon for a given provider."""
+    def get_provider_icon_pixmap(self, provider, size=kIconSize, device_pixel_ratio=None):
+        """ Lookup the icon for a given provider.
+        The decoded pixmaps are cached, shared by all Providers objects.
+        @param size width and height of the icon in device-independent pixels
+        @param device_pixel_ratio of the screen (default: the application's)
+        @return QPixmap, or None if there isn't an icon for the provider
+        """
         # REFS: https://favicon.im/  https://opendata.stackexchange.com/questions/14007/list-of-top-10k-websites-and-their-favicons
         # https://github.com/opendns/public-domain-lists/blob/master/opendns-top-domains.txt
         # https://pypi.org/project/favicon/
-        try:
-            img_raw = self.provider_map[provider]['raw_image']
-        except KeyError:
+        if provider not in self.provider_map:
             return None
-        pixmap = self.make_pixmap(img_raw)
-        return pixmap
+        if device_pixel_ratio is None:
+            device_pixel_ratio = _app_device_pixel_ratio()
+        def decode():
+            img_raw = self.get_raw_image(provider)
+            return None if img_raw is None else self.make_pixmap(img_raw, size, device_pixel_ratio)
+        return self.registry.pixmaps.get((provider, size, device_pixel_ratio), decode)
+
+    def get_letter_badge(self, letter, size=kIconSize, device_pixel_ratio=None):
+        """ Return the badge of a letter (see make_letter_badge), cached. """
+        if device_pixel_ratio is None:
+            device_pixel_ratio = _app_device_pixel_ratio()
+        return Providers.badges.get((letter, size, device_pixel_ratio),
+                                    lambda: self.make_letter_badge(letter, size, device_pixel_ratio))
+
+    def get_cache_stats(self) -> dict:
+        """ Return the statistics of the shared favicon pixmap cache: size, hits and misses. """
+        return self.registry.pixmaps.get_stats()
 
     def get_provider_icon(self,provider):
         """ Retrieve the icon for the given provider.
         @param provider string name of the provider.
         @return If provider exists in the provider map, returns a QLabel with the icon.
-        Otherwise, returns a label with the first letter of provider name.
+        Otherwise, returns a label with a badge of the first letter of provider name.
         """
         my_icon_label = QLabel()
         provider_icon_pixmap = self.get_provider_icon_pixmap(provider)
@@ -123,26 +435,15 @@ class Providers:
         else:
             # IF icon not available show the first letter of provider's name
             provider_initial = provider[0]  # get first letter of provider name
-            my_icon_label.setText(provider_initial + '')
-            color_name = get_color_for_letter(provider_initial)
-            css_string = "QLabel { border: 1px solid " + color_name + "; "
-            css_string += "border-radius: 8px; color: white; background-color: "
-            css_string += color_name + "; "
-            css_string += "font-size: 12px;font-weight: bold;text-align: center;}"
-            my_icon_label.setStyleSheet(css_string)
-            """
-                QLabel {
-                border: 1px solid #488AC7;  /* 'silk blue' */
-                border-radius: 8px;
-                color: white;
-                background-color: #488AC7;
-                font-size: 12px;
-                font-weight: bold;
-                text-align: center;
-                }
-            """
+            my_icon_label.setPixmap(self.get_letter_badge(provider_initial))
+            my_icon_label.setAccessibleName(provider_initial)
         return my_icon_label
 
+def _app_device_pixel_ratio():
+    """ Return the device pixel ratio of the application's primary screen (1.0 without an application). """
+    app = QGuiApplication.instance()
+    return app.devicePixelRatio() if app is not None else 1.0
+
 def get_color_for_letter(letter):
     """
     Provides a mapping of colors for each letter of the alphabet.
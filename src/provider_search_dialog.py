@@ -3,7 +3,6 @@ import sys
 
 import pyperclip
 from PyQt5.QtCore import Qt, QEvent
-from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import (QVBoxLayout, QLineEdit, QTableWidget,
                              QTableWidgetItem, QHeaderView, QApplication, QLabel, QDialog)
 
@@ -33,6 +32,19 @@ class SearchBox(QLineEdit):
         if self.parent and hasattr(self.parent, 'clear_table_selection'):
             self.parent.clear_table_selection()
 
+class ProviderIconItem(QTableWidgetItem):
+    """ The icon cell of a provider; the favicon is read the first time the cell is displayed. """
+    def __init__(self, providers, provider):
+        super().__init__()
+        self.providers = providers
+        self.provider = provider
+
+    def data(self, role):
+        if role == Qt.DecorationRole:
+            # None (no icon) if the provider doesn't have a favicon
+            return self.providers.get_provider_icon_pixmap(self.provider)
+        return super().data(role)
+
 class ProviderSearchDialog(QDialog):
     """ A dialog to display a static list of known providers.  Offers a search field
     to lookup a user-entered provider.  This dialog is only for reference and plays
@@ -46,6 +58,7 @@ class ProviderSearchDialog(QDialog):
         self.logger = logging.getLogger(__name__)
         self.providers = provider_map.Providers()
         self.all_items = []  # Will store all items for filtering
+        self.items_by_provider = {}  # provider name -> item of all_items
         self.setup_ui()
         self.resize(600, 400)
         self.setWindowTitle("Provider Search")
@@ -138,10 +151,11 @@ class ProviderSearchDialog(QDialog):
         try:
             for provider_name, data in self.providers.provider_map.items():
                 # assemble a list item from the components of a provider entry
+                # the icon is read when the row is displayed
                 domain = data['png_filename']
-                raw_image = data['raw_image']
-                list_item = {"icon": raw_image, "provider": provider_name, "domain": domain}
+                list_item = {"provider": provider_name, "domain": domain}
                 self.all_items.append(list_item)
+                self.items_by_provider[provider_name] = list_item
         except Exception as ex:
             self.logger.warning(f"Table initialization failed. {ex}")
             return
@@ -151,11 +165,7 @@ class ProviderSearchDialog(QDialog):
         self.table.setRowCount(len(items))
         for row, item in enumerate(items):
             # Icon
-            icon_item = QTableWidgetItem()
-            icon = QIcon()
-            icon.addPixmap(self.providers.get_provider_icon_pixmap(item['provider']))
-            icon_item.setIcon(icon)
-            self.table.setItem(row, 0, icon_item)
+            self.table.setItem(row, 0, ProviderIconItem(self.providers, item['provider']))
             
             # Provider
             provider_item = QTableWidgetItem(item['provider'])
@@ -168,12 +178,14 @@ class ProviderSearchDialog(QDialog):
             self.table.setItem(row, 2, domain_item)
 
     def filter_items(self):
-        search_text = self.search_box.text().lower()
-        filtered_items = [
-            item for item in self.all_items
-            #if search_text in item['provider'].lower()
-            if item['provider'].lower().startswith(search_text.lower())
-        ]
+        search_text = self.search_box.text()
+        # Providers whose name starts with the search text
+        filtered_items = [self.items_by_provider[name] for name in self.providers.search_index.prefix(search_text)
+                          if name in self.items_by_provider]
+        if not filtered_items:
+            # Maybe it's misspelled or part of a domain: show the closest matches, best first
+            filtered_items = [self.items_by_provider[match.name] for match in self.providers.fuzzy_search.search(search_text)
+                              if match.name in self.items_by_provider]
         self.populate_table(filtered_items)
         
         # If exactly one item remains, select it
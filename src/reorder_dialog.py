@@ -46,8 +46,7 @@ class CustomListWidget(QListWidget):
             # moving the item from original spot to new spot
             parent = self.parentWidget()
             if isinstance(parent, ReorderDialog):
-                account = parent.accounts.pop(self.dragged_row)
-                parent.accounts.insert(target_row, account)
+                parent.move_account(self.dragged_row, target_row)
         else:
             event.ignore()
 
@@ -58,6 +57,8 @@ class ReorderDialog(QDialog):
         super().__init__(parent)
         # Create copies of each account
         self.accounts = AccountManager.duplicate_accounts(accounts)
+        # The original position of each account, in the current order
+        self.positions = list(range(len(self.accounts)))
         self.setWindowTitle("Reorder Vault Entries")
         self.resize(500, 300)
         self.setup_ui()
@@ -101,15 +102,23 @@ class ReorderDialog(QDialog):
             item = QListWidgetItem(display_text)
             self.list_widget.addItem(item)
 
+    def move_account(self, from_row, to_row):
+        """ Move an account to a different spot in the list. """
+        self.accounts.insert(to_row, self.accounts.pop(from_row))
+        self.positions.insert(to_row, self.positions.pop(from_row))
+
     def get_ordered_accounts(self):
         """ Accessor to the final list. """
         return self.accounts
 
+    def get_order(self):
+        """ Accessor to the final order, as positions in the list of accounts the dialog was given. """
+        return self.positions
+
 
 # Local main for unit testing
 if __name__ == '__main__':
     import sys
-    from dataclasses import asdict
 
     app = QApplication(sys.argv)
     mgr = AccountManager()
@@ -118,7 +127,7 @@ if __name__ == '__main__':
         accounts = dialog.get_ordered_accounts()
         print (f"First account: {accounts[0].issuer}")
         [print (item.issuer) for item in accounts]
-        account_dicts = [asdict(account) for account in accounts]
+        account_dicts = [account.to_dict() for account in accounts]
         json_str = json.dumps(account_dicts)
         print(json_str)
         #mgr.set_accounts(json_str)
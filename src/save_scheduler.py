@@ -0,0 +1,108 @@
+import logging
+import threading
+import time
+
+""" Write-behind saving of the vault.
+Instead of rewriting the vault after every change, a change marks the vault dirty and
+a save is scheduled a short time later on a background thread.  Changes made while a
+save is pending are written by that same save, so a burst of changes costs one rewrite.
+"""
+
+# Seconds to wait after the first unsaved change before writing the vault
+kSaveDelay = 1.0
+# Longest wait (seconds) before retrying a failed save; the wait doubles after each failure
+kMaxRetryDelay = 60.0
+
+class SaveScheduler:
+    """ Coalesces save requests and performs them on a background thread. """
+
+    def __init__(self, save_func, delay=kSaveDelay):
+        """ @param save_func function that writes the vault and returns True on success
+            @param delay seconds between the first unsaved change and the save
+        """
+        self.logger = logging.getLogger(__name__)
+        self.save_func = save_func
+        self.delay = delay
+        self._lock = threading.Lock()  # guards the state below
+        self._save_lock = threading.Lock()  # one save at a time (timer thread or flush)
+        self._timer = None
+        self._pending = 0  # changes requested since the last successful save
+        self._failures = 0  # saves failed in a row
+        self._first_pending_time = None  # when the oldest unsaved change was requested
+        self.flush_count = 0  # number of saves performed
+        self.last_flush_latency = None  # seconds from the oldest unsaved change until it was saved
+        self.last_save_duration = None  # seconds the last save took
+
+    def request_save(self):
+        """ Mark the vault dirty and schedule a save if one isn't already scheduled. """
+        with self._lock:
+            self._pending += 1
+            if self._first_pending_time is None:
+                self._first_pending_time = time.monotonic()
+            self._schedule(self.delay)
+
+    def _schedule(self, delay):
+        """ Start the timer of a save unless one is already scheduled.  Call with _lock held. """
+        if self._timer is None:
+            self._timer = threading.Timer(delay, self._run_scheduled)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> bool:
+        """ Save now (on the calling thread) if there are unsaved changes.
+        @return True if there is nothing left to save
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        return self._save()
+
+    def _run_scheduled(self):
+        """ (Timer thread) Perform the scheduled save. """
+        with self._lock:
+            self._timer = None
+        self._save()
+
+    def _save(self) -> bool:
+        """ Write the vault if it is dirty and record the timing statistics. """
+        with self._save_lock:
+            with self._lock:
+                pending = self._pending
+                first_pending_time = self._first_pending_time
+            if pending == 0:
+                return True
+            start = time.monotonic()
+            if not self.save_func():
+                with self._lock:
+                    self._failures += 1
+                    retry_delay = min(self.delay * 2 ** self._failures, kMaxRetryDelay)
+                    self._schedule(retry_delay)
+                self.logger.error(f"Scheduled save failed, {pending} changes still pending, retrying in {retry_delay:.1f}s")
+                return False
+            done = time.monotonic()
+            with self._lock:
+                # Changes requested while saving may not have been written; they stay pending
+                # (and a save for them is already scheduled).
+                self._pending -= pending
+                self._failures = 0
+                self._first_pending_time = None if self._pending == 0 else start
+                self.flush_count += 1
+                self.last_flush_latency = done - first_pending_time
+                self.last_save_duration = done - start
+            self.logger.debug(f"Saved {pending} changes in {self.last_save_duration:.3f}s")
+            return True
+
+    @property
+    def pending_changes(self) -> int:
+        """ Number of changes not yet written to the vault. """
+        return self._pending
+
+    def get_stats(self) -> dict:
+        """ Return the scheduler statistics: pending changes, saves performed, and timings (seconds). """
+        return {
+            "pending_changes": self._pending,
+            "flush_count": self.flush_count,
+            "last_flush_latency": self.last_flush_latency,
+            "last_save_duration": self.last_save_duration,
+        }
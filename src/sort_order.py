@@ -0,0 +1,59 @@
+""" Orderings of the vault entries for display.
+Sorting doesn't change the vault: the display puts the entries in the order of the chosen sort mode,
+and the vault keeps the user's custom order until a sorted order is applied to it.
+The sort keys of each account are computed once and reused while the account's fields don't change.
+"""
+
+# The sort modes
+kSortCustom = 'custom'  # the order of the entries in the vault
+kSortAlphabetical = 'alphabetical'  # by provider, ignoring case
+kSortRecency = 'recency'  # most recently used first
+kSortFrequency = 'frequency'  # most used first
+kSortModes = (kSortCustom, kSortAlphabetical, kSortRecency, kSortFrequency)
+
+def timestamp_key(last_used) -> int:
+    """ Convert a last_used time ("YYYY-MM-DD HH:MM:SS", seconds or minutes may be missing) to a number
+    that orders the same way, e.g. 20250101120000.
+    """
+    digits = "".join(char for char in str(last_used) if char.isdigit())[:14]
+    return int(digits.ljust(14, "0")) if digits else 0
+
+class SortKeyCache:
+    """ Computes display orders of a list of accounts, caching each account's sort keys. """
+
+    def __init__(self):
+        # id of account -> (account, issuer, last_used, used_frequency, (lowercased issuer, timestamp, frequency))
+        self._keys = {}
+
+    def _keys_of(self, accounts):
+        """ Return the sort keys of each account, computing only those of new or changed accounts. """
+        cache = {}
+        keys = []
+        for account in accounts:
+            entry = self._keys.get(id(account))
+            if (entry is None or entry[0] is not account or entry[1] != account.issuer
+                    or entry[2] != account.last_used or entry[3] != account.used_frequency):
+                entry = (account, account.issuer, account.last_used, account.used_frequency,
+                         (account.issuer.lower(), timestamp_key(account.last_used), account.used_frequency))
+            cache[id(account)] = entry
+            keys.append(entry[4])
+        self._keys = cache  # accounts no longer in the list are dropped
+        return keys
+
+    def order(self, accounts, mode) -> list:
+        """ Return the positions of the accounts in the order of the sort mode.
+        Entries that compare equal stay in their custom order.
+        @param accounts list of Accounts in their custom order
+        @param mode one of kSortModes (an unknown mode is the custom order)
+        """
+        positions = list(range(len(accounts)))
+        if mode not in (kSortAlphabetical, kSortRecency, kSortFrequency):
+            return positions
+        keys = self._keys_of(accounts)
+        if mode == kSortAlphabetical:
+            positions.sort(key=lambda position: keys[position][0])
+        elif mode == kSortRecency:
+            positions.sort(key=lambda position: -keys[position][1])
+        else:
+            positions.sort(key=lambda position: -keys[position][2])
+        return positions
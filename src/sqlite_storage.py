@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import cipher_funcs
+from account_mgr import Account, AccountManager
+from vault_storage import VaultStorage
+
+""" The vault kept in an SQLite database.
+Each change is a single-row transaction instead of a rewrite of the whole vault,
+and the order of the entries is a column.  The database uses write-ahead logging,
+and changes made by other programs are detected with PRAGMA data_version.
+"""
+
+# The columns of an entry, in the order of the Account fields
+kEntryFields = ('issuer', 'label', 'secret', 'last_used', 'used_frequency', 'favorite', 'icon')
+
+class SqliteVaultStorage(VaultStorage):
+    """ Stores the vault entries as rows of an SQLite table. """
+
+    def __init__(self, db_path):
+        """ Open (or create) the vault database.
+        @param db_path path of the database file
+        """
+        self.logger = logging.getLogger(__name__)
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()  # the connection is shared by the GUI and save threads
+        self._connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            self._connection.execute("""CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY,
+                position INTEGER NOT NULL,
+                issuer TEXT NOT NULL,
+                label TEXT NOT NULL,
+                secret TEXT NOT NULL,
+                last_used TEXT NOT NULL,
+                used_frequency INTEGER NOT NULL DEFAULT 0,
+                favorite INTEGER NOT NULL DEFAULT 0,
+                icon TEXT)""")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS entries_position ON entries (position)")
+            # A new database gets a key-check value so a different key is detected before reading the entries
+            self._connection.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('key_check', ?)",
+                                     (cipher_funcs.make_key_check(),))
+        self._ids = []  # row id of each entry, in the order of the account list
+        self._key_ok = True  # False if the vault was encrypted with a different key (then it's read-only)
+        self._data_version = self._get_data_version()
+
+    def _get_data_version(self):
+        """ Return the counter SQLite increments when another connection commits a change. """
+        return self._connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def load(self):
+        with self._lock:
+            key_check = self._connection.execute("SELECT value FROM meta WHERE name = 'key_check'").fetchone()
+            self._data_version = self._get_data_version()
+            self._key_ok = key_check is not None and cipher_funcs.verify_key_check(key_check[0])
+            if not self._key_ok:
+                print ("Vault was encrypted with a different key.")
+                print ("Tip: If you are trying to copy your vault from a different machine, use Import.")
+                self.logger.error(f"Vault database {self.db_path} was encrypted with a different key")
+                self._ids = []
+                return []
+            rows = self._connection.execute(
+                f"SELECT id, {', '.join(kEntryFields)} FROM entries ORDER BY position").fetchall()
+        self._ids = [row[0] for row in rows]
+        return [Account.from_dict(self._fields_of_row(row)) for row in rows]
+
+    @staticmethod
+    def _fields_of_row(row):
+        """ Convert a row (id followed by the entry columns) to a dictionary of Account fields. """
+        fields = dict(zip(kEntryFields, row[1:]))
+        fields['favorite'] = bool(fields['favorite'])
+        return fields
+
+    @staticmethod
+    def _values_of_account(account):
+        """ Return the entry column values of an account. """
+        return tuple(getattr(account, name) for name in kEntryFields)
+
+    def is_modified(self):
+        with self._lock:
+            return self._get_data_version() != self._data_version
+
+    def reload(self, current):
+        return AccountManager._diff_accounts(current, self.load())
+
+    def _execute(self, change):
+        """ Run change(connection) in a transaction.
+        @return True if it was committed
+        """
+        if not self._key_ok:
+            self.logger.error("Vault database is read-only because it was encrypted with a different key")
+            return False
+        try:
+            with self._lock, self._connection:
+                change(self._connection)
+            return True
+        except (sqlite3.Error, IndexError) as e:
+            self.logger.error(f"Error writing vault database: {str(e)}")
+            return False
+
+    def write_all(self, accounts):
+        def replace_entries(connection):
+            connection.execute("DELETE FROM entries")
+            connection.executemany(
+                f"INSERT INTO entries (position, {', '.join(kEntryFields)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(position,) + self._values_of_account(account) for position, account in enumerate(accounts)])
+            self._ids = [row[0] for row in connection.execute("SELECT id FROM entries ORDER BY position")]
+        return self._execute(replace_entries)
+
+    def reordered(self, order, accounts):
+        def update_positions(connection):
+            ids = [self._ids[position] for position in order]
+            # Only the position column changes
+            connection.executemany("UPDATE entries SET position = ? WHERE id = ?", list(enumerate(ids)))
+            self._ids = ids
+        return self._execute(update_positions)
+
+    def inserted(self, position, account):
+        def insert_entry(connection):
+            if position >= len(self._ids):
+                new_position = connection.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM entries").fetchone()[0]
+            elif position == 0:
+                # Positions needn't be contiguous, so inserting at the top doesn't move the other rows
+                new_position = connection.execute("SELECT MIN(position) - 1 FROM entries").fetchone()[0]
+            else:
+                new_position = connection.execute("SELECT position FROM entries WHERE id = ?",
+                                                  (self._ids[position],)).fetchone()[0]
+                connection.execute("UPDATE entries SET position = position + 1 WHERE position >= ?", (new_position,))
+            cursor = connection.execute(
+                f"INSERT INTO entries (position, {', '.join(kEntryFields)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (new_position,) + self._values_of_account(account))
+            self._ids.insert(position, cursor.lastrowid)
+        return self._execute(insert_entry)
+
+    def updated(self, position, account):
+        def update_entry(connection):
+            connection.execute(
+                f"UPDATE entries SET {', '.join(name + ' = ?' for name in kEntryFields)} WHERE id = ?",
+                self._values_of_account(account) + (self._ids[position],))
+        return self._execute(update_entry)
+
+    def deleted(self, position, account):
+        def delete_entry(connection):
+            connection.execute("DELETE FROM entries WHERE id = ?", (self._ids[position],))
+            del self._ids[position]
+        return self._execute(delete_entry)
+
+    def used(self, position, account):
+        def update_usage(connection):
+            connection.execute("UPDATE entries SET last_used = ?, used_frequency = ? WHERE id = ?",
+                               (account.last_used, account.used_frequency, self._ids[position]))
+        return self._execute(update_usage)
+
+    def watch_path(self):
+        # Other programs' commits go to the write-ahead log, not the database file, so it is polled
+        return None
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def migrate_json_vault(json_path, db_path) -> int:
+    """ Copy the entries of a JSON vault (version 1 or 2) into a new SQLite vault.
+    Usage statistics in the JSON vault's usage journal are included.  The JSON vault is left as it was.
+    @param json_path path of the JSON vault
+    @param db_path path of the database to create
+    @return the number of entries migrated
+    @raise FileExistsError if the database already exists
+    @raise ValueError if the JSON vault is not valid (or was encrypted with a different key)
+    """
+    json_path = Path(json_path)
+    db_path = Path(db_path)
+    if db_path.exists():
+        raise FileExistsError(f"Vault database {db_path} already exists")
+    with open(json_path, 'r') as f:
+        content = json.load(f)
+    if not AccountManager._validate_vault_data(content):
+        raise ValueError("Invalid vault format (wrong version?)")
+    accounts = [Account.from_dict(entry) for entry in content["vault"]["entries"]]
+    AccountManager._replay_journal_file(accounts, json_path.with_suffix('.journal'))
+
+    storage = SqliteVaultStorage(db_path)
+    try:
+        written = storage.write_all(accounts)
+    finally:
+        storage.close()
+    if not written:
+        # Don't leave a partial database that would prevent another attempt
+        for path in (db_path, Path(f"{db_path}-wal"), Path(f"{db_path}-shm")):
+            if path.exists():
+                os.remove(path)
+        raise ValueError(f"Unable to write vault database {db_path}")
+    return len(accounts)
+
+def open_vault(db_path, json_path):
+    """ Open the SQLite vault, first migrating the JSON vault if the database doesn't exist yet.
+    @return SqliteVaultStorage
+    """
+    logger = logging.getLogger(__name__)
+    if not Path(db_path).exists() and Path(json_path).exists():
+        count = migrate_json_vault(json_path, db_path)
+        logger.info(f"Migrated {count} entries from {json_path} to {db_path}")
+    return SqliteVaultStorage(db_path)
@@ -4,14 +4,14 @@ import os
 import qdarktheme
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QPixmap
-from PyQt5.QtWidgets import QDialog, QMessageBox, QApplication, QCompleter
+from PyQt5.QtWidgets import QDialog, QMessageBox, QApplication
 # from account_entry_panel import AccountEntryPanel
 from PyQt5.uic import loadUi
 
 from account_mgr import AccountManager
 from appconfig import AppConfig
 from common_dialog_funcs import set_tab_order, validate_form, save_fields
-from provider_map import Providers
+from provider_map import Providers, ProviderCompleter
 from utils import assets_dir
 
 
@@ -26,7 +26,7 @@ class VaultEntryDialog(QDialog):
         self.appconfig = AppConfig() # Get the global AppConfig instance
         # initialize provider lookup
         self.providers = Providers()
-        self.provider_names = self.providers.provider_map.keys()
+        self.provider_search = self.providers.search_index
         self.setWindowFlags(Qt.WindowTitleHint | Qt.Dialog | Qt.WindowCloseButtonHint) # x-platform consistency
         self.setMinimumSize(380, 280)
 
@@ -46,10 +46,8 @@ class VaultEntryDialog(QDialog):
         # Show default globe icon
         self.use_default_icon()
 
-        # Setup auto-complete for provider field
-        self.completer = QCompleter(self.provider_names)
-        self.completer.setCaseSensitivity(False)  # Makes it case-insensitive
-        self.completer.setFilterMode(Qt.MatchContains)  # Allows substring matching
+        # Setup auto-complete for provider field (case-insensitive substring matching)
+        self.completer = ProviderCompleter(self.provider_search, self)
         self.provider_entry.setCompleter(self.completer)
         # Connect editingFinished signal
         self.provider_entry.editingFinished.connect(self.on_provider_entry_editting_finished)
@@ -80,7 +78,7 @@ class VaultEntryDialog(QDialog):
         """ When user presses tab or enter, check if only one match remains in the autocomplete list and update icon_name. """
 
         # Get list of matching names
-        match_list = [name for name in self.provider_names if self.provider_entry.text().lower() in name.lower()]
+        match_list = self.provider_search.contains(self.provider_entry.text())
         # If there's just a single match, we can use it.
         if len(match_list) == 1:
             pixmap = self.providers.get_provider_icon_pixmap(match_list[0])
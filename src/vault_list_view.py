@@ -0,0 +1,226 @@
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QSize, QEvent, pyqtSignal
+from PyQt5.QtGui import QFont, QFontMetrics
+from PyQt5.QtWidgets import QListView, QStyledItemDelegate, QStyle, QAbstractItemView
+
+import otp_engine
+
+""" A virtualized display of the vault for very large vaults.
+Instead of one set of widgets per vault entry, a list model wraps the accounts and a delegate
+paints each row, so only the rows that are visible get painted and only their codes are computed.
+"""
+
+# Vaults with at least this many entries are displayed with the virtualized list
+kVirtualListThreshold = 200
+# Longest provider or user string displayed (same limit as the widget rows)
+kMaxFieldLength = 31
+
+class VaultListModel(QAbstractListModel):
+    """ List model of the vault entries that match the search term. """
+    ProviderRole = Qt.UserRole + 1
+    UserRole = Qt.UserRole + 2
+    OtpRole = Qt.UserRole + 3
+    AccountRole = Qt.UserRole + 4
+    IndexRole = Qt.UserRole + 5  # position of the entry in the full account list
+
+    def __init__(self, engine, providers, parent=None):
+        """ @param engine the OtpEngine used to generate codes
+            @param providers the Providers map used to look up favicons
+        """
+        super().__init__(parent)
+        self.engine = engine
+        self.providers = providers
+        self._rows = []  # (index in account list, account) of each displayed entry
+        self._codes = {}  # codes already computed for _time_step, by row
+        self._time_step = None
+
+    def set_accounts(self, accounts, search_term="", order=None):
+        """ Replace the displayed entries with the accounts whose provider matches the search term.
+        @param order positions of the accounts in display order (default: the order of the list)
+        """
+        self.beginResetModel()
+        if order is None:
+            order = range(len(accounts))
+        if search_term:
+            self._rows = [(index, accounts[index]) for index in order
+                          if search_term in accounts[index].issuer.lower()]
+        else:
+            # No field is read until a row is displayed (entries of a binary vault are decoded on first use)
+            self._rows = [(index, accounts[index]) for index in order]
+        self._codes = {}
+        self.endResetModel()
+
+    def refresh_codes(self):
+        """ Discard the computed codes so visible rows are repainted with the current ones. """
+        self._codes = {}
+        if self._rows:
+            self.dataChanged.emit(self.index(0), self.index(len(self._rows) - 1), [VaultListModel.OtpRole])
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        account_index, account = self._rows[index.row()]
+        if role in (Qt.DisplayRole, VaultListModel.ProviderRole):
+            return account.issuer
+        if role == VaultListModel.UserRole:
+            return account.label
+        if role == VaultListModel.OtpRole:
+            return self._code_for_row(index.row(), account)
+        if role == Qt.DecorationRole:
+            return self.providers.get_provider_icon_pixmap(account.issuer)
+        if role == VaultListModel.AccountRole:
+            return account
+        if role == VaultListModel.IndexRole:
+            return account_index
+        return None
+
+    def _code_for_row(self, row, account):
+        """ Compute a row's code only when it is first painted in this time step. """
+        time_step = otp_engine.current_time_step()
+        if time_step != self._time_step:
+            self._codes = {}
+            self._time_step = time_step
+        code = self._codes.get(row)
+        if code is None:
+            code = self.engine.code_for(account, time_step)
+            self._codes[row] = code
+        return code
+
+
+class VaultItemDelegate(QStyledItemDelegate):
+    """ Paints a vault entry (favicon, provider, user, OTP) and reports clicks on the provider or the OTP. """
+    provider_clicked = pyqtSignal(QModelIndex)
+    otp_clicked = pyqtSignal(QModelIndex)
+
+    kRowHeight = 32
+    kIconSize = 16
+    kMargin = 6
+
+    def __init__(self, providers, parent=None):
+        """ @param providers the Providers map, for the letter badges of providers without a favicon """
+        super().__init__(parent)
+        self.providers = providers
+        self.show_favicons = True
+        self.text_font = QFont("Verdana", 12)
+        self.provider_font = QFont("Verdana", 12)
+        self.provider_font.setUnderline(True)
+        self.otp_font = QFont("Verdana", 12)
+        self.otp_font.setBold(True)
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), VaultItemDelegate.kRowHeight)
+
+    @staticmethod
+    def _shorten(text):
+        """ Limit field length. """
+        if len(text) > kMaxFieldLength:
+            return text[:kMaxFieldLength] + "..."
+        return text
+
+    def _layout(self, option, index):
+        """ Compute the rectangles of the row's parts.
+        @return (icon_rect, provider_rect, user_rect, otp_rect)
+        """
+        rect = option.rect
+        margin = VaultItemDelegate.kMargin
+        left = rect.left() + margin
+        icon_rect = QRect()
+        if self.show_favicons:
+            icon_size = VaultItemDelegate.kIconSize
+            icon_rect = QRect(left, rect.top() + (rect.height() - icon_size) // 2, icon_size, icon_size)
+            left = icon_rect.right() + margin
+        otp_width = QFontMetrics(self.otp_font).horizontalAdvance("0" * otp_engine.kDigits) + 2 * margin
+        otp_rect = QRect(rect.right() - otp_width - margin, rect.top(), otp_width, rect.height())
+        provider_text = self._shorten(index.data(VaultListModel.ProviderRole) or "")
+        provider_width = QFontMetrics(self.provider_font).horizontalAdvance(provider_text)
+        provider_rect = QRect(left, rect.top(), provider_width, rect.height())
+        user_left = provider_rect.right() + 2 * margin
+        user_rect = QRect(user_left, rect.top(), max(0, otp_rect.left() - user_left - margin), rect.height())
+        return icon_rect, provider_rect, user_rect, otp_rect
+
+    def paint(self, painter, option, index):
+        painter.save()
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        icon_rect, provider_rect, user_rect, otp_rect = self._layout(option, index)
+        provider = index.data(VaultListModel.ProviderRole) or ""
+        # Show Favicon, or the first letter of provider's name if icon not available
+        if self.show_favicons:
+            pixmap = index.data(Qt.DecorationRole)
+            if not pixmap and provider:
+                pixmap = self.providers.get_letter_badge(provider[0], VaultItemDelegate.kIconSize)
+            if pixmap:
+                painter.drawPixmap(icon_rect, pixmap)
+        painter.setPen(option.palette.text().color())
+        # Show Provider
+        painter.setFont(self.provider_font)
+        painter.drawText(provider_rect, Qt.AlignLeft | Qt.AlignVCenter, self._shorten(provider))
+        # Show user
+        painter.setFont(self.text_font)
+        painter.drawText(user_rect, Qt.AlignLeft | Qt.AlignVCenter, self._shorten(index.data(VaultListModel.UserRole) or ""))
+        # Show TOTP code
+        painter.setFont(self.otp_font)
+        painter.drawText(otp_rect, Qt.AlignCenter, index.data(VaultListModel.OtpRole) or "")
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        """ Hit-test mouse clicks against the provider and OTP areas. """
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            icon_rect, provider_rect, user_rect, otp_rect = self._layout(option, index)
+            if otp_rect.contains(event.pos()):
+                self.otp_clicked.emit(index)
+                return True
+            if provider_rect.contains(event.pos()):
+                self.provider_clicked.emit(index)
+                return True
+        return super().editorEvent(event, model, option, index)
+
+    def otp_rect(self, option, index):
+        """ Accessor to the area where the OTP of the given row is painted. """
+        return self._layout(option, index)[3]
+
+
+class VaultListView(QListView):
+    """ Virtualized list of vault entries. """
+    def __init__(self, engine, providers, parent=None):
+        super().__init__(parent)
+        self.vault_model = VaultListModel(engine, providers, self)
+        self.delegate = VaultItemDelegate(providers, self)
+        self.setModel(self.vault_model)
+        self.setItemDelegate(self.delegate)
+        # All rows are the same height, which lets the view skip measuring them
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+
+    def set_accounts(self, accounts, search_term="", show_favicons=True, order=None):
+        """ Display the accounts matching the search term.
+        @param order positions of the accounts in display order (default: the order of the list)
+        """
+        self.delegate.show_favicons = show_favicons
+        self.vault_model.set_accounts(accounts, search_term, order)
+
+    def refresh_codes(self):
+        """ Repaint the visible codes for the current time step. """
+        self.vault_model.refresh_codes()
+
+    def visible_accounts(self):
+        """ Return the accounts of the rows in view. """
+        rect = self.viewport().rect()
+        first = self.indexAt(rect.topLeft())
+        if not first.isValid():
+            return []
+        last = self.indexAt(rect.bottomLeft())
+        last_row = last.row() if last.isValid() else self.vault_model.rowCount() - 1
+        return [self.vault_model.index(row).data(VaultListModel.AccountRole) for row in range(first.row(), last_row + 1)]
+
+    def otp_global_rect(self, index):
+        """ Return the global screen rectangle of the OTP in the given row. """
+        option = self.viewOptions()
+        option.rect = self.visualRect(index)
+        rect = self.delegate.otp_rect(option, index)
+        return QRect(self.viewport().mapToGlobal(rect.topLeft()), rect.size())
@@ -0,0 +1,77 @@
+""" The interface between the AccountManager and the place the vault is stored.
+The AccountManager keeps the list of accounts in memory and tells its storage about each change,
+so a storage that can update a single entry (like a database) doesn't have to rewrite the whole vault.
+Positions are indexes in the AccountManager's list of accounts at the time of the change.
+"""
+
+class VaultStorage:
+    """ Base class of the vault storage backends. """
+
+    def load(self) -> list:
+        """ Read the vault.
+        @return list of Accounts (empty if there is no vault yet)
+        """
+        raise NotImplementedError
+
+    def is_modified(self) -> bool:
+        """ Check whether another program changed the vault since it was last read or written. """
+        raise NotImplementedError
+
+    def reload(self, current) -> tuple:
+        """ Read the vault after another program changed it.
+        @param current the list of Accounts in memory
+        @return (list of Accounts, VaultChanges compared to current)
+        """
+        raise NotImplementedError
+
+    def write_all(self, accounts) -> bool:
+        """ Write every account now, replacing the stored vault.
+        @return True if successful
+        """
+        raise NotImplementedError
+
+    def all_changed(self, accounts) -> bool:
+        """ The whole list was replaced or reordered (e.g., sort or import).
+        @return False if the change couldn't be stored
+        """
+        return self.write_all(accounts)
+
+    def reordered(self, order, accounts) -> bool:
+        """ The accounts were put in a new order; account i of the new list was at position order[i].
+        @return False if the change couldn't be stored
+        """
+        return self.all_changed(accounts)
+
+    def inserted(self, position, account) -> bool:
+        """ An account was inserted at the position.
+        @return False if the change couldn't be stored
+        """
+        raise NotImplementedError
+
+    def updated(self, position, account) -> bool:
+        """ The account at the position was replaced.
+        @return False if the change couldn't be stored
+        """
+        raise NotImplementedError
+
+    def deleted(self, position, account) -> bool:
+        """ The account at the position was removed.
+        @return False if the change couldn't be stored
+        """
+        raise NotImplementedError
+
+    def used(self, position, account) -> bool:
+        """ The usage statistics (last_used, used_frequency) of the account at the position changed.
+        @return False if the change couldn't be stored
+        """
+        return self.updated(position, account)
+
+    def watch_path(self):
+        """ Return the file that changes when another program changes the vault, so it can be watched,
+        or None if the changes can only be found by calling is_modified() from time to time.
+        """
+        return None
+
+    def close(self):
+        """ Release any resources held by the storage. """
+        pass
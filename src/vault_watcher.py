@@ -0,0 +1,79 @@
+import logging
+import os
+
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+""" Notification of changes to the vault file by other programs (or another EasyAuth instance).
+The operating system reports the changes (inotify on Linux), so nothing is polled while idle.
+A save replaces the vault by renaming a temporary file over it, which produces several
+notifications in a row and drops the watch on the old file, so notifications are debounced
+and the directory is watched as well as the file.
+A vault storage that can't be watched (see VaultStorage.watch_path) is checked at a low rate instead.
+"""
+
+# Milliseconds to wait for a burst of notifications to end before checking the vault
+kDebounceMs = 250
+# Milliseconds between checks of a vault that can't be watched
+kPollMs = 5000
+
+class VaultWatcher(QObject):
+    """ Emits vault_changed when the vault file has been replaced or modified
+    (or every kPollMs when there is no file to watch, for the receiver to check the vault).
+    """
+    vault_changed = pyqtSignal()
+
+    def __init__(self, vault_path, parent=None):
+        """ @param vault_path path of the vault file to watch, or None to poll """
+        super().__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.poll_timer = None
+        if vault_path is None:
+            self.vault_path = None
+            self.poll_timer = QTimer(self)
+            self.poll_timer.timeout.connect(self.vault_changed)
+            self.poll_timer.start(kPollMs)
+            return
+        self.vault_path = str(vault_path)
+        self.watcher = QFileSystemWatcher(self)
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(kDebounceMs)
+        self.debounce_timer.timeout.connect(self._check_vault)
+        self.watcher.fileChanged.connect(self._on_notification)
+        self.watcher.directoryChanged.connect(self._on_notification)
+        self._last_stat = self._stat_vault()
+        self._watch()
+
+    def _watch(self):
+        """ Watch the vault directory, and the vault file if it exists.
+        A watched file that gets replaced is dropped from the watch list, so this is repeated after each change.
+        """
+        directory = os.path.dirname(self.vault_path)
+        if directory and os.path.isdir(directory) and directory not in self.watcher.directories():
+            self.watcher.addPath(directory)
+        if os.path.exists(self.vault_path) and self.vault_path not in self.watcher.files():
+            self.watcher.addPath(self.vault_path)
+
+    def _on_notification(self, path):
+        """ Restart the debounce interval on every notification. """
+        self.debounce_timer.start()
+
+    def _stat_vault(self):
+        """ Return the identifying state of the vault file (or None if it doesn't exist). """
+        try:
+            stat = os.stat(self.vault_path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _check_vault(self):
+        """ After the notifications settle, signal if the vault itself changed
+        (other files in the directory, like the backup or usage journal, are ignored).
+        """
+        self._watch()
+        current = self._stat_vault()
+        if current != self._last_stat:
+            self._last_stat = current
+            self.logger.debug(f"Vault file changed: {self.vault_path}")
+            self.vault_changed.emit()
+
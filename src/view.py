@@ -1,37 +1,47 @@
 import datetime
-import json
 import logging
 import os
 import sys
 import time
-from dataclasses import asdict
 
-import pyotp
 import pyperclip
 import qdarktheme
-from PyQt5.QtCore import Qt, QTimer, QUrl, QSettings, QPoint
+from PyQt5.QtCore import Qt, QTimer, QUrl, QSettings, QPoint, QRect, pyqtSignal
 from PyQt5.QtGui import QFont, QDesktopServices, QPixmap, QKeySequence
 from PyQt5.QtWidgets import (QMainWindow, QApplication,
                              QSizePolicy, QAction, QToolBar, QScrollArea,
                              QDialog, QLabel, QPushButton, QLineEdit, QVBoxLayout,
-                             QHBoxLayout, QWidget, QMessageBox, QFrame, QMenu)
+                             QHBoxLayout, QWidget, QMessageBox, QFrame, QMenu, QActionGroup)
 
 import about_dialog
-import cipher_funcs
 import qr_funcs
 from account_mgr import AccountManager
 from appconfig import AppConfig
 from export_import_dialog import ExportImportDialog
+import otp_engine
+from otp_engine import OtpEngine
 from permission_dialog import PermissionDialog, get_permission
 from preferences_dialog import PreferencesDialog
 from provider_map import Providers
 from provider_search_dialog import ProviderSearchDialog
 from quick_start_dialog import QuickStartDialog
 from reorder_dialog import ReorderDialog
+import sort_order
 from styles import dark_qss, light_qss
 from utils import assets_dir
 from vault_details_dialog import VaultDetailsDialog
 from vault_entry_dialog import VaultEntryDialog
+from vault_list_view import VaultListView, VaultListModel, kVirtualListThreshold
+from vault_watcher import VaultWatcher
+
+
+class VaultRow:
+    """ The widgets that display one vault entry in the main window. """
+    def __init__(self, frame):
+        self.frame = frame  # QFrame containing the row
+        self.otp_label = None  # QPushButton showing the OTP code
+        self.account = None  # the vault entry currently displayed
+        self.index = None  # position of the entry in the account list
 
 
 class AppView(QMainWindow):
@@ -39,15 +49,28 @@ class AppView(QMainWindow):
      Yes, this module is a monster as are most main window classes.
      Someone with more Python knowledge should refactor it.
      """
+    # Emitted with the VaultChanges when another program modifies the vault
+    # (may be emitted from the save thread; the connection delivers it on the GUI thread)
+    vault_changed_externally = pyqtSignal(object)
+
     def __init__(self, q_app):
         super().__init__()
         self.q_app = q_app
         self.logger = logging.getLogger(__name__)
         self.logger.debug("view init startup")
         self.account_manager = AccountManager()
+        # Coalesce bursts of changes into one save on a background thread
+        self.account_manager.enable_write_behind()
         self.providers = Providers()
+        self.otp_engine = OtpEngine()
         self.vault_empty = False # Don't display timer if vault empty
+        self.vault_rows = {}  # (issuer, label) -> VaultRow displaying that entry
+        self.row_order = []  # keys of the rows in the order they appear
+        self.rows_show_favicons = None  # favicon preference the rows were built with
+        self.help_widgets = []  # widgets of the empty vault message
+        self.using_vault_list = False  # large vaults are shown in the virtualized list instead of rows
         self.app_config = AppConfig() # Get the global AppConfig instance
+        self.sort_keys = sort_order.SortKeyCache()  # for displaying the entries in the chosen sort mode
         self.window_settings = QSettings("EasyAuth", "window")  # .config location
         self.restore_window_settings()  # Restore previous position & size
 
@@ -65,6 +88,12 @@ class AppView(QMainWindow):
         self.create_toolbar()
 
         self.start_timer()
+        # Pick up changes made to the vault by other programs when the OS reports them
+        # (or by checking from time to time if the vault's storage can't be watched)
+        self.vault_watcher = VaultWatcher(self.account_manager.storage.watch_path(), self)
+        self.vault_watcher.vault_changed.connect(self.check_for_file_changes)
+        self.vault_changed_externally.connect(self.handle_external_changes)
+        self.account_manager.add_change_listener(self.notify_external_changes)
         self.display_vault()
         self.logger.debug("view init complete")
 
@@ -113,7 +142,8 @@ class AppView(QMainWindow):
 
         exit_action = QAction('Exit', self)
         exit_action.setObjectName(('exitAction'))
-        exit_action.triggered.connect(sys.exit)
+        # Close the window (rather than exit) so pending vault changes are saved
+        exit_action.triggered.connect(self.close)
         exit_action.setShortcut(QKeySequence("Alt+x"))
         file_menu.addAction(exit_action)
 
@@ -125,17 +155,27 @@ class AppView(QMainWindow):
         reorder_action.triggered.connect(self.show_reorder_dialog)
         tools_menu.addAction(reorder_action)
 
+        # Sorting only changes the order the entries are displayed in, until it's applied to the vault
         sort_menu = tools_menu.addMenu('Sort Entries')
-        alpha_sort_action = QAction("Alphabetically", self)
-        alpha_sort_action.setObjectName("sortAlphaAction")
-        recency_action = QAction("Recently Used", self)
-        frequency_action = QAction("Usage Count", self)
-        alpha_sort_action.triggered.connect(self.do_alpha_sort_action)
-        recency_action.triggered.connect(self.do_recency_sort_action)
-        frequency_action.triggered.connect(self.do_frequency_sort_action)
-        sort_menu.addAction(alpha_sort_action)
-        sort_menu.addAction(recency_action)
-        sort_menu.addAction(frequency_action)
+        sort_group = QActionGroup(self)
+        current_mode = self.app_config.get_sort_mode()
+        for mode, text, name in ((sort_order.kSortCustom, "Custom Order", "sortCustomAction"),
+                                 (sort_order.kSortAlphabetical, "Alphabetically", "sortAlphaAction"),
+                                 (sort_order.kSortRecency, "Recently Used", "sortRecencyAction"),
+                                 (sort_order.kSortFrequency, "Usage Count", "sortFrequencyAction")):
+            sort_action = QAction(text, self)
+            sort_action.setObjectName(name)
+            sort_action.setCheckable(True)
+            sort_action.setChecked(mode == current_mode)
+            sort_action.triggered.connect(lambda _, mode=mode: self.set_sort_mode(mode))
+            sort_group.addAction(sort_action)
+            sort_menu.addAction(sort_action)
+        self.sort_custom_action = sort_group.actions()[0]
+        sort_menu.addSeparator()
+        apply_sort_action = QAction("Apply as Custom Order", self)
+        apply_sort_action.setObjectName("applySortAction")
+        apply_sort_action.triggered.connect(self.apply_sort_order)
+        sort_menu.addAction(apply_sort_action)
 
         provider_search_action = QAction("Provider Search", self)
         provider_search_action.triggered.connect(self.show_provider_search_dialog)
@@ -208,6 +248,12 @@ class AppView(QMainWindow):
         self.scroll_layout = QVBoxLayout(scroll_content)
         self.scroll_area.setWidget(scroll_content)
         self.main_layout.addWidget(self.scroll_area)
+        # Virtualized list used in place of the scroll area for large vaults
+        self.vault_list = VaultListView(self.otp_engine, self.providers)
+        self.vault_list.delegate.provider_clicked.connect(self.vault_list_provider_clicked)
+        self.vault_list.delegate.otp_clicked.connect(self.vault_list_otp_clicked)
+        self.vault_list.hide()
+        self.main_layout.addWidget(self.vault_list)
         self.set_theme()
 
     def set_theme(self):
@@ -231,109 +277,222 @@ class AppView(QMainWindow):
             qdarktheme.setup_theme(chosen_theme,additional_qss=light_qss,custom_colors={"background": "#fff6e6"})
 
     def display_vault(self):
-        """ Show the list of vault entries in the main content area. """
+        """ Show the list of vault entries in the main content area.
+        Rows are kept in a registry keyed by (issuer, label) and reused, so widgets are only
+        created or destroyed when the account list changes. The search only hides rows.
+        """
         search_term = self.search_box.text().lower()
-        self.account_manager.get_accounts()
-
-        # Clear the existing widgets in the scroll_layout
-        while self.scroll_layout.count():
-            child = self.scroll_layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
+        accounts = self.account_manager.get_accounts()
 
         # Check if the accounts list is empty
-        if len(self.account_manager.get_accounts()) == 0:
+        if len(accounts) == 0:
             # show empty_vault message
             self.vault_empty = True
-            # Display a three-line help message
-            help_message = [
-                "Your vault is empty.",
-                "The vault stores two-factor authentication keys",
-                "provided by a website or other online service.",
-                "Store your secret key by clicking 'Scan QR code'",
-                "or"
-            ]
-            for line in help_message:
-                help_label = QLabel(line)
-                help_label.setAlignment(Qt.AlignCenter)
-                self.scroll_layout.addWidget(help_label)
-            view_quick_btn = QPushButton("View Quick Start")
-            view_quick_btn.clicked.connect(self.show_quick_start_dialog)
-            view_quick_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
-            self.scroll_layout.addWidget(view_quick_btn,alignment=Qt.AlignCenter)
+            self.use_vault_list(False)
+            if not self.help_widgets:
+                self.discard_vault_rows()
+                self.clear_scroll_layout()
+                self.show_empty_vault_help()
+            return
 
         # If account list is not empty place each item in the display
-        if len(self.account_manager.get_accounts()) > 0:
-            self.vault_empty = False
+        self.vault_empty = False
+        # Large vaults are displayed with the virtualized list
+        order = self.sort_keys.order(accounts, self.app_config.get_sort_mode())
+        if len(accounts) >= kVirtualListThreshold:
+            self.use_vault_list(True)
+            self.vault_list.set_accounts(accounts, search_term, self.app_config.is_display_favicons(), order)
+            return
+        self.use_vault_list(False)
+        if self.help_widgets:
+            self.clear_scroll_layout()
+            self.help_widgets = []
+        # Changing the favicon preference changes the row layout, so start over
+        show_favicons = self.app_config.is_display_favicons()
+        if show_favicons != self.rows_show_favicons:
+            self.discard_vault_rows()
+            self.rows_show_favicons = show_favicons
+
+        # Match each vault entry with its row, creating rows for new entries
+        row_order = []
+        row_keys = set()
+        for index in order:
+            account = accounts[index]
+            key = (account.issuer, account.label)
+            if key in row_keys:  # duplicate entries each get their own row
+                key += (index,)
+            row_keys.add(key)
+            row = self.vault_rows.get(key)
+            if row is None:
+                row = self.create_vault_row(account)
+                self.vault_rows[key] = row
+            row.account = account
+            row.index = index
+            row_order.append(key)
+        # Remove the rows for entries that are gone
+        for key in set(self.vault_rows) - row_keys:
+            self.vault_rows.pop(key).frame.deleteLater()
+        # Place the rows in the layout only if the order changed
+        if row_order != self.row_order:
+            self.clear_scroll_layout()
             # Adjust the spacing of the scroll_layout
             self.scroll_layout.setSpacing(1)  # Set vertical spacing between rows
-            # Iterate over all the vault entries
-            for index, account in enumerate(self.account_manager.get_accounts()):
-                # See if we match the search term
-                if search_term in account.issuer.lower():
-                    row_frame = QFrame()
-                    row_frame.setFrameShape(QFrame.NoFrame) #QFrame.StyledPanel)
-                    # each row can expand horizontally but is fixed vertically, so they don't expand to fill up the scroll frame.
-                    row_frame.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-                    # Set internal padding for the frame
-                    row_frame.setContentsMargins(0,0,0,0)
-
-                    rowframe_layout = QHBoxLayout(row_frame)
-                    # Show Favicon
-                    if self.app_config.is_display_favicons():
-                        icon_label = self.providers.get_provider_icon(account.issuer)
-                        rowframe_layout.addWidget(icon_label)
-                    # Show Provider
-                    provider_string = account.issuer
-                    # Limit field length
-                    if len(provider_string) > 31:
-                        provider_string = provider_string[:31] + "..."
-                    provider_label = QPushButton(provider_string)
-                    provider_font = QFont("Verdana", 12)
-                    provider_font.setUnderline(True)
-                    provider_label.setFont(provider_font)
-                    provider_label.setObjectName("providerLabel")
-                    provider_label.setToolTip("View/edit details")
-                    provider_label.clicked.connect(lambda _, account=account, idx=index: self.show_edit_account_form(idx, account=account))
-                    provider_label.setCursor(Qt.CursorShape.PointingHandCursor)  # Change cursor to a pointing hand
-
-                    # Show user
-                    user_string = account.label
-                    # Limit field length
-                    if len(user_string) > 31:
-                        user_string = user_string[:31] + "..."
-
-                    user_label = QLabel(user_string)
-                    user_label.setFont(QFont("Verdana",12))
-
-                    # Show TOTP code
-                    # Generate the one-time password
-                    secret_key = cipher_funcs.decrypt(account.secret)
-                    try:
-                        otp = pyotp.TOTP(secret_key).now()
-                    except:  # This would only happen from internal error
-                        otp = "??????"
-                    otplabel = QPushButton(f"{otp}") # display the 6-digit code in the label
-                    otplabel.setObjectName("otpLabel")
-                    otplabel.setToolTip("Copy code to clipboard")
-                    otplabel.setCursor(Qt.CursorShape.PointingHandCursor)  # Change cursor to a pointing hand
-                    otplabel.clicked.connect(lambda _, otplabel=otplabel, idx=index, acc=account: self.copy_to_clipboard(otplabel, idx, acc))
-
-                    rowframe_layout.addWidget(provider_label)
-                    rowframe_layout.addWidget(user_label)
-                    rowframe_layout.addStretch()
-                    rowframe_layout.addWidget(otplabel)
-
-                    self.scroll_layout.addWidget(row_frame)
-
+            for key in row_order:
+                self.scroll_layout.addWidget(self.vault_rows[key].frame)
+            self.scroll_layout.addStretch() # this keeps the rows bunched up at the top
+            self.row_order = row_order
+
+        # Show only the rows that match the search term
+        for key in row_order:
+            row = self.vault_rows[key]
+            row.frame.setHidden(search_term not in row.account.issuer.lower())
+        self.refresh_codes()
+
+    def use_vault_list(self, use_list):
+        """ Switch between the virtualized list and the scroll area of rows. """
+        if use_list == self.using_vault_list:
+            return
+        if use_list:
+            # The rows aren't needed while the list is displayed
+            self.discard_vault_rows()
+            self.clear_scroll_layout()
+            self.help_widgets = []
+        self.scroll_area.setVisible(not use_list)
+        self.vault_list.setVisible(use_list)
+        self.using_vault_list = use_list
+
+    def vault_list_provider_clicked(self, model_index):
+        """ User clicked on a provider in the virtualized list. """
+        account = model_index.data(VaultListModel.AccountRole)
+        self.show_edit_account_form(model_index.data(VaultListModel.IndexRole), account=account)
+
+    def vault_list_otp_clicked(self, model_index):
+        """ User clicked on a code in the virtualized list. """
+        self.copy_otp(model_index.data(VaultListModel.OtpRole), model_index.data(VaultListModel.IndexRole),
+                      model_index.data(VaultListModel.AccountRole), self.vault_list.otp_global_rect(model_index))
+
+    def refresh_codes(self):
+        """ Update the OTP code shown in each visible row. """
+        if self.using_vault_list:
+            self.vault_list.refresh_codes()
+            return
+        visible_rows = [self.vault_rows[key] for key in self.row_order if not self.vault_rows[key].frame.isHidden()]
+        # Generate the one-time passwords for the current time step in one batch
+        otp_codes = self.otp_engine.codes_for_time_step([row.account for row in visible_rows])
+        for row, otp in zip(visible_rows, otp_codes):
+            if row.otp_label.text() != otp:
+                row.otp_label.setText(otp) # display the 6-digit code in the label
+
+    def create_vault_row(self, account):
+        """ Create the widgets that display a vault entry.
+        @param account the vault entry
+        @return VaultRow holding the widgets (not yet placed in the layout)
+        """
+        row_frame = QFrame()
+        row = VaultRow(row_frame)
+        row_frame.setFrameShape(QFrame.NoFrame) #QFrame.StyledPanel)
+        # each row can expand horizontally but is fixed vertically, so they don't expand to fill up the scroll frame.
+        row_frame.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        # Set internal padding for the frame
+        row_frame.setContentsMargins(0,0,0,0)
+
+        rowframe_layout = QHBoxLayout(row_frame)
+        # Show Favicon
+        if self.rows_show_favicons:
+            icon_label = self.providers.get_provider_icon(account.issuer)
+            rowframe_layout.addWidget(icon_label)
+        # Show Provider
+        provider_string = account.issuer
+        # Limit field length
+        if len(provider_string) > 31:
+            provider_string = provider_string[:31] + "..."
+        provider_label = QPushButton(provider_string)
+        provider_font = QFont("Verdana", 12)
+        provider_font.setUnderline(True)
+        provider_label.setFont(provider_font)
+        provider_label.setObjectName("providerLabel")
+        provider_label.setToolTip("View/edit details")
+        # The row's account and index are updated whenever the vault is displayed
+        provider_label.clicked.connect(lambda _, row=row: self.show_edit_account_form(row.index, account=row.account))
+        provider_label.setCursor(Qt.CursorShape.PointingHandCursor)  # Change cursor to a pointing hand
+
+        # Show user
+        user_string = account.label
+        # Limit field length
+        if len(user_string) > 31:
+            user_string = user_string[:31] + "..."
+
+        user_label = QLabel(user_string)
+        user_label.setFont(QFont("Verdana",12))
+
+        # Show TOTP code (the text is filled in by refresh_codes)
+        otplabel = QPushButton("")
+        otplabel.setObjectName("otpLabel")
+        otplabel.setToolTip("Copy code to clipboard")
+        otplabel.setCursor(Qt.CursorShape.PointingHandCursor)  # Change cursor to a pointing hand
+        otplabel.clicked.connect(lambda _, row=row: self.copy_to_clipboard(row.otp_label, row.index, row.account))
+        row.otp_label = otplabel
+
+        rowframe_layout.addWidget(provider_label)
+        rowframe_layout.addWidget(user_label)
+        rowframe_layout.addStretch()
+        rowframe_layout.addWidget(otplabel)
+        return row
+
+    def show_empty_vault_help(self):
+        """ Display a help message in place of the empty vault. """
+        help_message = [
+            "Your vault is empty.",
+            "The vault stores two-factor authentication keys",
+            "provided by a website or other online service.",
+            "Store your secret key by clicking 'Scan QR code'",
+            "or"
+        ]
+        for line in help_message:
+            help_label = QLabel(line)
+            help_label.setAlignment(Qt.AlignCenter)
+            self.scroll_layout.addWidget(help_label)
+            self.help_widgets.append(help_label)
+        view_quick_btn = QPushButton("View Quick Start")
+        view_quick_btn.clicked.connect(self.show_quick_start_dialog)
+        view_quick_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.scroll_layout.addWidget(view_quick_btn,alignment=Qt.AlignCenter)
+        self.help_widgets.append(view_quick_btn)
         self.scroll_layout.addStretch() # this keeps the rows bunched up at the top
 
+    def clear_scroll_layout(self):
+        """ Take every item out of the scroll_layout.  Vault rows are kept for reuse, other widgets are deleted. """
+        row_frames = {row.frame for row in self.vault_rows.values()}
+        while self.scroll_layout.count():
+            child = self.scroll_layout.takeAt(0)
+            if child.widget() and child.widget() not in row_frames:
+                child.widget().deleteLater()
+        self.row_order = []
+
+    def discard_vault_rows(self):
+        """ Delete all the vault rows so they will be created again. """
+        for row in self.vault_rows.values():
+            row.frame.deleteLater()
+        self.vault_rows = {}
+        self.row_order = []
+
     def check_for_file_changes(self):
-        """ Invoked every second to check for external changes to the vault. """
-        current_accounts = self.account_manager._accounts
-        # Call get_accounts to force check for file modifications
-        if current_accounts != self.account_manager.get_accounts():
-            self.display_vault()
+        """ Invoked by the vault watcher when the vault file changes (or periodically, for a vault that
+        can't be watched), to pick up external changes. """
+        # get_accounts checks for modifications and notifies the change listeners if there are any
+        self.account_manager.get_accounts()
+
+    def notify_external_changes(self, changes):
+        """ (Account manager change listener) Pass the changes to the GUI thread. """
+        self.vault_changed_externally.emit(changes)
+
+    def handle_external_changes(self, changes):
+        """ Update the display after another program modified the vault.
+        @param changes the VaultChanges found by the account manager
+        """
+        self.logger.debug(f"Vault modified externally: {changes}")
+        # Rows of unchanged entries are reused, so only changed entries are rebuilt
+        self.display_vault()
 
     def start_timer(self):
         # Set up the QTimer to call update_timer every second
@@ -368,13 +527,16 @@ class AppView(QMainWindow):
                 display_time = ' ' + display_time
         self.timer_label.setText(display_time)
 
-        # refresh the display every 30 seconds
+        # Shortly before the codes expire, compute the next ones in the background
+        if time_remaining == otp_engine.kPrefetchLead and not self.vault_empty:
+            # (the virtualized list only computes the codes of the rows in view)
+            accounts = self.vault_list.visible_accounts() if self.using_vault_list else self.account_manager.get_accounts()
+            self.otp_engine.prefetch(accounts)
+
+        # refresh the codes every 30 seconds
         # NB: assumes timer period is 30 seconds for all accounts
         if time_remaining == 30:
-            self.display_vault()
-
-        # Also use this opportunity to check for external modifications to the vault
-        self.check_for_file_changes()
+            self.refresh_codes()
 
     def copy_to_clipboard(self, totp_label, idx, account):
         """ When user clicks on the OTP we copy it to the clipboard.
@@ -383,13 +545,24 @@ class AppView(QMainWindow):
         @param idx the index of this account in the list
         @param account with the usage data to be udpated.
         """
-        pyperclip.copy(totp_label.text())
-        self.logger.debug(f"Copied OTP: {totp_label.text()}")
+        # Locate the label on the screen so the acknowledgement can be shown above it
+        label_rect = QRect(totp_label.parent().mapToGlobal(totp_label.geometry().topLeft()), totp_label.size())
+        self.copy_otp(totp_label.text(), idx, account, label_rect)
+
+    def copy_otp(self, otp, idx, account, anchor_rect):
+        """ Copy the OTP to the clipboard and update the usage statistics for account.
+        @param otp is the one-time password.
+        @param idx the index of this account in the list
+        @param account with the usage data to be udpated.
+        @param anchor_rect global screen rectangle where the OTP is displayed.
+        """
+        pyperclip.copy(otp)
+        self.logger.debug(f"Copied OTP: {otp}")
         now = datetime.datetime.now()
         # update last used time and count
         account.last_used = now.strftime("%Y-%m-%d %H:%M:%S")
         account.used_frequency += 1
-        self.account_manager.update_account(idx,account)
+        self.account_manager.record_usage(account)
         self.logger.debug(f"Updated last_used time for: {idx} {account.issuer} ({account.label})")
 
         # Show a floating acknowledgement message relative to the given label position
@@ -400,8 +573,8 @@ class AppView(QMainWindow):
         popup.setStyleSheet("QLabel#copyPopup {background-color: #dff0d8; color: #3c763d; padding: 5px; border: 1px solid #d6e9c6;}")
         popup.resize(90, 40)
         # Calculate position just above the button
-        button_geometry = totp_label.parent().mapToGlobal(totp_label.geometry().topLeft())
-        button_center_x = button_geometry.x() + totp_label.width() // 2
+        button_geometry = anchor_rect.topLeft()
+        button_center_x = button_geometry.x() + anchor_rect.width() // 2
         popup_x = button_center_x - popup.width() // 2
         popup_y = button_geometry.y() - popup.height() - 5  # 5 pixels gap above the button
 
@@ -529,25 +702,27 @@ class AppView(QMainWindow):
         account_list = self.account_manager.get_accounts()
         dialog = ReorderDialog(account_list, self)
         if dialog.exec_() == QDialog.DialogCode.Accepted:
-            self.accounts = dialog.get_ordered_accounts()
             # save back to model
-            account_dicts = [asdict(account) for account in self.accounts]
-            json_str = json.dumps(account_dicts)
-            self.account_manager.set_accounts(json_str)
+            self.account_manager.reorder(dialog.get_order())
+            # Display the new custom order
+            self.app_config.set_sort_mode(sort_order.kSortCustom)
+            self.sort_custom_action.setChecked(True)
             # Update main window display
             self.display_vault()
 
-    def do_alpha_sort_action(self):
-        self.account_manager.sort_alphabetically()
+    def set_sort_mode(self, mode):
+        """ Display the entries in the order of the sort mode (the vault isn't changed). """
+        self.app_config.set_sort_mode(mode)
         self.display_vault()
 
-    def do_recency_sort_action(self):
-        self.account_manager.sort_recency()
-        self.display_vault()
-
-    def do_frequency_sort_action(self):
-        self.account_manager.sort_frequency()
-        self.display_vault()
+    def apply_sort_order(self):
+        """ Make the displayed order the custom order of the vault. """
+        mode = self.app_config.get_sort_mode()
+        if mode != sort_order.kSortCustom:
+            self.account_manager.apply_sort(mode)
+            self.app_config.set_sort_mode(sort_order.kSortCustom)
+            self.sort_custom_action.setChecked(True)
+            self.display_vault()
 
     def show_provider_search_dialog(self):
         dlg = ProviderSearchDialog(self)
@@ -572,6 +747,12 @@ class AppView(QMainWindow):
 
     def closeEvent(self, event):
         """ When window closes, save geometry and position for next startup. """
+        # Fold the usage statistics recorded since the last save into the vault,
+        # and write any changes still waiting for their scheduled save
+        self.account_manager.remove_change_listener(self.notify_external_changes)
+        self.account_manager.compact_journal()
+        if not self.account_manager.flush_saves():
+            self.logger.error("Unable to save the vault before exiting")
         self.window_settings.setValue("geometry", self.saveGeometry())
         self.window_settings.setValue("pos", self.pos())
         self.logger.debug("window geometry saved")
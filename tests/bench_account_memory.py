@@ -0,0 +1,63 @@
+import base64
+import json
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from account_mgr import Account
+
+# Memory benchmark (not part of the unit test suite): loads a synthetic 10k-entry vault
+# and reports the bytes used per entry by the accounts, before and after Account got slots.
+# Run from the project root: python tests/bench_account_memory.py
+
+kEntries = 10_000
+kIssuers = ["Google", "Github", "Amazon", "Microsoft", "Dropbox", "Facebook", "Twitter", "Slack",
+            "Discord", "Reddit", "Paypal", "Apple", "Gitlab", "Bitbucket", "Coinbase", "Steam"]
+
+@dataclass
+class DictAccount:
+    """ The account as it was before: a dataclass with a per-instance __dict__. """
+    issuer: str
+    label: str
+    secret: str
+    last_used: str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    used_frequency: int = 0
+    favorite: bool = False
+    icon: str = None
+
+def make_vault_text(count):
+    """ Return the JSON entries of a synthetic vault (the secrets are random, Fernet token sized). """
+    entries = [{'issuer': kIssuers[n % len(kIssuers)],
+                'label': f"user{n}@example.com",
+                'secret': base64.urlsafe_b64encode(os.urandom(100)).decode(),
+                'last_used': "2025-01-01 12:00:00",
+                'used_frequency': n % 50,
+                'favorite': False,
+                'icon': None} for n in range(count)]
+    return json.dumps(entries)
+
+def measure(text, construct):
+    """ Return the bytes used by the accounts constructed from the vault text (including the strings they keep). """
+    tracemalloc.start()
+    entries = json.loads(text)
+    accounts = [construct(entry) for entry in entries]
+    del entries  # the accounts keep what they need of the parsed vault
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, accounts
+
+def dict_account(entry):
+    account = DictAccount.__new__(DictAccount)
+    account.__dict__.update(entry)
+    return account
+
+if __name__ == '__main__':
+    text = make_vault_text(kEntries)
+    before, _ = measure(text, dict_account)
+    after, _ = measure(text, Account.from_dict)
+    print(f"{kEntries} entries")
+    print(f"Before (dataclass with __dict__): {before / kEntries:8.1f} bytes per entry")
+    print(f"After  (slots, interned issuers): {after / kEntries:8.1f} bytes per entry")
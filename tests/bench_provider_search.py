@@ -0,0 +1,61 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import fuzzy_search
+from fuzzy_search import FuzzySearch
+from provider_index import entries_from_json
+
+# Latency benchmark (not part of the unit test suite): searches the full providers.json catalog
+# with what a user types - each keystroke of provider names, some misspelled - and checks that
+# searches fit in the per-keystroke budget without being cut short.
+# Run from the project root: python tests/bench_provider_search.py
+
+kQueries = 300
+kPercentile = 0.99
+
+def misspell(name, rng):
+    """ Return the name with one character dropped, doubled or swapped with the next. """
+    if len(name) < 4:
+        return name
+    position = rng.randrange(len(name) - 1)
+    typo = rng.choice(("drop", "double", "swap"))
+    if typo == "drop":
+        return name[:position] + name[position + 1:]
+    if typo == "double":
+        return name[:position] + name[position] + name[position:]
+    return name[:position] + name[position + 1] + name[position] + name[position + 2:]
+
+def keystrokes(names, rng):
+    """ Return the text in the search box after each keystroke of typing some provider names. """
+    texts = []
+    for name in rng.sample(names, kQueries // 10):
+        typed = misspell(name, rng) if rng.random() < 0.5 else name
+        texts.extend(typed[:length] for length in range(1, min(len(typed), 10) + 1))
+    return texts
+
+if __name__ == '__main__':
+    rng = random.Random(2025)
+    provider_map = {entry.name: {'png_filename': entry.png_filename}
+                    for entry in entries_from_json("assets/providers.json")}
+    start = time.perf_counter()
+    search = FuzzySearch(provider_map)
+    build_time = time.perf_counter() - start
+
+    times = []
+    found = 0
+    for text in keystrokes(list(provider_map), rng):
+        start = time.perf_counter()
+        # Unlimited time, to see how long a complete search takes
+        results = search.search(text, budget=float('inf'))
+        times.append(time.perf_counter() - start)
+        found += bool(results)
+    times.sort()
+    percentile = times[int(len(times) * kPercentile)]
+    print(f"{len(provider_map)} providers, index built in {build_time * 1000:.1f} ms")
+    print(f"{len(times)} searches, {found} with results")
+    print(f"median {times[len(times) // 2] * 1000:.3f} ms, {kPercentile:.0%} {percentile * 1000:.3f} ms, "
+          f"max {times[-1] * 1000:.3f} ms, budget {fuzzy_search.kLatencyBudget * 1000:.1f} ms")
+    assert percentile <= fuzzy_search.kLatencyBudget, "searches don't fit in the latency budget"
@@ -0,0 +1,44 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import provider_index
+from provider_map import ProviderRegistry
+
+# Startup benchmark (not part of the unit test suite): the time to load the provider list and
+# read the first favicon, from providers.json and from the prebuilt provider index.
+# Run from the project root: python tests/bench_provider_startup.py
+
+kRuns = 50
+kFirstIcon = "login.gov.png"
+
+def time_startup(zip_path, providers_path):
+    """ Return the median time (seconds) a new registry takes to build its map and read one favicon. """
+    times = []
+    for _ in range(kRuns):
+        start = time.perf_counter()
+        registry = ProviderRegistry(zip_path, providers_path)
+        registry.get_map()
+        registry.read_image(kFirstIcon)
+        times.append(time.perf_counter() - start)
+        if registry._zip:
+            registry._zip.close()
+        if registry._zip_file:
+            registry._zip_file.close()
+    return sorted(times)[len(times) // 2]
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as temp_dir:
+        providers_path = os.path.join(temp_dir, "providers.json")
+        zip_path = os.path.join(temp_dir, "favicons.zip")
+        shutil.copy("assets/providers.json", providers_path)
+        shutil.copy("assets/favicons.zip", zip_path)
+        json_time = time_startup(zip_path, providers_path)
+        count = provider_index.write_index(providers_path, zip_path)
+        index_time = time_startup(zip_path, providers_path)
+    print(f"{count} providers, median of {kRuns} runs")
+    print(f"providers.json: {json_time * 1000:8.2f} ms")
+    print(f"provider index: {index_time * 1000:8.2f} ms")
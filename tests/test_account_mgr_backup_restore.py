@@ -220,6 +220,20 @@ class TestAccountManager:
             assert vault_accounts[0]['issuer'] == "Boogie"
         os.remove("/tmp/backup_test2.json")
 
+    def test_export_skips_corrupt_secret(self, account_manager):
+        account_manager._accounts = []
+        account_manager.save_new_account(OtpRecord("Boggle", "Work", "secret_1"))
+        account_manager.save_new_account(OtpRecord("Github", "Personal", "secret_2"))
+        account_manager.save_new_account(OtpRecord("Amazon", "Shopping", "secret_3"))
+        account_manager.find_account("Github", "Personal").secret = "gAAAAABcorrupt"
+        export_path = account_manager.vault_path.with_name("export.json")
+        account_manager.export_accounts(str(export_path), 'json')
+        # The account that can't be decrypted is left out; the others are exported
+        with open(export_path, 'r') as f:
+            json_accounts = json.load(f)
+        assert [(account['issuer'], account['secret']) for account in json_accounts] == \
+               [("Amazon", "secret_3"), ("Boggle", "secret_1")]
+
     def test_import_preview(self,account_manager, sample_accounts):
         """Preview is just import that returns the account list before saving it."""
         # Erase accounts for a clean fixture
@@ -0,0 +1,167 @@
+import json
+import os
+import pytest
+from pathlib import Path
+import tempfile
+
+import cipher_funcs
+from account_mgr import AccountManager, OtpRecord
+
+
+@pytest.fixture
+def account_manager():
+    """Create an AccountManager instance using a vault in a temporary directory."""
+    temp_dir = tempfile.TemporaryDirectory()
+    test_vault_path = Path(temp_dir.name) / "vault.json"
+
+    manager = AccountManager(filename=str(test_vault_path))
+    saved_paths = (manager.vault_path, manager.backup_path)
+    manager.vault_path = test_vault_path
+    manager.backup_path = test_vault_path.with_suffix('.backup.json')
+    manager._accounts = []
+    manager.save_new_account(OtpRecord("Github", "Personal", "JBSWY3DPEHPK3PXP"))
+    manager.save_new_account(OtpRecord("Boggle", "Work", "GEZDGNBVGY3TQOJQ"))
+    manager.save_new_account(OtpRecord("Amazon", "Shopping", "GEZDGNBVGY3TQOJQ"))
+    yield manager  # Provide the fixture to the test
+
+    # Teardown code executes after the test
+    manager.vault_path, manager.backup_path = saved_paths
+    manager._accounts = None
+    temp_dir.cleanup()
+
+
+def edit_vault(manager, edit):
+    """ Modify the vault file the way another program would, keeping its mtime. """
+    stat = os.stat(manager.vault_path)
+    with open(manager.vault_path) as f:
+        content = json.load(f)
+    edit(content["vault"]["entries"])
+    with open(manager.vault_path, 'w') as f:
+        json.dump(content, f, indent=2)
+    os.utime(manager.vault_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+class TestVaultChangeDetection:
+    def test_touch_does_not_reload(self, account_manager):
+        accounts = account_manager.get_accounts()
+        os.utime(account_manager.vault_path)
+        assert account_manager.get_accounts() is accounts
+
+    def test_rewrite_with_same_mtime_detected(self, account_manager):
+        accounts = account_manager.get_accounts()
+
+        def rename(entries):
+            entries[0]["label"] = "Pxxxxxxx"  # same length as "Shopping"
+        edit_vault(account_manager, rename)
+        reloaded = account_manager.get_accounts()
+        assert reloaded is not accounts
+        assert reloaded[0].label == "Pxxxxxxx"
+
+    def test_entry_level_diff(self, account_manager):
+        github = account_manager.find_account("Github", "Personal")
+
+        def edit(entries):
+            entries[1]["used_frequency"] = 7  # Boggle modified
+            del entries[0]  # Amazon removed
+            entries.append(dict(entries[0], issuer="Dropbox", secret=cipher_funcs.encrypt("JBSWY3DPEHPK3PXP")))
+        edit_vault(account_manager, edit)
+        accounts = account_manager.get_accounts()
+        changes = account_manager.last_external_changes
+        assert changes.added == [("Dropbox", "Work")]
+        assert changes.removed == [("Amazon", "Shopping")]
+        assert changes.modified == [("Boggle", "Work")]
+        assert not changes.reordered
+        assert [account.issuer for account in accounts] == ["Boggle", "Github", "Dropbox"]
+        # Unchanged entries keep their objects
+        assert accounts[1] is github
+
+    def test_listeners_notified(self, account_manager):
+        received = []
+        account_manager.add_change_listener(received.append)
+        try:
+            def reverse(entries):
+                entries.reverse()
+            edit_vault(account_manager, reverse)
+            accounts = account_manager.get_accounts()
+            assert [account.issuer for account in accounts] == ["Github", "Boggle", "Amazon"]
+            assert len(received) == 1
+            assert received[0].reordered
+            assert not (received[0].added or received[0].removed or received[0].modified)
+            # Nothing changed since, so no more notifications
+            account_manager.get_accounts()
+            assert len(received) == 1
+        finally:
+            account_manager.remove_change_listener(received.append)
+
+
+class TestWriteBehind:
+    def test_pending_changes_kept_on_external_change(self, account_manager):
+        account_manager.enable_write_behind(delay=60)
+        try:
+            account_manager.save_new_account(OtpRecord("Dropbox", "Work", "JBSWY3DPEHPK3PXP"))
+
+            def rename(entries):
+                entries[0]["label"] = "Pxxxxxxx"
+            edit_vault(account_manager, rename)
+            # The unsaved entry isn't replaced by the vault on disk
+            assert account_manager.find_account("Dropbox", "Work") is not None
+            assert account_manager.flush_saves()
+            with open(account_manager.vault_path) as f:
+                entries = json.load(f)["vault"]["entries"]
+            assert [entry["issuer"] for entry in entries] == ["Dropbox", "Amazon", "Boggle", "Github"]
+            # Neither is the other program's change
+            assert entries[1]["label"] == "Pxxxxxxx"
+        finally:
+            account_manager.save_scheduler = None
+
+    def test_concurrent_edits_merged(self, account_manager):
+        received = []
+        account_manager.add_change_listener(received.append)
+        account_manager.enable_write_behind(delay=60)
+        try:
+            # Changes waiting to be saved: an entry added, one deleted and one used
+            account_manager.save_new_account(OtpRecord("Dropbox", "Work", "JBSWY3DPEHPK3PXP"))
+            account_manager.delete_account(account_manager.find_account("Boggle", "Work"))
+            github = account_manager.find_account("Github", "Personal")
+            github.used_frequency = 7
+            account_manager.record_usage(github)
+            assert account_manager.save_scheduler.pending_changes > 0
+
+            # Meanwhile another program adds an entry and edits two
+            added = {"issuer": "Zoom", "label": "Home", "secret": cipher_funcs.encrypt("GEZDGNBVGY3TQOJQ"),
+                     "last_used": "2025-01-01 10:00", "used_frequency": 0, "favorite": False, "icon": None}
+            def edit(entries):
+                for entry in entries:
+                    if entry["issuer"] in ("Amazon", "Github"):
+                        entry["favorite"] = True
+                entries.append(added)
+            edit_vault(account_manager, edit)
+
+            accounts = account_manager.get_accounts()
+            assert [(account.issuer, account.favorite) for account in accounts] == \
+                   [("Dropbox", False), ("Amazon", True), ("Github", True), ("Zoom", False)]
+            assert accounts[2].used_frequency == 7
+            # The listeners are told what the other program changed
+            assert received[-1].added == [("Zoom", "Home")]
+            assert sorted(received[-1].modified) == [("Amazon", "Shopping"), ("Github", "Personal")]
+            assert received[-1].removed == []
+
+            # The pending save writes both programs' changes
+            assert account_manager.flush_saves()
+            with open(account_manager.vault_path) as f:
+                entries = json.load(f)["vault"]["entries"]
+            assert [(entry["issuer"], entry["favorite"]) for entry in entries] == \
+                   [("Dropbox", False), ("Amazon", True), ("Github", True), ("Zoom", False)]
+        finally:
+            account_manager.remove_change_listener(received.append)
+            account_manager.save_scheduler = None
+
+    def test_save_writes_a_copy_of_the_list(self, account_manager):
+        written = []
+        account_manager.storage.write_all = lambda accounts: written.append(accounts) or True
+        try:
+            assert account_manager.save_accounts()
+        finally:
+            del account_manager.storage.write_all
+        assert written[0] == account_manager.get_accounts()
+        assert written[0] is not account_manager.get_accounts()
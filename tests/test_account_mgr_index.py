@@ -0,0 +1,64 @@
+import pytest
+from pathlib import Path
+import tempfile
+
+from account_mgr import AccountManager, Account, OtpRecord
+
+
+@pytest.fixture
+def account_manager():
+    """Create an AccountManager instance with a test home directory."""
+    temp_dir = tempfile.TemporaryDirectory()
+    test_vault_dir = Path(temp_dir.name) / "data"
+    test_vault_dir.mkdir()
+    test_vault_path = test_vault_dir / "vault.json"
+    test_vault_path.touch()
+
+    manager = AccountManager(filename=str(test_vault_path))
+    manager._accounts = []
+    yield manager  # Provide the fixture to the test
+
+    # Teardown code executes after the test
+    temp_dir.cleanup()
+
+
+class TestAccountIndex:
+    def test_lookup_after_insert(self, account_manager):
+        account_manager.save_new_account(OtpRecord("Github", "Personal", "JBSWY3DPEHPK3PXP"))
+        account_manager.save_new_account(OtpRecord("Boggle", "Work", "JBSWY3DPEHPK3PXP"))
+        assert account_manager.find_account("Boggle", "Work") is account_manager.get_accounts()[0]
+        assert account_manager.position_of("Boggle", "Work") == 0
+        assert account_manager.position_of("Github", "Personal") == 1
+        assert account_manager.find_account("Github", "Work") is None
+        assert account_manager.position_of("Github", "Work") == -1
+
+    def test_lookup_after_update_and_delete(self, account_manager):
+        account_manager.save_new_account(OtpRecord("Github", "Personal", "JBSWY3DPEHPK3PXP"))
+        account_manager.save_new_account(OtpRecord("Boggle", "Work", "JBSWY3DPEHPK3PXP"))
+        old = account_manager.get_accounts()[0]
+        renamed = Account("Boogie", old.label, old.secret, old.last_used)
+        assert account_manager.update_account(0, renamed)
+        assert account_manager.find_account("Boggle", "Work") is None
+        assert account_manager.find_account("Boogie", "Work") is renamed
+        # Renaming to an existing entry is a duplicate
+        assert not account_manager.update_account(0, Account("Github", "Personal", old.secret, old.last_used))
+
+        account_manager.delete_account(renamed)
+        assert account_manager.find_account("Boogie", "Work") is None
+        assert account_manager.position_of("Github", "Personal") == 0
+
+    def test_lookup_after_in_place_rename(self, account_manager):
+        account_manager.save_new_account(OtpRecord("Boggle", "Work", "JBSWY3DPEHPK3PXP"))
+        account = account_manager.get_accounts()[0]
+        account_manager.find_account("Boggle", "Work")
+        account.issuer = "Boogie"
+        assert account_manager.find_account("Boggle", "Work") is None
+        assert account_manager.position_of("Boogie", "Work") == 0
+
+    def test_lookup_after_sort(self, account_manager):
+        account_manager.save_new_account(OtpRecord("Able", "me", "JBSWY3DPEHPK3PXP"))
+        account_manager.save_new_account(OtpRecord("Baker", "me", "JBSWY3DPEHPK3PXP"))
+        assert account_manager.position_of("Able", "me") == 1
+        account_manager.sort_alphabetically()
+        assert account_manager.position_of("Able", "me") == 0
+        assert account_manager.position_of("Baker", "me") == 1
@@ -0,0 +1,80 @@
+import pytest
+from pathlib import Path
+import tempfile
+
+import account_mgr
+from account_mgr import AccountManager, OtpRecord
+
+
+@pytest.fixture
+def account_manager():
+    """Create an AccountManager instance using a vault in a temporary directory."""
+    temp_dir = tempfile.TemporaryDirectory()
+    test_vault_path = Path(temp_dir.name) / "vault.json"
+
+    manager = AccountManager(filename=str(test_vault_path))
+    saved_paths = (manager.vault_path, manager.backup_path)
+    manager.vault_path = test_vault_path
+    manager.backup_path = test_vault_path.with_suffix('.backup.json')
+    manager._accounts = []
+    manager.save_new_account(OtpRecord("Github", "Personal", "JBSWY3DPEHPK3PXP"))
+    manager.save_new_account(OtpRecord("Boggle", "Work", "GEZDGNBVGY3TQOJQ"))
+    yield manager  # Provide the fixture to the test
+
+    # Teardown code executes after the test
+    manager.vault_path, manager.backup_path = saved_paths
+    manager._accounts = None
+    temp_dir.cleanup()
+
+
+def use(manager, issuer, label, when):
+    """ Update an account's usage the way the view does and record it. """
+    account = manager.find_account(issuer, label)
+    account.last_used = when
+    account.used_frequency += 1
+    return manager.record_usage(account)
+
+
+class TestUsageJournal:
+    def test_usage_does_not_rewrite_vault(self, account_manager):
+        vault_before = account_manager.vault_path.read_text()
+        assert use(account_manager, "Github", "Personal", "2025-02-01 10:00:00")
+        assert use(account_manager, "Github", "Personal", "2025-02-01 10:01:00")
+        assert account_manager.vault_path.read_text() == vault_before
+        assert len(account_manager.journal_path.read_text().splitlines()) == 2
+
+    def test_journal_replayed_on_load(self, account_manager):
+        use(account_manager, "Github", "Personal", "2025-02-01 10:00:00")
+        use(account_manager, "Boggle", "Work", "2025-02-01 10:05:00")
+        use(account_manager, "Boggle", "Work", "2025-02-01 10:06:00")
+        # Simulate the next startup
+        account_manager._accounts = None
+        assert account_manager.find_account("Github", "Personal").used_frequency == 1
+        boggle = account_manager.find_account("Boggle", "Work")
+        assert boggle.last_used == "2025-02-01 10:06:00"
+        assert boggle.used_frequency == 2
+
+    def test_compact_on_request(self, account_manager):
+        use(account_manager, "Boggle", "Work", "2025-02-01 10:05:00")
+        assert account_manager.compact_journal()
+        assert not account_manager.journal_path.exists()
+        account_manager._accounts = None
+        assert account_manager.find_account("Boggle", "Work").last_used == "2025-02-01 10:05:00"
+
+    def test_compact_when_full(self, account_manager, monkeypatch):
+        monkeypatch.setattr(account_mgr, "kJournalCompactSize", 3)
+        use(account_manager, "Boggle", "Work", "2025-02-01 10:05:00")
+        use(account_manager, "Boggle", "Work", "2025-02-01 10:06:00")
+        assert account_manager.journal_path.exists()
+        use(account_manager, "Boggle", "Work", "2025-02-01 10:07:00")
+        assert not account_manager.journal_path.exists()
+        assert "2025-02-01 10:07:00" in account_manager.vault_path.read_text()
+
+    def test_partial_record_skipped(self, account_manager):
+        use(account_manager, "Boggle", "Work", "2025-02-01 10:05:00")
+        # A crash while appending leaves an incomplete last line
+        with open(account_manager.journal_path, 'a') as f:
+            f.write('{"issuer": "Github", "lab')
+        account_manager._accounts = None
+        assert account_manager.find_account("Boggle", "Work").used_frequency == 1
+        assert account_manager.find_account("Github", "Personal").used_frequency == 0
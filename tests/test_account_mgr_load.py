@@ -129,3 +129,63 @@ class TestAccountManager:
         assert updated_account.secret == encrypted_secret
         assert updated_account.used_frequency == 7
 
+
+
+def test_load_does_not_decrypt(tmp_path):
+    """ Loading a vault verifies each secret without decrypting it. """
+    entries = [Account("Google", "Work", cipher_funcs.encrypt("JBSWY3DPEHPK3PXP"), "2024-01-14 10:00").to_dict()]
+    vault_path = tmp_path / "vault.json"
+    with open(vault_path, 'w') as outfile:
+        json.dump({"vault": {"version": "1", "entries": entries}}, outfile)
+    account_manager = AccountManager(filename=vault_path)
+    saved_path = account_manager.vault_path
+    account_manager.vault_path = vault_path
+    try:
+        with patch('cipher_funcs.decrypt') as mock_decrypt:
+            accounts = account_manager._load_accounts_from_disk()
+            mock_decrypt.assert_not_called()
+    finally:
+        account_manager.vault_path = saved_path
+    assert len(accounts) == 1
+    assert accounts[0] == Account(**entries[0])
+
+
+def test_account_dict_round_trip():
+    """ Accounts have no __dict__; to_dict and from_dict convert them for the vault. """
+    account = Account("Google", "Work", cipher_funcs.encrypt("JBSWY3DPEHPK3PXP"), "2024-01-14 10:00", 3)
+    assert not hasattr(account, '__dict__')
+    fields = account.to_dict()
+    assert fields['used_frequency'] == 3 and fields['icon'] is None
+    assert Account.from_dict(fields) == account
+    # Issuers are interned, and missing optional fields get their defaults
+    other = Account.from_dict({'issuer': "".join(["Goo", "gle"]), 'label': "Home", 'secret': account.secret})
+    assert other.issuer is Account.from_dict(fields).issuer
+    assert other.used_frequency == 0 and other.favorite is False
+    assert OtpRecord.from_dict(OtpRecord("Google", "Work", "JBSWY3DPEHPK3PXP").to_dict()).label == "Work"
+
+
+def test_save_writes_key_check(tmp_path):
+    """ A saved vault is version 2 with a key-check value that rejects a different key. """
+    account_manager = AccountManager(filename=tmp_path / "vault.json")
+    saved_path = account_manager.vault_path
+    account_manager.vault_path = tmp_path / "vault.json"
+    try:
+        account_manager._accounts = [Account("Google", "Work", cipher_funcs.encrypt("JBSWY3DPEHPK3PXP"), "2024-01-14 10:00")]
+        assert account_manager.save_accounts()
+        with open(account_manager.vault_path) as infile:
+            content = json.load(infile)
+        assert content["vault"]["version"] == "2"
+        assert cipher_funcs.verify_key_check(content["vault"]["key_check"])
+        # Each save makes one key-check value
+        with patch('cipher_funcs.make_key_check', wraps=cipher_funcs.make_key_check) as mock_make_key_check:
+            assert account_manager.save_accounts()
+            mock_make_key_check.assert_called_once()
+        # Version 2 checks the key once instead of checking each secret
+        with patch('cipher_funcs.is_valid_token') as mock_is_valid:
+            assert AccountManager._validate_vault_data(content)
+            mock_is_valid.assert_not_called()
+        # A vault from another machine is rejected by the header
+        with patch('appconfig.AppConfig.get_alt_id', return_value="some-other-machine"):
+            assert not AccountManager._validate_vault_data(content)
+    finally:
+        account_manager.vault_path = saved_path
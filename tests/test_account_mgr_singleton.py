@@ -4,6 +4,7 @@ import pytest
 import threading
 import os
 import json
+from datetime import datetime
 from unittest.mock import patch, mock_open
 from account_mgr import AccountManager, Account, OtpRecord
 
@@ -126,3 +127,20 @@ def test_duplicate_accounts(sample_accounts):
     assert duplicates[2].favorite == account3.favorite
     assert duplicates[2].icon == account3.icon
     assert duplicates[2] is not accounts[2], "duplicate_accounts should create distinct copies"
+
+def test_duplicate_accounts_does_not_decrypt(sample_accounts):
+    accounts = [OtpRecord(acc['issuer'],acc['label'],acc['secret']).toAccount() for acc in sample_accounts['vault']['entries']]
+    with patch('cipher_funcs.decrypt') as mock_decrypt:
+        duplicates = AccountManager.duplicate_accounts(accounts)
+        mock_decrypt.assert_not_called()
+    assert duplicates == accounts
+
+def test_default_last_used_is_current_time():
+    encrypted_secret = OtpRecord('issuer3','user3','secret3').toAccount().secret
+    with patch('time.time', return_value=1700000000.5):
+        early = Account('issuer3', 'user3', encrypted_secret)
+    with patch('time.time', return_value=1700000060.0):
+        late = Account.trusted('issuer3', 'user4', encrypted_secret)
+    # Each account gets the time it was created, not the time the module was imported
+    assert early.last_used == datetime.fromtimestamp(1700000000).strftime("%Y-%m-%d %H:%M:%S")
+    assert late.last_used == datetime.fromtimestamp(1700000060).strftime("%Y-%m-%d %H:%M:%S")
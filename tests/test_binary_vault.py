@@ -0,0 +1,176 @@
+import pytest
+from pathlib import Path
+import tempfile
+import time
+from unittest.mock import Mock, patch
+
+from account_mgr import AccountManager, Account, OtpRecord, JsonVaultStorage
+import binary_vault
+from binary_vault import BinaryVaultStorage, LazyAccount, encode_vault, open_vault
+from otp_engine import OtpEngine
+from vault_list_view import VaultListModel
+
+
+@pytest.fixture
+def account_manager():
+    """Create an AccountManager instance using a JSON vault with three entries in a temporary directory."""
+    temp_dir = tempfile.TemporaryDirectory()
+    test_vault_path = Path(temp_dir.name) / "vault.json"
+
+    manager = AccountManager(filename=str(test_vault_path))
+    saved_state = (manager.vault_path, manager.backup_path, manager.save_scheduler)
+    manager.vault_path = test_vault_path
+    manager.backup_path = test_vault_path.with_suffix('.backup.json')
+    manager.save_scheduler = None  # save immediately
+    manager._accounts = []
+    manager.save_new_account(OtpRecord("Github", "Personal", "JBSWY3DPEHPK3PXP"))
+    manager.save_new_account(OtpRecord("Boggle", "Work", "GEZDGNBVGY3TQOJQ"))
+    manager.save_new_account(OtpRecord("Amazon", "Shopping", "GEZDGNBVGY3TQOJQ"))
+    yield manager  # Provide the fixture to the test
+
+    # Teardown code executes after the test
+    manager.set_storage(JsonVaultStorage(manager))
+    manager.vault_path, manager.backup_path, manager.save_scheduler = saved_state
+    manager._accounts = None
+    temp_dir.cleanup()
+
+
+def stored_accounts(manager, binary_path):
+    """ Read the accounts in the binary vault with a separate storage object. """
+    return BinaryVaultStorage(manager, binary_path).load()
+
+
+def test_convert_and_load_lazily(account_manager):
+    accounts = list(account_manager.get_accounts())
+    binary_path = account_manager.vault_path.with_suffix('.eav')
+    account_manager.set_storage(open_vault(account_manager, binary_path))
+
+    loaded = account_manager.get_accounts()
+    assert all(isinstance(account, LazyAccount) for account in loaded)
+    # Nothing is decoded until a field is used
+    assert all(account._vault_file is not None for account in loaded)
+    assert loaded[1].label == "Work"
+    assert loaded[1]._vault_file is None and loaded[0]._vault_file is not None
+    assert loaded == accounts
+    # Secrets are stored as raw token bytes, not base64 text
+    assert accounts[0].secret.encode() not in binary_path.read_bytes()
+
+
+def test_changes_rewrite_vault(account_manager):
+    binary_path = account_manager.vault_path.with_suffix('.eav')
+    account_manager.set_storage(open_vault(account_manager, binary_path))
+
+    account_manager.save_new_account(OtpRecord("Dropbox", "Work", "JBSWY3DPEHPK3PXP"))
+    boggle = account_manager.find_account("Boggle", "Work")
+    account_manager.update_account(account_manager.position_of("Boggle", "Work"),
+                                   Account("Boggle", "Home", boggle.secret, boggle.last_used))
+    account_manager.delete_account(account_manager.find_account("Amazon", "Shopping"))
+    github = account_manager.find_account("Github", "Personal")
+    github.used_frequency = 9
+    account_manager.record_usage(github)
+    assert stored_accounts(account_manager, binary_path) == account_manager.get_accounts()
+    assert [(account.issuer, account.label) for account in stored_accounts(account_manager, binary_path)] == \
+           [("Dropbox", "Work"), ("Boggle", "Home"), ("Github", "Personal")]
+    assert stored_accounts(account_manager, binary_path)[2].used_frequency == 9
+    # The JSON vault isn't touched
+    assert "Dropbox" not in account_manager.vault_path.read_text()
+
+
+def test_external_change_detected(account_manager):
+    binary_path = account_manager.vault_path.with_suffix('.eav')
+    account_manager.set_storage(open_vault(account_manager, binary_path))
+    accounts = account_manager.get_accounts()
+    assert account_manager.get_accounts() is accounts
+
+    # Another instance changes one entry
+    other = stored_accounts(account_manager, binary_path)
+    other[1].used_frequency = 5
+    BinaryVaultStorage(account_manager, binary_path).write_all(other)
+    reloaded = account_manager.get_accounts()
+    assert account_manager.find_account("Boggle", "Work").used_frequency == 5
+    assert account_manager.last_external_changes.modified == [("Boggle", "Work")]
+    assert reloaded[2] is accounts[2]
+
+
+def test_different_key_is_read_only(account_manager):
+    binary_path = account_manager.vault_path.with_suffix('.eav')
+    binary_path.write_bytes(encode_vault(account_manager.get_accounts()))
+    with patch('appconfig.AppConfig.get_alt_id', return_value="some-other-machine"):
+        storage = BinaryVaultStorage(account_manager, binary_path)
+        assert storage.load() == []
+        assert not storage.write_all([])
+    assert len(stored_accounts(account_manager, binary_path)) == 3
+
+
+def test_damaged_vault_restored_from_backup(account_manager):
+    binary_path = account_manager.vault_path.with_suffix('.eav')
+    account_manager.set_storage(open_vault(account_manager, binary_path))
+    assert account_manager.storage.watch_path() == binary_path
+    accounts = list(account_manager.get_accounts())
+    # The second save keeps the first as the backup
+    assert account_manager.save_accounts()
+    assert binary_path.with_suffix('.backup.eav').exists()
+
+    data = binary_path.read_bytes()
+    for damaged in (data[:len(data) - 10], data[:8], b"", b"XXXX" + data[4:]):
+        binary_path.write_bytes(damaged)
+        assert BinaryVaultStorage(account_manager, binary_path).load() == accounts
+    # Without a backup the vault is empty rather than an error
+    binary_path.with_suffix('.backup.eav').unlink()
+    assert BinaryVaultStorage(account_manager, binary_path).load() == []
+
+
+def test_damaged_vault_not_backed_up(account_manager):
+    binary_path = account_manager.vault_path.with_suffix('.eav')
+    account_manager.set_storage(open_vault(account_manager, binary_path))
+    account_manager.save_accounts()
+    backup = binary_path.with_suffix('.backup.eav').read_bytes()
+    binary_path.write_bytes(b"EAVB")
+    storage = BinaryVaultStorage(account_manager, binary_path)
+    recovered = storage.load()
+    assert len(recovered) == 3
+    assert storage.write_all(recovered)
+    # The damaged file didn't replace the good backup
+    assert binary_path.with_suffix('.backup.eav').read_bytes() == backup
+    assert stored_accounts(account_manager, binary_path) == recovered
+
+
+def test_save_and_display_without_decoding(account_manager):
+    binary_path = account_manager.vault_path.with_suffix('.eav')
+    account_manager.set_storage(open_vault(account_manager, binary_path))
+    loaded = account_manager.get_accounts()
+    model = VaultListModel(OtpEngine(), Mock())
+    model.set_accounts(loaded)
+    assert model.rowCount() == 3
+    loaded[0].used_frequency = 4  # decodes only this entry
+    assert account_manager.save_accounts()
+    # Entries not used are copied to the new file as they were, still not decoded
+    assert [account._vault_file is None for account in loaded] == [True, False, False]
+    assert stored_accounts(account_manager, binary_path) == loaded
+    assert loaded[2].label == "Personal"
+
+
+def test_decode_while_scheduled_save_runs(account_manager):
+    for number in range(20):
+        account_manager.save_new_account(OtpRecord(f"Issuer{number}", f"Label{number}", "JBSWY3DPEHPK3PXP"))
+    expected = {account.issuer: (account.label, account.secret) for account in account_manager.get_accounts()}
+    binary_path = account_manager.vault_path.with_suffix('.eav')
+    open_vault(account_manager, binary_path)
+    account_manager.set_storage(BinaryVaultStorage(account_manager, binary_path))
+    accounts = account_manager.get_accounts()
+    account_manager.enable_write_behind(delay=0)
+
+    def slow_decode(buffer, offset, length):
+        time.sleep(0.001)  # long enough for the save to move the records
+        return decode_record(buffer, offset, length)
+    decode_record = binary_vault._decode_record
+    with patch('binary_vault._decode_record', slow_decode):
+        # The save on the scheduler's thread moves every record and releases the mapped file
+        # while this thread decodes them
+        assert account_manager.reorder(list(reversed(range(len(accounts)))))
+        for account in accounts:
+            assert (account.label, account.secret) == expected[account.issuer]
+    assert account_manager.flush_saves()
+    assert account_manager.save_scheduler.pending_changes == 0
+    assert {account.issuer: (account.label, account.secret)
+            for account in stored_accounts(account_manager, binary_path)} == expected
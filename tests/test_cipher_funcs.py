@@ -1,3 +1,8 @@
+from unittest.mock import patch
+
+import pytest
+from cryptography.fernet import InvalidToken
+
 import cipher_funcs
 
 class TestSecretsManager:
@@ -11,3 +16,50 @@ class TestSecretsManager:
         print (secret)
         cipher_funcs.decrypt(secret)
 
+
+    def test_key_derived_once(self):
+        cipher_funcs.invalidate_key_cache()
+        count = cipher_funcs.get_derivation_count()
+        for item in range(10):
+            cipher_funcs.decrypt(cipher_funcs.encrypt("ABC234"))
+        assert cipher_funcs.get_derivation_count() == count + 1
+
+    def test_alt_id_change_invalidates_key(self):
+        with patch('appconfig.AppConfig.get_alt_id', return_value="some-other-machine"):
+            secret = cipher_funcs.encrypt("ABC234")
+            count = cipher_funcs.get_derivation_count()
+            assert cipher_funcs.decrypt(secret) == "ABC234"
+            assert cipher_funcs.get_derivation_count() == count
+        # Back to the default key, which can't read the other machine's secret
+        with pytest.raises(InvalidToken):
+            cipher_funcs.decrypt(secret)
+
+    def test_encrypt_decrypt_many(self):
+        secrets = ["ABC234", "hello world", ""]
+        encrypted = cipher_funcs.encrypt_many(secrets)
+        assert len(encrypted) == len(secrets)
+        assert cipher_funcs.decrypt_many(encrypted) == secrets
+        assert cipher_funcs.decrypt(encrypted[0]) == "ABC234"
+
+    def test_encrypt_decrypt_many_threaded(self):
+        secrets = [f"SECRET{item}" for item in range(cipher_funcs.kParallelThreshold)]
+        encrypted = cipher_funcs.encrypt_many(secrets, max_workers=4)
+        assert cipher_funcs.decrypt_many(encrypted, max_workers=4) == secrets
+
+    def test_decrypt_many_invalid(self):
+        encrypted = cipher_funcs.encrypt_many(["ABC234"])
+        with pytest.raises(InvalidToken):
+            cipher_funcs.decrypt_many(encrypted + ["not a token"])
+
+    def test_is_valid_token(self):
+        secret = cipher_funcs.encrypt("ABC234")
+        assert cipher_funcs.is_valid_token(secret)
+        assert not cipher_funcs.is_valid_token("ABC234")
+        assert not cipher_funcs.is_valid_token("")
+        # Tampered token fails the HMAC check
+        tampered = secret[:20] + ("A" if secret[20] != "A" else "B") + secret[21:]
+        assert not cipher_funcs.is_valid_token(tampered)
+        # Token from a different key
+        with patch('appconfig.AppConfig.get_alt_id', return_value="some-other-machine"):
+            other_secret = cipher_funcs.encrypt("ABC234")
+        assert not cipher_funcs.is_valid_token(other_secret)
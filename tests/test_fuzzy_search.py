@@ -0,0 +1,36 @@
+import fuzzy_search
+from fuzzy_search import FuzzySearch, domain_key, normalize, prefix_distance
+
+
+def make_search():
+    return FuzzySearch({'Google': {'png_filename': 'www.google.com.png'},
+                        'Google Pay': {'png_filename': 'pay.google.com.png'},
+                        'Microsoft Azure': {'png_filename': 'azure.microsoft.com.png'},
+                        'Office 365': {'png_filename': 'office.microsoft.com.png'},
+                        'Mint': {'png_filename': 'www.mint.intuit.com.png'},
+                        'GitHub': {'png_filename': 'github.com.png'}})
+
+def test_keys():
+    assert normalize("Micro soft (US)") == "microsoftus"
+    assert domain_key("www.mint.intuit.com") == "mintintuit"
+    assert domain_key("localhost") == "localhost"
+    assert prefix_distance("gogle", "googlepay", 2) == 1
+    assert prefix_distance("xyz", "google", 1) == 2
+
+def test_ranking():
+    search = make_search()
+    names = lambda text: [match.name for match in search.search(text)]
+    assert names("google") == ['Google', 'Google Pay']  # exact before prefix
+    assert names("gogle") == ['Google', 'Google Pay']  # a typo
+    assert names("micro soft") == ['Microsoft Azure', 'Office 365']  # by name, then by domain
+    assert names("intuit") == ['Mint']
+    assert names("githb")[0] == 'GitHub'
+    assert names("zzzzzz") == [] and names("  ") == []
+    match = search.search("gogle")[0]
+    assert (match.domain, match.match, match.distance) == ('www.google.com', fuzzy_search.kMatchFuzzy, 1)
+
+def test_limit_and_budget():
+    search = make_search()
+    assert len(search.search("g", limit=1)) == 1
+    # With no time to spend, nothing is scored
+    assert search.search("gogle", budget=-1) == []
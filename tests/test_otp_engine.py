@@ -0,0 +1,48 @@
+import pyotp
+
+import cipher_funcs
+import otp_engine
+from account_mgr import OtpRecord
+from otp_engine import OtpEngine
+
+class TestOtpEngine:
+    def test_codes_match_pyotp(self):
+        engine = OtpEngine()
+        accounts = [OtpRecord("Woogle", "me", "GEZDGNBVGY3TQOJQ").toAccount(),
+                    OtpRecord("Figma", "you", "JBSWY3DPEHPK3PXP").toAccount()]
+        time_step = otp_engine.current_time_step()
+        codes = engine.codes_for_time_step(accounts, time_step)
+        assert codes[0] == pyotp.TOTP("GEZDGNBVGY3TQOJQ").at(time_step * 30)
+        assert codes[1] == pyotp.TOTP("JBSWY3DPEHPK3PXP").at(time_step * 30)
+        # Next time step uses the cached state
+        assert engine.code_for(accounts[1], time_step + 1) == pyotp.TOTP("JBSWY3DPEHPK3PXP").at((time_step + 1) * 30)
+        assert len(engine) == 2
+
+    def test_secret_change_invalidates_entry(self):
+        engine = OtpEngine()
+        account = OtpRecord("Woogle", "me", "GEZDGNBVGY3TQOJQ").toAccount()
+        engine.code_for(account, 1)
+        account.secret = cipher_funcs.encrypt("JBSWY3DPEHPK3PXP")
+        assert engine.code_for(account, 1) == pyotp.TOTP("JBSWY3DPEHPK3PXP").at(30)
+
+    def test_cache_is_bounded(self):
+        engine = OtpEngine(max_entries=2)
+        accounts = [OtpRecord("Woogle", f"me{item}", "GEZDGNBVGY3TQOJQ").toAccount() for item in range(3)]
+        engine.codes_for_time_step(accounts, 1)
+        assert len(engine) == 2
+
+    def test_invalid_secret(self):
+        engine = OtpEngine()
+        account = OtpRecord("Woogle", "me", "GEZDGNBVGY3TQOJQ").toAccount()
+        account.secret = cipher_funcs.encrypt("AZ12")  # 1 is invalid base32
+        assert engine.code_for(account) == otp_engine.kInvalidCode
+
+    def test_prefetch_next_time_step(self):
+        engine = OtpEngine()
+        account = OtpRecord("Woogle", "me", "GEZDGNBVGY3TQOJQ").toAccount()
+        time_step = otp_engine.current_time_step() + 1
+        engine.prefetch([account], time_step).join()
+        prefetched_step, prefetched_codes = engine._prefetched
+        assert prefetched_step == time_step
+        assert prefetched_codes[account.secret] == pyotp.TOTP("GEZDGNBVGY3TQOJQ").at(time_step * 30)
+        assert engine.codes_for_time_step([account], time_step) == [prefetched_codes[account.secret]]
@@ -1,9 +1,11 @@
-from PyQt5.QtWidgets import QApplication, QLabel
+from PyQt5.QtWidgets import QApplication, QLabel, QLineEdit
 
 from appconfig import AppConfig
 from provider_map import get_color_for_letter
-from provider_map import Providers
-import logging, unittest
+from provider_map import Providers, ProviderRegistry, ProviderSearchIndex, ProviderCompleter
+import provider_index
+import logging, os, shutil, sys, tempfile, unittest, zipfile
+from unittest.mock import patch
 logging.basicConfig(
     level=logging.DEBUG,
     format="%(name)s - %(levelname)s - %(message)s",
@@ -54,15 +56,16 @@ class TestProviderMap(unittest.TestCase):
         assert result.pixmap() is not None
         result = map.get_provider_icon("missing provider")
         assert result is not None
-        assert result.text() == "m"  #first letter of 'missing'
-        assert result.pixmap() == None
+        assert result.accessibleName() == "m"  #first letter of 'missing'
+        # The badge of the letter is shown
+        assert result.pixmap() is not None and not result.pixmap().isNull()
 
     def test_get_provider_icon_missingmap(self):
         map = Providers()
         map.provider_map = {}
         result = map.get_provider_icon("Mint")
         assert result is not None
-        assert result.text() == "M"  #first letter of 'Mint'
+        assert result.accessibleName() == "M"  #first letter of 'Mint'
 
     def test_zipfile_present(self):
         providers = Providers()
@@ -70,10 +73,9 @@ class TestProviderMap(unittest.TestCase):
         logging.getLogger().addHandler(logging.StreamHandler())
         # Verify default path
         assert providers.kZipPath == "assets/favicons.zip"
-        ret_dict = providers._load_imgdict_from_zipimages()
-        assert ret_dict is not None
-        assert len(ret_dict) > 0
-        assert ret_dict['101domain.com.png'][:4] == b'\x89PNG'
+        raw_image = providers.get_raw_image('101domain')
+        assert raw_image is not None
+        assert raw_image[:4] == b'\x89PNG'
 
     def test_zipfile_notfound(self):
         providers = Providers()
@@ -83,10 +85,128 @@ class TestProviderMap(unittest.TestCase):
         assert providers.kZipPath == "assets/favicons.zip"
         #set zip path to non-existant file
         providers.kZipPath = "/tmp/thisfiledoesntexist"
-        ret_dict = providers._load_imgdict_from_zipimages()
-        assert ret_dict is not None
-        assert len(ret_dict) == 0
+        assert providers.registry.read_image('101domain.com.png') is None
+        assert providers.get_raw_image('101domain') is None
+
+    def test_registry_shared(self):
+        first = Providers()
+        second = Providers()
+        assert first.registry is second.registry
+        assert first.provider_map is second.provider_map
+        # Assigning a map only affects that object
+        second.provider_map = {}
+        assert len(first.provider_map) > 0
+
+    def test_registry_reads_images_on_demand(self):
+        registry = ProviderRegistry("assets/favicons.zip", "assets/providers.json")
+        assert len(registry.get_map()) > 0
+        assert len(registry._images) == 0
+        raw_image = registry.read_image("login.gov.png")
+        assert raw_image[:4] == b'\x89PNG'
+        assert registry.read_image("login.gov.png") is raw_image
+        assert registry.read_image("no-such-domain.png") is None
+        # The caches hold an icon for every provider
+        assert registry._image_cache_size >= len(registry.get_map())
+        assert registry.pixmaps.max_size >= len(registry.get_map())
+        # The cache is bounded, dropping the least recently used image
+        registry._image_cache_size = 2
+        registry.read_image("101domain.com.png")
+        registry.read_image("login.gov.png")
+        registry.read_image("www.mint.intuit.com.png")
+        assert list(registry._images) == ["login.gov.png", "www.mint.intuit.com.png"]
+
+    def test_registry_uses_provider_index(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            providers_path = os.path.join(temp_dir, "providers.json")
+            zip_path = os.path.join(temp_dir, "favicons.zip")
+            shutil.copy("assets/providers.json", providers_path)
+            shutil.copy("assets/favicons.zip", zip_path)
+            from_json = ProviderRegistry(zip_path, providers_path)
+            json_map = from_json.get_map()
+            assert len(from_json._members) == 0
+            assert provider_index.write_index(providers_path, zip_path) == len(json_map)
+
+            indexed = ProviderRegistry(zip_path, providers_path)
+            assert list(indexed.get_map().items()) == list(json_map.items())
+            assert len(indexed._members) > 0
+            # Favicons are read at their indexed offsets, without opening the zip directory
+            with zipfile.ZipFile(zip_path) as zip_file:
+                for png_filename in ("login.gov.png", "101domain.com.png", "www.mint.intuit.com.png"):
+                    assert indexed.read_image(png_filename) == zip_file.read(png_filename)
+            assert indexed._zip is None
+            indexed._zip_file.close()
+
+            # An index that doesn't match the files is ignored, even if their sizes are the same
+            stat = os.stat(providers_path)
+            with open(providers_path, "rb") as f:
+                data = f.read()
+            with open(providers_path, "wb") as f:
+                f.write(data.replace(b'"login.gov"', b'"login.gox"'))
+            # (a second later, whatever the file system's time resolution)
+            os.utime(providers_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            assert os.path.getsize(providers_path) == stat.st_size
+            assert provider_index.read_index(providers_path, zip_path) is None
+            # The packaged app's assets don't change, so its index isn't checked
+            with patch.object(sys, 'frozen', True, create=True):
+                assert len(provider_index.read_index(providers_path, zip_path)) == len(json_map)
+            stale = ProviderRegistry(zip_path, providers_path)
+            assert 'login.gox' in stale.get_map() and len(stale._members) == 0
+            for registry in (from_json, stale):
+                registry._zip.close()
+
+    def test_search_index_matches_scan(self):
+        providers = Providers()
+        names = list(providers.provider_map)
+        index = providers.search_index
+        assert index is Providers().search_index
+        for text in ("", "g", "Go", "goo", "google", "bank", "an", "x", ".com", "zzz", "(isc)"):
+            assert index.prefix(text) == [name for name in names if name.lower().startswith(text.lower())]
+            assert index.contains(text) == [name for name in names if text.lower() in name.lower()]
+
+    def test_search_index_of_assigned_map(self):
+        providers = Providers()
+        providers.provider_map = {'Alpha': {}, 'beta': {}, 'Alphabet': {}}
+        assert providers.search_index.prefix("alp") == ['Alpha', 'Alphabet']
+        assert providers.search_index.contains("ET") == ['beta', 'Alphabet']
+        assert ProviderSearchIndex([]).contains("abcd") == []
 
+    def test_fuzzy_search(self):
+        providers = Providers()
+        assert providers.fuzzy_search is Providers().fuzzy_search
+        assert providers.fuzzy_search.search("gogle")[0].name == 'Google'
+        providers.provider_map = {'Alpha': {'png_filename': 'alpha.com.png'}}
+        assert [match.name for match in providers.fuzzy_search.search("alpah")] == ['Alpha']
+
+    def test_completer_uses_search_index(self):
+        line_edit = QLineEdit()
+        completer = ProviderCompleter(ProviderSearchIndex(['Google', 'Goodreads', 'Microsoft', 'Mongo']))
+        line_edit.setCompleter(completer)
+        completer.setCompletionPrefix("GO")
+        assert completer.model().stringList() == ['Google', 'Goodreads', 'Mongo']
+        assert completer.completionCount() == 3
+        completer.setCompletionPrefix("soft")
+        assert completer.completionCount() == 1 and completer.currentCompletion() == 'Microsoft'
+
+    def test_pixmap_cache(self):
+        providers = Providers()
+        stats = providers.get_cache_stats()
+        first = providers.get_provider_icon_pixmap("login.gov", 16, 1.0)
+        assert first.width() == 16
+        assert providers.get_cache_stats()["misses"] == stats["misses"] + 1
+        # Another Providers object uses the same cache
+        assert Providers().get_provider_icon_pixmap("login.gov", 16, 1.0) is first
+        assert providers.get_cache_stats()["hits"] == stats["hits"] + 1
+        # Each size and pixel ratio has its own pixmap
+        large = providers.get_provider_icon_pixmap("login.gov", 16, 2.0)
+        assert large.width() == 32 and large.devicePixelRatio() == 2.0
+        assert providers.get_provider_icon_pixmap("missing provider") is None
+
+    def test_letter_badge_cached(self):
+        providers = Providers()
+        badge = providers.get_letter_badge("Q", 16, 1.0)
+        assert badge.width() == 16
+        assert Providers().get_letter_badge("Q", 16, 1.0) is badge
+        assert providers.get_letter_badge("R", 16, 1.0) is not badge
 
     # Tests of utility method
     def test_get_color_for_valid_letter(self):
@@ -15,3 +15,26 @@ def test_load_data(qtbot):
     dlg.load_data()
     assert len(dlg.all_items) > 0
 
+
+def test_icons_read_when_displayed(qtbot):
+    dlg = ProviderSearchDialog()
+    misses = dlg.providers.get_cache_stats()["misses"]
+    dlg.load_data()
+    # No icon is decoded until its row is displayed
+    assert dlg.providers.get_cache_stats()["misses"] == misses
+    icons = [dlg.table.item(row, 0).data(Qt.DecorationRole) for row in range(dlg.table.rowCount())]
+    assert any(icon is not None for icon in icons)
+    misses = dlg.providers.get_cache_stats()["misses"]
+    # Showing every provider again decodes no icons
+    dlg.populate_table(dlg.all_items)
+    for row in range(dlg.table.rowCount()):
+        dlg.table.item(row, 0).data(Qt.DecorationRole)
+    assert dlg.providers.get_cache_stats()["misses"] == misses
+
+def test_provider_without_icon(qtbot):
+    dlg = ProviderSearchDialog()
+    dlg.providers.provider_map = {'Nowhere': {'png_filename': 'no-such-domain.png'}}
+    dlg.load_data()
+    assert dlg.table.rowCount() == 1
+    assert dlg.table.item(0, 0).data(Qt.DecorationRole) is None
+    assert dlg.table.item(0, 1).text() == 'Nowhere'
@@ -0,0 +1,78 @@
+import threading
+import time
+
+from save_scheduler import SaveScheduler
+
+
+class FakeVault:
+    """ Counts saves and records which thread performed them. """
+    def __init__(self, result=True):
+        self.saves = 0
+        self.threads = []
+        self.result = result
+        self.saved = threading.Event()
+
+    def save(self):
+        self.saves += 1
+        self.threads.append(threading.current_thread())
+        self.saved.set()
+        return self.result
+
+
+def test_burst_coalesced_into_one_save():
+    vault = FakeVault()
+    scheduler = SaveScheduler(vault.save, delay=0.05)
+    for _ in range(5):
+        scheduler.request_save()
+    assert scheduler.pending_changes == 5
+    assert vault.saved.wait(2)
+    time.sleep(0.1)
+    assert vault.saves == 1
+    assert vault.threads[0] is not threading.current_thread()
+    stats = scheduler.get_stats()
+    assert stats["pending_changes"] == 0
+    assert stats["flush_count"] == 1
+    assert stats["last_flush_latency"] >= 0.05
+
+
+def test_flush_saves_now():
+    vault = FakeVault()
+    scheduler = SaveScheduler(vault.save, delay=60)
+    scheduler.request_save()
+    scheduler.request_save()
+    assert scheduler.flush()
+    assert vault.saves == 1
+    assert vault.threads[0] is threading.current_thread()
+    assert scheduler.pending_changes == 0
+    # Nothing left to save
+    assert scheduler.flush()
+    assert vault.saves == 1
+
+
+def test_failed_save_stays_pending():
+    vault = FakeVault(result=False)
+    scheduler = SaveScheduler(vault.save, delay=60)
+    scheduler.request_save()
+    assert not scheduler.flush()
+    assert scheduler.pending_changes == 1
+    vault.result = True
+    assert scheduler.flush()
+    assert scheduler.pending_changes == 0
+
+
+def test_failed_save_retried():
+    vault = FakeVault()
+    results = [False, True]
+    done = threading.Event()
+    def save():
+        vault.save()
+        if vault.saves == 2:
+            done.set()
+        return results[vault.saves - 1]
+    scheduler = SaveScheduler(save, delay=0.02)
+    scheduler.request_save()
+    # The failed save is retried without another change being made
+    assert done.wait(2)
+    time.sleep(0.05)
+    assert vault.saves == 2
+    assert scheduler.pending_changes == 0
@@ -0,0 +1,40 @@
+from unittest.mock import patch
+
+from account_mgr import OtpRecord
+import sort_order
+from sort_order import SortKeyCache, timestamp_key
+
+
+def make_accounts():
+    accounts = [OtpRecord("boggle", "Work", "JBSWY3DPEHPK3PXP").toAccount(),
+                OtpRecord("Amazon", "Shopping", "GEZDGNBVGY3TQOJQ").toAccount(),
+                OtpRecord("Github", "Personal", "JBSWY3DPEHPK3PXP").toAccount()]
+    accounts[0].last_used, accounts[0].used_frequency = "2025-02-01 10:00:00", 1
+    accounts[1].last_used, accounts[1].used_frequency = "2025-01-01 12:00", 5
+    accounts[2].last_used, accounts[2].used_frequency = "2025-03-01 09:30:00", 1
+    return accounts
+
+def test_timestamp_key():
+    assert timestamp_key("2025-01-02 12:00:30") == 20250102120030
+    assert timestamp_key("2025-01-02 12:00") == 20250102120000
+    assert timestamp_key("") == 0
+
+def test_orders():
+    accounts = make_accounts()
+    cache = SortKeyCache()
+    assert cache.order(accounts, sort_order.kSortCustom) == [0, 1, 2]
+    assert cache.order(accounts, sort_order.kSortAlphabetical) == [1, 0, 2]  # case is ignored
+    assert cache.order(accounts, sort_order.kSortRecency) == [2, 0, 1]
+    assert cache.order(accounts, sort_order.kSortFrequency) == [1, 0, 2]  # ties keep the custom order
+    # The accounts aren't reordered
+    assert [account.issuer for account in accounts] == ["boggle", "Amazon", "Github"]
+
+def test_keys_cached_until_changed():
+    accounts = make_accounts()
+    cache = SortKeyCache()
+    cache.order(accounts, sort_order.kSortRecency)
+    with patch('sort_order.timestamp_key', return_value=0) as mock_key:
+        assert cache.order(accounts, sort_order.kSortRecency) == [2, 0, 1]
+        mock_key.assert_not_called()
+    accounts[1].last_used = "2025-04-01 08:00:00"
+    assert cache.order(accounts, sort_order.kSortRecency) == [1, 2, 0]
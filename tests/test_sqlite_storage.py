@@ -0,0 +1,131 @@
+import pytest
+import sqlite3
+from pathlib import Path
+import tempfile
+from unittest.mock import patch
+
+from account_mgr import AccountManager, Account, OtpRecord, JsonVaultStorage
+from sqlite_storage import SqliteVaultStorage, migrate_json_vault
+
+
+@pytest.fixture
+def account_manager():
+    """Create an AccountManager instance using a JSON vault with three entries in a temporary directory."""
+    temp_dir = tempfile.TemporaryDirectory()
+    test_vault_path = Path(temp_dir.name) / "vault.json"
+
+    manager = AccountManager(filename=str(test_vault_path))
+    saved_state = (manager.vault_path, manager.backup_path, manager.save_scheduler)
+    manager.vault_path = test_vault_path
+    manager.backup_path = test_vault_path.with_suffix('.backup.json')
+    manager.save_scheduler = None  # save immediately
+    manager._accounts = []
+    manager.save_new_account(OtpRecord("Github", "Personal", "JBSWY3DPEHPK3PXP"))
+    manager.save_new_account(OtpRecord("Boggle", "Work", "GEZDGNBVGY3TQOJQ"))
+    manager.save_new_account(OtpRecord("Amazon", "Shopping", "GEZDGNBVGY3TQOJQ"))
+    yield manager  # Provide the fixture to the test
+
+    # Teardown code executes after the test
+    manager.set_storage(JsonVaultStorage(manager))
+    manager.vault_path, manager.backup_path, manager.save_scheduler = saved_state
+    manager._accounts = None
+    temp_dir.cleanup()
+
+
+def stored_accounts(db_path):
+    """ Read the accounts in the database with a separate connection. """
+    storage = SqliteVaultStorage(db_path)
+    try:
+        return storage.load()
+    finally:
+        storage.close()
+
+
+def test_migrate_json_vault(account_manager):
+    github = account_manager.find_account("Github", "Personal")
+    github.last_used = "2025-02-01 10:00:00"
+    github.used_frequency = 3
+    account_manager.record_usage(github)  # only in the usage journal
+    db_path = account_manager.vault_path.with_suffix('.db')
+
+    assert migrate_json_vault(account_manager.vault_path, db_path) == 3
+    accounts = stored_accounts(db_path)
+    assert accounts == account_manager.get_accounts()
+    assert accounts[2].used_frequency == 3
+    # It's one-shot
+    with pytest.raises(FileExistsError):
+        migrate_json_vault(account_manager.vault_path, db_path)
+
+
+def test_changes_stored_by_row(account_manager):
+    db_path = account_manager.vault_path.with_suffix('.db')
+    migrate_json_vault(account_manager.vault_path, db_path)
+    account_manager.set_storage(SqliteVaultStorage(db_path))
+
+    account_manager.save_new_account(OtpRecord("Dropbox", "Work", "JBSWY3DPEHPK3PXP"))
+    boggle = account_manager.find_account("Boggle", "Work")
+    account_manager.update_account(account_manager.position_of("Boggle", "Work"),
+                                   Account("Boggle", "Home", boggle.secret, boggle.last_used))
+    account_manager.delete_account(account_manager.find_account("Amazon", "Shopping"))
+    github = account_manager.find_account("Github", "Personal")
+    github.used_frequency = 9
+    account_manager.record_usage(github)
+    assert stored_accounts(db_path) == account_manager.get_accounts()
+    assert [account.issuer for account in stored_accounts(db_path)] == ["Dropbox", "Boggle", "Github"]
+
+    account_manager.sort_alphabetically()
+    assert [account.issuer for account in stored_accounts(db_path)] == ["Boggle", "Dropbox", "Github"]
+    # The JSON vault isn't touched
+    assert "Dropbox" not in account_manager.vault_path.read_text()
+
+
+def test_external_change_detected(account_manager):
+    db_path = account_manager.vault_path.with_suffix('.db')
+    migrate_json_vault(account_manager.vault_path, db_path)
+    account_manager.set_storage(SqliteVaultStorage(db_path))
+    # The database can't be watched, so the view polls get_accounts instead
+    assert account_manager.storage.watch_path() is None
+    assert JsonVaultStorage(account_manager).watch_path() == account_manager.vault_path
+    accounts = account_manager.get_accounts()
+    assert account_manager.get_accounts() is accounts
+
+    # Another program changes one entry
+    with sqlite3.connect(str(db_path)) as connection:
+        connection.execute("UPDATE entries SET used_frequency = 5 WHERE issuer = 'Boggle'")
+    connection.close()
+    reloaded = account_manager.get_accounts()
+    assert account_manager.find_account("Boggle", "Work").used_frequency == 5
+    assert account_manager.last_external_changes.modified == [("Boggle", "Work")]
+    assert reloaded[2] is accounts[2]
+
+
+def test_different_key_is_read_only(account_manager):
+    db_path = account_manager.vault_path.with_suffix('.db')
+    migrate_json_vault(account_manager.vault_path, db_path)
+    with patch('appconfig.AppConfig.get_alt_id', return_value="some-other-machine"):
+        storage = SqliteVaultStorage(db_path)
+        assert storage.load() == []
+        assert not storage.write_all([])
+        storage.close()
+    assert len(stored_accounts(db_path)) == 3
+
+
+def test_reorder_updates_positions(account_manager):
+    db_path = account_manager.vault_path.with_suffix('.db')
+    migrate_json_vault(account_manager.vault_path, db_path)
+    account_manager.set_storage(SqliteVaultStorage(db_path))
+    accounts = list(account_manager.get_accounts())  # Amazon, Boggle, Github
+
+    with patch('cipher_funcs.decrypt') as mock_decrypt:
+        assert account_manager.reorder([2, 0, 1])
+        mock_decrypt.assert_not_called()
+    assert account_manager.get_accounts() == [accounts[2], accounts[0], accounts[1]]
+    assert account_manager.get_accounts()[0] is accounts[2]
+    assert [account.issuer for account in stored_accounts(db_path)] == ["Github", "Amazon", "Boggle"]
+    # By keys, and a later change goes to the right row
+    assert account_manager.reorder([("Boggle", "Work"), ("Github", "Personal"), ("Amazon", "Shopping")])
+    account_manager.delete_account(account_manager.find_account("Github", "Personal"))
+    assert [account.issuer for account in stored_accounts(db_path)] == ["Boggle", "Amazon"]
+    # Not a permutation
+    assert not account_manager.reorder([0, 0])
+    assert not account_manager.reorder([("Boggle", "Work"), ("Nobody", "None")])
@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import Mock
+
+import pyotp
+from PyQt5.QtCore import Qt, QEvent, QPoint
+from PyQt5.QtGui import QMouseEvent, QPixmap, QPainter
+from PyQt5.QtWidgets import QApplication, QStyleOptionViewItem
+
+import otp_engine
+from account_mgr import OtpRecord
+from otp_engine import OtpEngine
+from vault_list_view import VaultListModel, VaultListView
+
+
+class TestVaultListView(unittest.TestCase):
+
+    def make_accounts(self):
+        return [OtpRecord("Able", "label1", "GEZDGNBVGY3TQOJQ").toAccount(),
+                OtpRecord("Baker", "label2", "JBSWY3DPEHPK3PXP").toAccount()]
+
+    def test_model_search(self):
+        providers = Mock()
+        model = VaultListModel(OtpEngine(), providers)
+        model.set_accounts(self.make_accounts(), "k")
+        assert model.rowCount() == 1
+        index = model.index(0)
+        assert index.data(VaultListModel.ProviderRole) == "Baker"
+        assert index.data(VaultListModel.UserRole) == "label2"
+        # Position in the full account list
+        assert index.data(VaultListModel.IndexRole) == 1
+
+    def test_codes_computed_lazily(self):
+        engine = OtpEngine()
+        engine.code_for = Mock(wraps=engine.code_for)
+        model = VaultListModel(engine, Mock())
+        model.set_accounts(self.make_accounts())
+        # Nothing is computed until a row asks for its code
+        engine.code_for.assert_not_called()
+        code = model.index(1).data(VaultListModel.OtpRole)
+        assert code == pyotp.TOTP("JBSWY3DPEHPK3PXP").at(otp_engine.current_time_step() * 30)
+        model.index(1).data(VaultListModel.OtpRole)
+        assert engine.code_for.call_count == 1
+
+    def test_click_on_otp(self):
+        view = VaultListView(OtpEngine(), Mock(get_provider_icon_pixmap=Mock(return_value=None)))
+        view.resize(500, 300)
+        view.set_accounts(self.make_accounts())
+        clicked = Mock()
+        view.delegate.otp_clicked.connect(clicked)
+        index = view.vault_model.index(0)
+        option = QStyleOptionViewItem()
+        option.rect = view.visualRect(index)
+        otp_rect = view.delegate.otp_rect(option, index)
+        event = QMouseEvent(QEvent.MouseButtonRelease, otp_rect.center(), Qt.LeftButton, Qt.LeftButton, Qt.NoModifier)
+        assert view.delegate.editorEvent(event, view.vault_model, option, index)
+        clicked.assert_called_once()
+        # Clicking on the user label does nothing
+        event = QMouseEvent(QEvent.MouseButtonRelease, QPoint(otp_rect.left() - 20, otp_rect.center().y()),
+                            Qt.LeftButton, Qt.LeftButton, Qt.NoModifier)
+        view.delegate.editorEvent(event, view.vault_model, option, index)
+        clicked.assert_called_once()
+
+    def test_paint_uses_letter_badge(self):
+        badge = QPixmap(16, 16)
+        providers = Mock(get_provider_icon_pixmap=Mock(return_value=None), get_letter_badge=Mock(return_value=badge))
+        view = VaultListView(OtpEngine(), providers)
+        view.resize(500, 300)
+        view.set_accounts(self.make_accounts())
+        index = view.vault_model.index(1)
+        option = QStyleOptionViewItem()
+        option.rect = view.visualRect(index)
+        canvas = QPixmap(500, 40)
+        painter = QPainter(canvas)
+        view.delegate.paint(painter, option, index)
+        painter.end()
+        # Providers without a favicon get the same cached badge as the widget rows
+        providers.get_letter_badge.assert_called_once_with("B", 16)
+
+    @classmethod
+    def setUpClass(cls):
+        # QApplication is created once for the entire test suite
+        cls.app = QApplication.instance() or QApplication([])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from unittest.mock import patch
+
+from PyQt5.QtCore import QCoreApplication
+from PyQt5.QtWidgets import QApplication
+
+from vault_watcher import VaultWatcher
+
+
+class TestVaultWatcher(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.vault_path = Path(self.temp_dir.name) / "vault.json"
+        self.vault_path.write_text('{"vault": {}}')
+        self.watcher = VaultWatcher(self.vault_path)
+        self.signals = 0
+        self.watcher.vault_changed.connect(self.count_signal)
+
+    def tearDown(self):
+        self.watcher.deleteLater()
+        self.temp_dir.cleanup()
+
+    def count_signal(self):
+        self.signals += 1
+
+    def process_events(self, seconds=0.6):
+        """ Run the event loop long enough for the notifications to be debounced. """
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            QCoreApplication.processEvents()
+            time.sleep(0.01)
+
+    def replace_vault(self, content):
+        """ Replace the vault the way AccountManager.save_accounts does. """
+        temp_path = self.vault_path.with_suffix('.tmp')
+        temp_path.write_text(content)
+        os.replace(temp_path, self.vault_path)
+
+    def test_replace_signals_once(self):
+        self.replace_vault('{"vault": {"entries": []}}')
+        self.process_events()
+        self.assertEqual(self.signals, 1)
+        # Still watching after the file was replaced
+        self.replace_vault('{"vault": {"entries": [1]}}')
+        self.process_events()
+        self.assertEqual(self.signals, 2)
+
+    def test_other_files_ignored(self):
+        self.vault_path.with_suffix('.journal').write_text("{}\n")
+        self.vault_path.with_suffix('.backup.json').write_text("{}")
+        self.process_events()
+        self.assertEqual(self.signals, 0)
+
+    def test_polls_without_path(self):
+        with patch('vault_watcher.kPollMs', 50):
+            watcher = VaultWatcher(None)
+        polls = []
+        watcher.vault_changed.connect(lambda: polls.append(1))
+        self.process_events(0.3)
+        watcher.deleteLater()
+        self.assertGreaterEqual(len(polls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -98,8 +98,9 @@ class TestView(unittest.TestCase):
         # Call the display_accounts method
         view.display_vault()
 
-        # Find the first providerLabel in the layout
-        provider_labels = view.findChildren(QPushButton, "providerLabel")
+        # Find the first visible providerLabel in the layout (rows not matching are hidden)
+        provider_labels = [label for label in view.findChildren(QPushButton, "providerLabel")
+                           if not label.parentWidget().isHidden()]
         self.assertGreater(len(provider_labels), 0, "No provider labels found")
         first_provider_label = provider_labels[0]
 
@@ -107,6 +108,50 @@ class TestView(unittest.TestCase):
         self.assertTrue(first_provider_label.text().startswith("Baker"))
 
 
+    @patch('view.AccountManager')
+    def test_rows_reused(self, MockAccountManager):
+        view = AppView(self.app)
+        mock_manager = MockAccountManager.return_value
+        mock_account1 = OtpRecord("Able", "label1", "AB34").toAccount()
+        mock_account2 = OtpRecord("Baker", "label2", "AB34").toAccount()
+        mock_manager.get_accounts.return_value = [mock_account1, mock_account2]
+        view.display_vault()
+        first_rows = dict(view.vault_rows)
+
+        # Searching and refreshing keep the same widgets
+        view.search_box.setText("k")
+        view.display_vault()
+        self.assertEqual(first_rows, view.vault_rows)
+        self.assertTrue(view.vault_rows[("Able", "label1")].frame.isHidden())
+        self.assertFalse(view.vault_rows[("Baker", "label2")].frame.isHidden())
+
+        # Only the row for a removed entry goes away
+        mock_manager.get_accounts.return_value = [mock_account2]
+        view.display_vault()
+        self.assertEqual(list(view.vault_rows), [("Baker", "label2")])
+        self.assertIs(view.vault_rows[("Baker", "label2")], first_rows[("Baker", "label2")])
+
+    @patch('view.kVirtualListThreshold', 2)
+    @patch('view.AccountManager')
+    def test_large_vault_uses_list(self, MockAccountManager):
+        view = AppView(self.app)
+        mock_manager = MockAccountManager.return_value
+        mock_account1 = OtpRecord("Able", "label1", "AB34").toAccount()
+        mock_account2 = OtpRecord("Baker", "label2", "AB34").toAccount()
+        mock_manager.get_accounts.return_value = [mock_account1, mock_account2]
+        view.display_vault()
+        self.assertTrue(view.using_vault_list)
+        self.assertEqual(view.vault_rows, {})
+        self.assertEqual(view.vault_list.vault_model.rowCount(), 2)
+        # Paint the list
+        self.assertFalse(view.vault_list.grab().isNull())
+
+        # Back to rows when the vault shrinks
+        mock_manager.get_accounts.return_value = [mock_account1]
+        view.display_vault()
+        self.assertFalse(view.using_vault_list)
+        self.assertEqual(list(view.vault_rows), [("Able", "label1")])
+
     @patch('view.AccountManager')
     def test_sort_alpha(self, MockAccountManager):
         # Create an instance of AppView
@@ -127,9 +172,21 @@ class TestView(unittest.TestCase):
         self.assertIsNotNone(sort_alpha_action, "Sort > Alphabetically action not found")
 
         # Invoke the Sort > Alphabetically action
-        sort_alpha_action.trigger()
-        # Assert the sort call was made
-        view.account_manager.sort_alphabetically.assert_called_once()
+        view.account_manager.get_accounts.return_value = [mock_account1, mock_account2]
+        try:
+            sort_alpha_action.trigger()
+            # The display is sorted but the vault isn't
+            assert view.app_config.get_sort_mode() == "alphabetical"
+            assert view.row_order == [("Pennies", "label2"), ("Rexall", "label1")]
+            view.account_manager.sort_alphabetically.assert_not_called()
+
+            # Apply the sorted order to the vault
+            apply_sort_action = view.findChild(QAction, "applySortAction")
+            apply_sort_action.trigger()
+            view.account_manager.apply_sort.assert_called_once_with("alphabetical")
+            assert view.app_config.get_sort_mode() == "custom"
+        finally:
+            view.app_config.set_sort_mode("custom")
 
     @patch('view.AccountManager')
     def test_copy_to_clipboard(self, MockAccountManager):
@@ -153,8 +210,8 @@ class TestView(unittest.TestCase):
         received = pyperclip.paste()
         # Verify the pasted value matches the button text
         assert otp_btns[0].text() == received
-        # Verify the manager updated the account with last_used
-        view.account_manager.update_account.assert_called_once()
+        # Verify the manager recorded the account's last_used
+        view.account_manager.record_usage.assert_called_once()
 
     @patch.object(ReorderDialog,"exec_")
     @patch('view.AccountManager')
@@ -174,8 +231,8 @@ class TestView(unittest.TestCase):
 
         # Invoke the Reorder action
         reorder_action.trigger()
-        # Assert the sort call was made
-        view.account_manager.set_accounts.assert_called_once()
+        # Assert the new order was given to the model
+        view.account_manager.reorder.assert_called_once()
         mockReorderDialog.assert_called_once()
 
     @patch.object(ExportImportDialog,"exec_")